@@ -11,14 +11,42 @@ a csv file and its content so far is then deleted.
 """
 
 import argparse
+import functools
+import hashlib
 import os
+import socket
+import sys
+import threading
+import time
+import traceback
 from multiprocessing import Pool
 
+import numpy
 import pandas
 
 import recoda.analyse.python.metrics
+from recoda.analyse.helpers import FILE_FACT_COLUMNS, get_file_index, project_scope
 import recoda.analyse.r.metrics
+from recoda.analyse.sources import GitTreeSource
+import recoda.fleet
+import recoda.instrumentation
+import recoda.profiling
+import recoda.progress
+from recoda.output import (
+    OUTPUT_FORMATS,
+    Category,
+    ProjectResult,
+    format_of,
+    merge_files,
+    open_writer,
+    read_measured_ids,
+    typed_frame
+)
+import recoda.project_handler.archive
+import recoda.project_handler.directory
 import recoda.project_handler.git
+import recoda.project_handler.project_list
+import recoda.project_handler.work_queue
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -36,25 +64,121 @@ def parse_arguments() -> argparse.Namespace:
         required=True,
         choices=['python'],
     )
-    _parser.add_argument(
+    # Projects are either discovered below a base directory or read from a list.
+    _projects_group = _parser.add_mutually_exclusive_group(required=True)
+    _projects_group.add_argument(
         '-b',
         '--base-dir',
         type=str,
-        help="Base path to search projects.",
-        required=True
+        help="Base path to search projects."
+    )
+    _projects_group.add_argument(
+        '--projects-from',
+        type=str,
+        help=(
+            "File listing the projects to measure, or - to read the list from stdin. "
+            "Every line holds the path to a project, "
+            "optionally followed by a tab and an identifier for it. "
+            "Projects are measured while the list is read, without searching a base directory."
+        )
     )
     _parser.add_argument(
         '-t', '--project-type', type=str,
         help=(
             "Type of the projects to be analyzed. "
-            "The project handler will only look for git repositories in the base directory, "
-            "and ignore anything else. "
+            "git will cause the project handler to only look for git repositories "
+            "in the base directory, and ignore anything else. "
             "directory will cause the handler to treat every folder in the base dir as project. "
+            "archive treats every tarball or zip file as project, without extracting it. "
         ),
         required=False,
-        choices=['git'],
+        choices=['git', 'directory', 'archive'],
         default='git'
     )
+    _parser.add_argument(
+        '-d',
+        '--depth',
+        type=_depth_argument,
+        help=(
+            "How many folder levels below the base directory are searched for projects. "
+            "1 only searches the folders directly inside the base directory. "
+            "For the directory project type, the folders at this level are the projects."
+        ),
+        required=False,
+        default=1
+    )
+    _parser.add_argument(
+        '--history',
+        type=str,
+        help=(
+            "Measure the history of every repository instead of its current state. "
+            "commits measures every commit on the first parent line of HEAD, "
+            "tags every tagged commit. "
+            "Every revision gets a row with its name and date. "
+            "Files, that did not change since the previous revision, are not measured again."
+        ),
+        required=False,
+        choices=recoda.project_handler.git.HISTORY_MODES,
+        default=None
+    )
+    _parser.add_argument(
+        '--shard',
+        type=_shard_argument,
+        help=(
+            "Only measure one part of the projects, given as i/N with i from 0 to N-1. "
+            "Projects are assigned by a stable hash of their identifier, "
+            "so N runs with the shards 0/N to N-1/N measure every project exactly once. "
+            "Combine their output files with: recoda merge."
+        ),
+        required=False,
+        default=None
+    )
+    _parser.add_argument(
+        '--serve',
+        type=_address_argument,
+        help=(
+            "Coordinate workers instead of measuring locally, listening on HOST:PORT. "
+            "This run discovers the projects and writes the output file, "
+            "workers started with: recoda worker HOST:PORT measure them. "
+            "Project paths need to be valid for all workers."
+        ),
+        required=False,
+        default=None
+    )
+    _parser.add_argument(
+        '--authkey',
+        type=str,
+        help=(
+            "Key workers need to connect to --serve. "
+            "Taken from the environment variable RECODA_AUTHKEY by default."
+        ),
+        required=False,
+        default=os.environ.get('RECODA_AUTHKEY')
+    )
+    _parser.add_argument(
+        '--queue',
+        type=str,
+        help=(
+            "Path to an SQLite database shared by several recoda runs, "
+            "e.g. on different machines. The runs claim projects from it one by one, "
+            "so faster runs measure more projects. Only the first run fills it with the "
+            "projects found by -b or --projects-from. Every run writes its own output file, "
+            "combine them with: recoda merge."
+        ),
+        required=False,
+        default=None
+    )
+    _parser.add_argument(
+        '--lease',
+        type=float,
+        help=(
+            "Seconds a project claimed from --queue, or handed to a worker of --serve, "
+            "stays with a run without it reporting progress. Projects of runs, "
+            "that ended early, are handed to other runs afterwards."
+        ),
+        required=False,
+        default=600
+    )
     _parser.add_argument(
         '-f',
         '--file-output',
@@ -65,6 +189,94 @@ def parse_arguments() -> argparse.Namespace:
         ),
         required=False
     )
+    _parser.add_argument(
+        '--format',
+        type=str,
+        help=(
+            "Format of the output file. "
+            "parquet keeps the type of every column and needs pyarrow, "
+            "rows are written as part files next to the output file, "
+            "e.g. results.part-00001.parquet, which recoda merge combines. "
+            "sqlite writes to a table keyed by id, replacing the rows "
+            "of projects measured again."
+        ),
+        required=False,
+        choices=OUTPUT_FORMATS,
+        default='csv'
+    )
+    _parser.add_argument(
+        '--file-facts',
+        type=str,
+        help=(
+            "Path to a second output file, in the same --format, with one row "
+            "per python and documentation file of every project. It holds the "
+            "facts the metrics average over, like comment density, error density, "
+            "style offences, line counts and readability scores. "
+            "csv files ending with .gz are compressed."
+        ),
+        required=False,
+        default=None
+    )
+    _parser.add_argument(
+        '--timings',
+        type=str,
+        help=(
+            "Path to a second output file, in the same --format, with the wall time, "
+            "CPU time and peak memory growth of every metric for every project. "
+            "Summarise it with: recoda report."
+        ),
+        required=False,
+        default=None
+    )
+    _parser.add_argument(
+        '--profile',
+        type=str,
+        help=(
+            "Profile the metrics with cProfile inside the processes measuring projects "
+            "and merge the samples into this pstats file. Every metric is called "
+            "through a function named <metric NAME>. A report of the most expensive "
+            "projects per metric is written next to it, with .txt appended."
+        ),
+        required=False,
+        default=None
+    )
+    _parser.add_argument(
+        '--profile-memory',
+        action='store_true',
+        help=(
+            "Also trace allocations with tracemalloc while profiling and add the "
+            "peak memory per metric and the lines allocating the most to the report. "
+            "This slows measuring down considerably."
+        )
+    )
+    _parser.add_argument(
+        '--status',
+        type=str,
+        help=(
+            "Path to a JSON file with the state of the run, refreshed with every "
+            "progress report: projects and files per second, the estimated time left, "
+            "the busy time of every worker and the projects taking the longest."
+        ),
+        required=False,
+        default=None
+    )
+    _parser.add_argument(
+        '--progress-interval',
+        type=float,
+        help="Seconds between two progress reports.",
+        required=False,
+        default=10.0
+    )
+    _parser.add_argument(
+        '--remeasure',
+        action='store_true',
+        help=(
+            "Measure projects again, that are already in the output file, "
+            "e.g. a subset given with --projects-from. "
+            "Their rows are replaced in sqlite output files "
+            "and added again to other formats, which recoda merge resolves."
+        )
+    )
     _parser.add_argument(
         '-p',
         '--processes',
@@ -80,6 +292,156 @@ def parse_arguments() -> argparse.Namespace:
     )
     return _parser.parse_args()
 
+def parse_merge_arguments(arguments: list) -> argparse.Namespace:
+    """ Reads the command line arguments of recoda merge.
+
+    :param arguments:   The arguments following merge.
+    :returns:           Values of accepted command line arguments.
+    """
+    _parser = argparse.ArgumentParser(
+        prog='recoda merge',
+        description="""Combines the output files of several runs, e.g. of all shards."""
+    )
+    _parser.add_argument(
+        'input_files',
+        type=str,
+        nargs='+',
+        help=(
+            "Output files to combine. "
+            "Projects measured in several files are taken from the last one."
+        )
+    )
+    _parser.add_argument(
+        '-f',
+        '--file-output',
+        type=str,
+        help="Full Path to the combined file. Existing files will be overwritten.",
+        required=True
+    )
+    _parser.add_argument(
+        '--format',
+        type=str,
+        choices=OUTPUT_FORMATS,
+        help=(
+            "Format of the combined file. Told from its name by default: "
+            ".parquet, .db/.sqlite/.sqlite3 or csv otherwise. "
+            "Input files may be in any of the formats."
+        ),
+        default=None
+    )
+    _parser.add_argument(
+        '--newest-by',
+        type=str,
+        metavar='COLUMN',
+        help=(
+            "Keep the row with the highest value in this column, "
+            "e.g. date, instead of the row of the last file."
+        ),
+        default=None
+    )
+    return _parser.parse_args(arguments)
+
+def parse_worker_arguments(arguments: list) -> argparse.Namespace:
+    """ Reads the command line arguments of recoda worker.
+
+    :param arguments:   The arguments following worker.
+    :returns:           Values of accepted command line arguments.
+    """
+    _parser = argparse.ArgumentParser(
+        prog='recoda worker',
+        description="""Measures projects for a run started with --serve."""
+    )
+    _parser.add_argument(
+        'coordinator',
+        type=_address_argument,
+        help="HOST:PORT the coordinating run listens on."
+    )
+    _parser.add_argument(
+        '--authkey',
+        type=str,
+        help=(
+            "Key of the coordinating run. "
+            "Taken from the environment variable RECODA_AUTHKEY by default."
+        ),
+        required=False,
+        default=os.environ.get('RECODA_AUTHKEY')
+    )
+    _parser.add_argument(
+        '-p',
+        '--processes',
+        type=int,
+        help="Number of processes measuring projects in parallel.",
+        choices=range(1, 200),
+        metavar='1 to 200',
+        default=5
+    )
+    return _parser.parse_args(arguments)
+
+def parse_report_arguments(arguments: list) -> argparse.Namespace:
+    """ Reads the command line arguments of recoda report.
+
+    :param arguments:   The arguments following report.
+    :returns:           Values of accepted command line arguments.
+    """
+    _parser = argparse.ArgumentParser(
+        prog='recoda report',
+        description="""Summarises which metrics cost the most, from files written with --timings."""
+    )
+    _parser.add_argument(
+        'timing_files',
+        type=str,
+        nargs='+',
+        help="Timing files of one or more runs, e.g. of all shards, in any output format."
+    )
+    return _parser.parse_args(arguments)
+
+def _address_argument(value: str) -> tuple:
+    """ Parse an address given as HOST:PORT into a tuple of host and port. """
+    _host, _, _port = value.rpartition(':')
+    try:
+        return _host, int(_port)
+    except ValueError:
+        raise argparse.ArgumentTypeError('Addresses are given as HOST:PORT, e.g. node1:50000.')
+
+def _authkey(value: str) -> bytes:
+    """ The key for coordinator and workers, which can not work without one. """
+    if not value:
+        raise ValueError('Coordinator and workers need --authkey or RECODA_AUTHKEY.')
+    return value.encode('utf-8')
+
+def _depth_argument(value: str) -> int:
+    """ Parse a search depth, which finds no projects below 1. """
+    try:
+        _depth = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('The depth is a whole number, e.g. 2.')
+    if _depth < 1:
+        raise argparse.ArgumentTypeError('The depth needs to be at least 1.')
+    return _depth
+
+def _shard_argument(value: str) -> tuple:
+    """ Parse a shard given as i/N into a tuple of index and count. """
+    try:
+        _index, _count = (int(_part) for _part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('Shards are given as i/N, e.g. 0/4.')
+    if _count < 1 or not 0 <= _index < _count:
+        raise argparse.ArgumentTypeError('The shard i/N needs 0 <= i < N.')
+    return _index, _count
+
+def in_shard(identifier: str, shard: tuple) -> bool:
+    """ Check if a project belongs to a shard.
+
+    A cryptographic hash is used, since the builtin hash of strings
+    changes between python processes.
+
+    :param identifier:  The identifier of the project.
+    :param shard:       Tuple of the index of the shard and the number of shards.
+    """
+    _index, _count = shard
+    _digest = hashlib.sha1(identifier.encode('utf-8')).digest()
+    return int.from_bytes(_digest[:8], 'big') % _count == _index
+
 class MeasureProjects():
     """ Goes through all projects and returns their measurements in a DataFrame
 
@@ -116,6 +478,41 @@ class MeasureProjects():
         'error_density': "error_density",
     }
 
+    # Status of requirements_declared. Its ratio is missing for projects,
+    # whose requirements could not be read, which give "Error".
+    _REQUIREMENTS_STATUSES = ('measured', 'error')
+
+    # Status of packageability. Projects without any setup files give 0,
+    # which tells more than False for setup files without a setup() call.
+    _PACKAGEABILITY_STATUSES = ('measured', 'no_setup_files')
+
+    # Metrics followed by a column with their status.
+    _STATUS_COLUMNS = ('packageability', 'requirements_declared')
+
+    # Type of the values of every metric, for the columns of the chunks
+    # in memory and of typed output files. Ratios and scores are
+    # single precision, their measurements are not more precise.
+    _METRIC_TYPES = {
+        'loc': int,
+        'packageability': bool,
+        'packageability_status': Category(_PACKAGEABILITY_STATUSES),
+        'requirements_declared': numpy.float32,
+        'requirements_declared_status': Category(_REQUIREMENTS_STATUSES),
+        'docker_setup': bool,
+        'singularity_setup': bool,
+        'project_readme_size': int,
+        'project_doc_size': int,
+        'flesch_reading_ease': numpy.float32,
+        'flesch_kincaid_grade': numpy.float32,
+        'readme_flesch_reading_ease': numpy.float32,
+        'readme_flesch_kincaid_grade': numpy.float32,
+        'average_comment_density': numpy.float32,
+        'standard_compliance': numpy.float32,
+        'license_type': Category(),
+        'testlibrary_usage': bool,
+        'error_density': numpy.float32,
+    }
+
     _LANGUAGE_DISPATCHER = {
         'python': recoda.analyse.python.metrics,
         'r': recoda.analyse.r.metrics
@@ -126,33 +523,117 @@ class MeasureProjects():
             project_measure_handler,
             language: str,
             multiprocessing_chunk_size: int = 5,
-            projects_to_skip: list = []
+            projects_to_skip: list = [],
+            history: str = None,
+            shard: tuple = None,
+            runner=None,
+            file_facts_writer=None,
+            timings_writer=None,
+            profile_collector=None,
+            progress=None
         ):
         self.project_handler = project_measure_handler
         self.metrics = self._LANGUAGE_DISPATCHER[language]
         self._multiprocessing_chunk_size = multiprocessing_chunk_size
+        # Lists are turned into sets, other containers, like the ids
+        # of result databases, are asked directly.
+        if isinstance(projects_to_skip, list):
+            projects_to_skip = set(projects_to_skip)
         self.projects_to_skip = projects_to_skip
+        self._history = history
+        self._shard = shard
+        # Measures the tasks with a number of processes and yields
+        # a ProjectResult per project, e.g. through a fleet of workers.
+        self._runner = runner or _run_multiprocessing
+        # Writer for the facts about single files, they are only
+        # gathered, if there is one.
+        self._file_facts_writer = file_facts_writer
+        # Writer for the cost of every metric, only recorded, if there is one.
+        self._timings_writer = timings_writer
+        # Gathers the profiles of the workers, they only profile, if there is one.
+        self._profile_collector = profile_collector
+        # Reports the throughput of the run every few seconds.
+        self._progress = progress or recoda.progress.Progress()
+        self._task_options = {
+            'file_facts': file_facts_writer is not None,
+            'timings': timings_writer is not None,
+            'profile': None if profile_collector is None else {'memory': profile_collector.memory}
+        }
 
         # We set ids "measure function" to string, so we can
         # send all fields through the function dispatcher.
         # This will just give back us back the id for the id field.
         self._metrics_dispatcher = {'id': str}
+        self._metrics_dispatcher.update(self.metric_functions(language))
 
+        _column_list = [column for column in self._metrics_dispatcher]
+        for _metric in self._STATUS_COLUMNS:
+            if _metric in _column_list:
+                _column_list.insert(_column_list.index(_metric) + 1, _metric + '_status')
+        if history:
+            # Revisions of the same project share the id.
+            _column_list[1:1] = ['revision', 'date']
+        self._dataframe = pandas.DataFrame(columns=_column_list)
+
+
+    @classmethod
+    def metric_functions(cls, language: str) -> dict:
+        """ The measure functions of all metrics a language offers.
+
+        :param language:    One of the supported languages, e.g. python.
+        :returns:           Measure functions keyed by metric, in the order of the columns.
+        """
+        _functions = {}
         # We build and gather all functions in a dispatcher list
         # to measure them in the measure method.
-        for _metric, _function in self._METRICS_DISPATCHER.items():
+        for _metric, _function in cls._METRICS_DISPATCHER.items():
             try:
-                self._metrics_dispatcher[_metric] = getattr(
-                    self.metrics,
-                    _function
-                    )
+                _functions[_metric] = getattr(cls._LANGUAGE_DISPATCHER[language], _function)
             except AttributeError:
                 #TODO LOG that the language lacks the requested metric.
                 pass
+        return _functions
 
-        _column_list = [column for column in self._metrics_dispatcher]
-        self._dataframe = pandas.DataFrame(columns=_column_list)
+    def column_types(self) -> dict:
+        """ The type of the values in every column of the results.
+
+        :returns: Python types keyed by column, in the order of the columns.
+        """
+        return {
+            _column: self._METRIC_TYPES.get(_column, str)
+            for _column in self._dataframe.columns
+        }
+
+    @staticmethod
+    def file_fact_types(history: bool = False) -> dict:
+        """ The type of the values in every column of the file facts.
+
+        :param history: True if revisions are measured.
+        :returns:       Python types keyed by column, in the order of the columns.
+        """
+        _types = {'id': str}
+        if history:
+            _types['revision'] = str
+        _types['file'] = str
+        for _columns in FILE_FACT_COLUMNS.values():
+            _types.update(
+                (_column, numpy.float32 if _type is float else _type)
+                for _column, _type in _columns
+            )
+        return _types
+
+    @staticmethod
+    def timing_types(history: bool = False) -> dict:
+        """ The type of the values in every column of the timings.
 
+        :param history: True if revisions are measured.
+        :returns:       Python types keyed by column, in the order of the columns.
+        """
+        _types = {'id': str}
+        if history:
+            _types['revision'] = str
+        _types.update(recoda.instrumentation.TIMING_TYPES)
+        return _types
 
     def measure(self) -> pandas.DataFrame:
         """ Go through all Projects in the instances handler and measure them.
@@ -167,66 +648,328 @@ class MeasureProjects():
         if not self._dataframe.empty:
             return self._dataframe
 
-        # Save all project directories in a list to count them and
-        # print a value for total projects.
-        _directories = [_dir for _dir in self.project_handler.get_project_directories()]
-        _projects = len(_directories)
+        # Discovery is not finished before measuring starts,
+        # so the total of projects grows while we go.
+        _discovery = _DiscoveryProgress(self.project_handler)
+        self._progress.start(_discovery)
+
+        # TODO set up logger
+        # A task not only consist of the path to the project
+        # but also the metrics dispatcher dict.
+        # Multiprocessing does not function, when called from here directly.
+        # This means we need to call it from a function where the dispatcher is not in scope.
+        # This in turn means we have to pass the dispatcher dict along with the path.
+        def _tasks():
+            for _project_directory in _discovery:
+                _identifier = self.project_handler.get_identifier(_project_directory)
+                # Skip project, that are already measured or belong to other shards.
+                if not self._is_selected(_identifier):
+                    self._progress.skipped()
+                    continue
+                self._progress.handed_over(_identifier)
+                yield (
+                    _project_directory,
+                    _identifier,
+                    self._metrics_dispatcher,
+                    self._get_history(_project_directory),
+                    self._task_options
+                )
+        _measured = []
+
+        try:
+            _rows = []
+            for _result in self._runner(_tasks(), self._multiprocessing_chunk_size):
+                _identifier = _result.identifier
+                self._progress.measured(_result)
+                if _result.error is not None:
+                    print('Measuring', _identifier, 'failed:\n' + _result.error, file=sys.stderr)
+                    self._mark_failed([_identifier])
+                    continue
+                _measured.append(_identifier)
+                if self._file_facts_writer is not None and _result.files:
+                    self._file_facts_writer.write(
+                        typed_frame(_result.files, self.file_fact_types(bool(self._history)))
+                    )
+                if self._timings_writer is not None and _result.timings:
+                    self._timings_writer.write(
+                        typed_frame(_result.timings, self.timing_types(bool(self._history)))
+                    )
+                if self._profile_collector is not None and _result.profile:
+                    self._profile_collector.add(_identifier, _result.profile)
+                _rows.extend(_result.rows)
+                # The chunk is filled to its max value so we hand it over.
+                # Chunks end with a project, so all revisions of a history are
+                # written together and a resumed run never skips a partial one.
+                # Projects shared with other processes are only done, once
+                # their rows are handed over, so the rows are not held back.
+                if (len(_rows) >= self._multiprocessing_chunk_size
+                        or (_rows and self._shares_projects())):
+                    yield self._typed_chunk(_rows)
+                    # Free up memory
+                    _rows = []
+                if not _rows:
+                    self._mark_measured(_measured)
+                    _measured = []
 
-        _measurement_chunk = []
-        for _projects_measured, _current_project_directory in enumerate(_directories):
+            # If we did not have enough projects left for a
+            # full sized chunk, we will cover the rest here.
+            yield self._typed_chunk(_rows)
+            self._mark_measured(_measured)
+            self._progress.report()
+        finally:
+            self._progress.stop()
 
-            print(_current_project_directory+':', _projects_measured+1, 'from', _projects, sep=' ')
-            # Skip project, that are already measured.
-            if _current_project_directory in self.projects_to_skip:
+    def _typed_chunk(self, rows: list) -> pandas.DataFrame:
+        """ Build a chunk of measured rows with the types of the metrics. """
+        for _row in rows:
+            if _row.get('packageability') is not None:
+                # 0 is no boolean and would become False like the judgement itself.
+                _row['packageability_status'] = 'measured'
+                if not isinstance(_row['packageability'], (bool, numpy.bool_)):
+                    _row['packageability'] = False
+                    _row['packageability_status'] = 'no_setup_files'
+            if 'requirements_declared' not in _row:
                 continue
+            if _row['requirements_declared'] == 'Error':
+                _row['requirements_declared'] = None
+                _row['requirements_declared_status'] = 'error'
+            elif _row['requirements_declared'] is not None:
+                _row['requirements_declared_status'] = 'measured'
+        return typed_frame(rows, self.column_types())
 
-            # TODO set up logger
-            # A chunk element not only consist of the path to the project
-            # but also the metrics dispatcher dict.
-            # Multiprocessing does not function, when called from here directly.
-            # This means we need to call it from a function where the dispatcher is not in scope.
-            # This in turn means we have to pass the dispatcher dict along with the path.
-            _measurement_chunk.append(
-                (
-                    _current_project_directory,
-                    self._metrics_dispatcher
-                )
-            )
-            # The chunk is filled to its max value so we send it to the multiprocessing function.
-            if (_projects_measured + 1) % self._multiprocessing_chunk_size == 0:
-                _rows = _run_multiprocessing(_measurement_chunk)
-
-                # Free up memory
-                _measurement_chunk = []
-                # _run_multiprocessing gave us a list with a list item for every project,
-                # we need to ingest every item into the dataframe.
-                for _row in _rows:
-                    self._dataframe = self._dataframe.append(_row, ignore_index=True)
-                yield self._dataframe
-                # We remove the dataframes content to save memory
-                self._dataframe = self._dataframe.iloc[0:0]
-
-        # If we did not have enough projects left for a
-        # full sized chunk, we will cover the rest here.
-        _rows = _run_multiprocessing(_measurement_chunk)
-        _measurement_chunk = []
-        for _row in _rows:
-            self._dataframe = self._dataframe.append(_row, ignore_index=True)
-        yield self._dataframe
-
-def _measure(_project_directory: str, _metrics_dispatcher: dict) -> dict:
+    def _is_selected(self, identifier: str) -> bool:
+        """ Tell if a project is to be measured in this run. """
+        if identifier in self.projects_to_skip:
+            # Already measured projects count as done for other processes, too.
+            self._mark_measured([identifier])
+            return False
+        return self._shard is None or in_shard(identifier, self._shard)
+
+    def _shares_projects(self) -> bool:
+        """ Tell if the project handler shares its projects with other processes. """
+        return hasattr(self.project_handler, 'mark_measured')
+
+    def _mark_measured(self, identifiers: list) -> None:
+        """ Tell handlers sharing their projects with other processes, which are measured.
+
+        This is only done after the rows of the projects were handed over,
+        so a project is measured again, if this process ends before writing them.
+        """
+        if identifiers and self._shares_projects():
+            self.project_handler.mark_measured(identifiers)
+
+    def _mark_failed(self, identifiers: list) -> None:
+        """ Tell handlers sharing their projects, which could not be measured, so they are not retried. """
+        if hasattr(self.project_handler, 'mark_failed'):
+            self.project_handler.mark_failed(identifiers)
+
+    def _get_history(self, project_directory: str) -> tuple:
+        """ The git directory and history mode for a task, None if the current state is measured. """
+        if not self._history:
+            return None
+        return self.project_handler.get_git_dir(project_directory), self._history
+
+class _DiscoveryProgress():
+    """ Iterate over the project directories of a handler and count them. """
+
+    def __init__(self, project_handler):
+        self._project_handler = project_handler
+        self.discovered = 0
+
+    def __iter__(self):
+        for _project_directory in self._project_handler.get_project_directories():
+            self.discovered = self.discovered + 1
+            yield _project_directory
+
+    def finished(self) -> bool:
+        """ If the handler discovered all projects, so the total is known. """
+        return getattr(self._project_handler, 'discovery_finished', lambda: True)()
+
+def _measure(
+        _project_directory: str,
+        _metrics_dispatcher: dict,
+        _source=None,
+        _file_facts: dict = None,
+        _timings: list = None,
+        _profile=None,
+        _file_counts: list = None
+) -> dict:
     """ Iterate over all metrics for one project.
 
     :param _project_directory:  The path to a projects base directory.
     :param _metrics_dispatcher: Dictionary the measurement names as keys and
                                 the measure functions as values.
+    :param _source:             Source of the project files, e.g. a git tree
+                                at an older revision. By default the source
+                                is chosen by the project scope.
+    :param _file_facts:         Dictionary to record the facts about single files in.
+    :param _timings:            List to add a record of the cost of every metric to.
+    :param _profile:            ProjectProfile to profile every metric with.
+    :param _file_counts:        List to add the number of files of the project to.
     """
     _project_measures = {}
-    for _column, _function in _metrics_dispatcher.items():
-        _project_measures[_column] = _function(_project_directory)
+    _records = []
+    # Metrics of the same project share parsed files and indexes.
+    with project_scope(_project_directory, source=_source, file_facts=_file_facts):
+        for _column, _function in _metrics_dispatcher.items():
+            if _profile is not None and _column != 'id':
+                _function = functools.partial(_profile.call, _column, _function)
+            if _timings is None or _column == 'id':
+                _project_measures[_column] = _function(_project_directory)
+                continue
+            _project_measures[_column], _record = recoda.instrumentation.timed_call(
+                _function,
+                _project_directory
+            )
+            _records.append(dict(_record, metric=_column))
+        if _file_counts is not None:
+            # The index is cached by the metrics, so counting is cheap.
+            _file_counts.append(len(get_file_index(_project_directory)))
+    if _timings is not None:
+        # Costs are compared between projects of similar size.
+        for _record in _records:
+            _record['loc'] = _project_measures.get('loc')
+        _timings.extend(_records)
     return _project_measures
 
-def _run_multiprocessing(_chunk: list) -> list:
+def _measure_history(
+        _project_directory: str,
+        _metrics_dispatcher: dict,
+        _git_dir: str,
+        _mode: str,
+        _file_records: list = None,
+        _timing_records: list = None,
+        _profile=None,
+        _file_counts: list = None
+) -> list:
+    """ Measure every revision of a repository, from oldest to newest.
+
+    The tree of each revision is derived from the previous one,
+    so results for single files are only computed for changed files.
+
+    :param _file_records:   List to add the file facts of every revision to.
+    :param _timing_records: List to add the cost of the metrics of every revision to.
+    :param _profile:        ProjectProfile to profile the metrics of all revisions with.
+    :param _file_counts:    List to add the number of files of every revision to.
+    :returns:               A list with a row for every revision.
+    """
+    _rows = []
+    _source = None
+    try:
+        for _revision in recoda.project_handler.git.list_history(_git_dir, _mode):
+            if _source is None:
+                _source = GitTreeSource(_git_dir, _revision.commit)
+            else:
+                _source = _source.at_revision(_revision.commit)
+            _file_facts = None if _file_records is None else {}
+            _timings = None if _timing_records is None else []
+            _row = _measure(
+                _project_directory,
+                _metrics_dispatcher,
+                _source,
+                _file_facts,
+                _timings,
+                _profile,
+                _file_counts
+            )
+            if _timing_records is not None:
+                _timing_records.extend(
+                    dict(_record, revision=_revision.name) for _record in _timings
+                )
+            if _file_records is not None:
+                _file_records.extend(
+                    dict(_record, revision=_revision.name)
+                    for _record in _file_fact_records(_file_facts)
+                )
+            _row['revision'] = _revision.name
+            _row['date'] = _revision.date
+            _rows.append(_row)
+    finally:
+        if _source is not None:
+            _source.close()
+    return _rows
+
+def _measure_task(_task: tuple) -> ProjectResult:
+    """ Unpack a task tuple of project path, identifier, dispatcher, history and options for measuring.
+
+    :returns: The rows measured for the project and, if the options ask
+              for them, the file facts and timings, with the identifier as id,
+              and the profile samples. Its telemetry tells the progress
+              of the run, which worker was busy with it for how long.
+              Projects raising an error have no rows but the traceback,
+              so a single project does not end the whole run.
+    """
+    _project_directory, _identifier, _metrics_dispatcher, _history, _options = _task
+    _started = time.perf_counter()
+    _file_counts = []
+    _error = None
+    try:
+        _rows, _files, _timings, _profile = _measure_project(
+            _project_directory, _identifier, _metrics_dispatcher, _history, _options, _file_counts
+        )
+    except Exception:
+        _rows, _files, _timings, _profile = [], None, None, None
+        _error = traceback.format_exc()
+    return ProjectResult(
+        _identifier,
+        _rows,
+        _files,
+        _timings,
+        _profile,
+        {
+            'worker': '{}:{}'.format(socket.gethostname(), os.getpid()),
+            'seconds': time.perf_counter() - _started,
+            'files': sum(_file_counts),
+        },
+        _error
+    )
+
+def _measure_project(
+        _project_directory: str,
+        _identifier: str,
+        _metrics_dispatcher: dict,
+        _history: tuple,
+        _options: dict,
+        _file_counts: list
+) -> tuple:
+    """ Measure the project of a task.
+
+    :returns: The rows, file facts, timings and profile samples of the project.
+    """
+    _files = [] if _options.get('file_facts') else None
+    _timings = [] if _options.get('timings') else None
+    _profile = None
+    if _options.get('profile'):
+        _profile = recoda.profiling.ProjectProfile(**_options['profile'])
+    if _history is None:
+        _file_facts = None if _files is None else {}
+        _rows = [_measure(
+            _project_directory,
+            _metrics_dispatcher,
+            _file_facts=_file_facts,
+            _timings=_timings,
+            _profile=_profile,
+            _file_counts=_file_counts
+        )]
+        if _files is not None:
+            _files = _file_fact_records(_file_facts)
+    else:
+        _rows = _measure_history(
+            _project_directory, _metrics_dispatcher, *_history, _files, _timings, _profile,
+            _file_counts
+        )
+    for _row in _rows + (_files or []) + (_timings or []):
+        _row['id'] = _identifier
+    return _rows, _files, _timings, None if _profile is None else _profile.result()
+
+def _file_fact_records(file_facts: dict) -> list:
+    """ Turn the file facts of a project scope into records with the file path. """
+    return [
+        dict(_facts, file=_file)
+        for _file, _facts in sorted(file_facts.items())
+    ]
+
+def _run_multiprocessing(_tasks, _processes: int):
     """ Run project measurements in parallel.
 
     This needs to be outside the object, calling it.
@@ -234,67 +977,209 @@ def _run_multiprocessing(_chunk: list) -> list:
     to pickle.
     This also created the need to pass the the dispatcher to the
     non member functions, to iterate over it.
-    Using starmap enables us to pass two arguments, path and
-    dispatcher dictionary, to the function handled
-    by multiprocessing.
-
-    :param _chunk: A list of tuples. The first element
-                   is the path to a project. The second
-                   a dictionary with measurement functions
-                   that are supposed to be executed with the path.
+
+    One pool is used for the whole run. It consumes the tasks
+    in a background thread, so projects are discovered while
+    workers already measure earlier ones.
+    Only a few tasks more than there are workers are taken
+    from _tasks ahead of time, so handlers handing out projects
+    on demand, like work queues, do not give away all at once.
+    Rows are yielded as soon as a project is measured.
+
+    :param _tasks:      An iterable of tuples. The first element
+                        is the path to a project. The second its identifier.
+                        The third a dictionary with measurement functions
+                        that are supposed to be executed with the path.
+                        The fourth the git directory and history mode,
+                        if the history of the project is measured.
+                        The fifth a dictionary of options, e.g. to gather file facts.
+    :param _processes:  Number of worker processes.
+    :returns:           A ProjectResult for every project.
     """
-    _measure_pool = Pool()
-    _rows_of_project_measures = _measure_pool.starmap(
-        _measure,
-        _chunk
-    )
-    _measure_pool.close()
-    return _rows_of_project_measures
+    _free_slots = threading.Semaphore(2 * _processes)
+    _stopping = threading.Event()
+
+    def _limited_tasks():
+        # A slot is taken before the next task is created,
+        # so no project is claimed while waiting for it.
+        _remaining = iter(_tasks)
+        while True:
+            _free_slots.acquire()
+            _task = next(_remaining, None)
+            if _task is None or _stopping.is_set():
+                return
+            yield _task
+
+    _measure_pool = Pool(processes=_processes)
+    try:
+        for _result in _measure_pool.imap_unordered(_measure_task, _limited_tasks()):
+            _free_slots.release()
+            yield _result
+    finally:
+        # Wake up the task generation, so the pool can be stopped.
+        _stopping.set()
+        _free_slots.release()
+        _measure_pool.terminate()
+        _measure_pool.join()
 
 
 def _main():
     """ Main function for executing from the command line. """
+    if sys.argv[1:2] == ['merge']:
+        _merge_main()
+        return
+    if sys.argv[1:2] == ['worker']:
+        _worker_main()
+        return
+    if sys.argv[1:2] == ['report']:
+        _report_main()
+        return
+
     _arguments = parse_arguments()
 
-    # Git is currently the only project handler type.
-    if _arguments.project_type == 'git':
-        _handler = recoda.project_handler.git.Handler(_arguments.base_dir)
+    if _arguments.projects_from:
+        _handler = recoda.project_handler.project_list.Handler(_arguments.projects_from)
+    elif _arguments.project_type == 'git':
+        _handler = recoda.project_handler.git.Handler(
+            _arguments.base_dir,
+            max_depth=_arguments.depth
+        )
+    elif _arguments.project_type == 'directory':
+        _handler = recoda.project_handler.directory.Handler(
+            _arguments.base_dir,
+            max_depth=_arguments.depth
+        )
+    elif _arguments.project_type == 'archive':
+        _handler = recoda.project_handler.archive.Handler(
+            _arguments.base_dir,
+            max_depth=_arguments.depth
+        )
     else:
         raise ValueError('Project type not supported.')
 
-    _already_measured = _get_already_measured_projects(_arguments.file_output)
+    if _arguments.history and not hasattr(_handler, 'get_git_dir'):
+        raise ValueError('Histories can only be measured for git repositories.')
 
+    if _arguments.queue:
+        if _arguments.shard:
+            raise ValueError('Projects of a queue can not be sharded.')
+        if _arguments.history:
+            raise ValueError('Histories can not be measured from a queue.')
+        _handler = recoda.project_handler.work_queue.Handler(
+            recoda.project_handler.work_queue.WorkQueue(
+                _arguments.queue,
+                lease_seconds=_arguments.lease
+            ),
+            project_handler=_handler
+        )
+
+    _runner = None
+    if _arguments.serve:
+        if _arguments.queue:
+            raise ValueError('Runs serving workers can not claim projects from a queue.')
+        _runner = recoda.fleet.Coordinator(
+            _arguments.serve,
+            _authkey(_arguments.authkey),
+            lease_seconds=_arguments.lease
+        ).run
+
+    _already_measured = []
+    if not _arguments.remeasure:
+        _already_measured = read_measured_ids(_arguments.file_output, _arguments.format)
+
+    _file_facts_writer = None
+    if _arguments.file_facts:
+        _file_facts_writer = open_writer(
+            _arguments.file_facts,
+            _arguments.format,
+            MeasureProjects.file_fact_types(bool(_arguments.history))
+        )
+    _profile_collector = None
+    if _arguments.profile:
+        _profile_collector = recoda.profiling.ProfileCollector(
+            _arguments.profile,
+            memory=_arguments.profile_memory
+        )
+    elif _arguments.profile_memory:
+        raise ValueError('--profile-memory needs --profile.')
+    _timings_writer = None
+    if _arguments.timings:
+        _timings_writer = open_writer(
+            _arguments.timings,
+            _arguments.format,
+            MeasureProjects.timing_types(bool(_arguments.history))
+        )
 
     _measurement_object = MeasureProjects(
         project_measure_handler=_handler,
         language=_arguments.language,
         multiprocessing_chunk_size=_arguments.processes,
-        projects_to_skip=_already_measured
+        projects_to_skip=_already_measured,
+        history=_arguments.history,
+        shard=_arguments.shard,
+        runner=_runner,
+        file_facts_writer=_file_facts_writer,
+        timings_writer=_timings_writer,
+        profile_collector=_profile_collector,
+        progress=recoda.progress.Progress(
+            interval=_arguments.progress_interval,
+            status_path=_arguments.status
         )
-    _measurement_generator = _measurement_object.measure()
-
-    # We want to print a header, if we create a new file.
-    if not os.path.isfile(_arguments.file_output):
-        _dataframe = next(_measurement_generator)
-        _dataframe.to_csv(path_or_buf=_arguments.file_output)
-
-    for _dataframe in _measurement_generator:
-        with open(_arguments.file_output, 'a') as fileout:
-            _dataframe.to_csv(fileout, header=False)
-
-def _get_already_measured_projects(file_path: str) -> list:
-    """ Parse file output if exist and get projects already measured. """
-    _already_measured_projects = list()
-
-    if not os.path.isfile(path=file_path):
-        return _already_measured_projects
+        )
+    _writer = open_writer(
+        _arguments.file_output,
+        _arguments.format,
+        _measurement_object.column_types()
+    )
+    try:
+        for _dataframe in _measurement_object.measure():
+            _writer.write(_dataframe)
+    finally:
+        _writer.close()
+        if _file_facts_writer is not None:
+            _file_facts_writer.close()
+        if _timings_writer is not None:
+            _timings_writer.close()
+        if _profile_collector is not None:
+            _profile_collector.close()
+            print('Profile written to', _arguments.profile, 'and', _arguments.profile + '.txt')
 
-    with open(file_path, 'r') as csv_file:
-        _dataframe = pandas.read_csv(csv_file)
+def _merge_main():
+    """ Combine output files for recoda merge. """
+    _arguments = parse_merge_arguments(sys.argv[2:])
+    _column_types = {'id': str, 'revision': str, 'date': str}
+    _column_types.update(MeasureProjects.file_fact_types(history=True))
+    _column_types.update(MeasureProjects._METRIC_TYPES)
+    _rows = merge_files(
+        _arguments.input_files,
+        _arguments.file_output,
+        output_format=_arguments.format or format_of(_arguments.file_output),
+        column_types=_column_types,
+        newest_by=_arguments.newest_by
+    )
+    print(_rows, 'rows written to', _arguments.file_output)
 
-    _already_measured_projects = _dataframe['id'].tolist()
+def _report_main():
+    """ Print the costs of the metrics for recoda report. """
+    _arguments = parse_report_arguments(sys.argv[2:])
+    _by_metric, _by_size = recoda.instrumentation.summarise(_arguments.timing_files)
+    with pandas.option_context('display.width', 200, 'display.max_columns', None):
+        print('Cost by metric, most expensive first:')
+        print(_by_metric.to_string(float_format='{:.3f}'.format))
+        print()
+        print('Cost by project size in lines of code:')
+        print(_by_size.to_string(float_format='{:.3f}'.format))
 
-    return _already_measured_projects
+def _worker_main():
+    """ Measure projects of a coordinating run for recoda worker. """
+    _arguments = parse_worker_arguments(sys.argv[2:])
+    _measured = recoda.fleet.run_worker(
+        _arguments.coordinator,
+        _authkey(_arguments.authkey),
+        _run_multiprocessing,
+        _arguments.processes
+    )
+    print(_measured, 'projects measured for', '{}:{}'.format(*_arguments.coordinator))
 
 if __name__ == '__main__':
     _main()
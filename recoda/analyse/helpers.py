@@ -1,8 +1,14 @@
 """ Module to share commonly used functionality in the analyse package. """
 
+import fnmatch
 import glob
+import mmap
 import sys
 import os
+from contextlib import contextmanager
+from typing import Any, Callable
+
+import numpy
 
 # To convert restructuredText to html
 from docutils.core import publish_string
@@ -12,6 +18,197 @@ from markdown import markdown
 # To extract text from html.
 from bs4 import BeautifulSoup
 
+from recoda.analyse.sources import is_archive, is_bare_repository, open_source
+
+# Intermediate results shared between the metrics of the project,
+# that is currently measured. Keyed by project path and then by
+# the name of the result.
+_PROJECT_SCOPES = {}
+
+# Results of single files, that project scopes can record as file facts.
+# Keyed by the name of the result, with the columns and types it fills.
+# Results with several columns are tuples.
+FILE_FACT_COLUMNS = {
+    'non_blank_lines': (('non_blank_lines', int),),
+    'comment_density': (('comment_density', float),),
+    'error_density': (('error_density', float),),
+    'style_offences': (('physical_lines', int), ('style_offences', int)),
+    'flesch_reading_ease': (('flesch_reading_ease', float),),
+    'flesch_kincaid_grade': (('flesch_kincaid_grade', float),),
+}
+
+@contextmanager
+def project_scope(project_path: str, source=None, file_facts: dict = None):
+    """ Share intermediate results between all metrics of one project.
+
+    Several metrics walk and parse the same files of a project.
+    Inside this context the results of helpers using cached()
+    are computed once and handed to every metric asking for them.
+    Outside of it nothing is kept, so measuring a directory,
+    that changes between calls, always sees its current state.
+
+    :param project_path: Full path to the project being measured.
+    :param source:       The source to read the files of the project from,
+                         e.g. a git tree at an older revision. It stays open
+                         after the scope. By default the source is opened
+                         by open_source() and closed with the scope.
+    :param file_facts:   Dictionary to record the results of single files in,
+                         as listed in FILE_FACT_COLUMNS. They are keyed by the
+                         path of the file relative to the project and then by column.
+    """
+    _PROJECT_SCOPES[project_path] = {} if source is None else {'source': source}
+    if file_facts is not None:
+        _PROJECT_SCOPES[project_path]['file_facts'] = file_facts
+    try:
+        yield
+    finally:
+        # Free the memory of the parsed project right away.
+        _scope = _PROJECT_SCOPES.pop(project_path, None)
+        if source is None and _scope and 'source' in _scope:
+            _scope['source'].close()
+
+def cached(project_path: str, key: str, factory: Callable[[], Any]) -> Any:
+    """ Return a result shared inside the project_scope of a project.
+
+    :param project_path: Full path to the project being measured.
+    :param key:          Name of the intermediate result.
+    :param factory:      Function without arguments computing the result.
+    :returns:            The stored result if the project is in scope
+                         and it was already computed, a fresh one otherwise.
+    """
+    _scope = _PROJECT_SCOPES.get(project_path)
+    if _scope is None:
+        return factory()
+    if key not in _scope:
+        _scope[key] = factory()
+    return _scope[key]
+
+def file_fact(project_path: str, file_path: str, key: str, factory: Callable[[], Any]) -> Any:
+    """ Return a result computed from the content of a single file.
+
+    Sources, that address files by their content, keep these results.
+    When a history is measured, they are only computed again
+    for the files, that changed between two revisions.
+
+    :param project_path: Full path to the project.
+    :param file_path:    Full path to the file.
+    :param key:          Name of the result.
+    :param factory:      Function without arguments computing the result.
+    """
+    _source = get_source(project_path)
+    _object_id = _source.object_id(os.path.relpath(file_path, project_path))
+    if _object_id is None:
+        return _record_file_fact(project_path, file_path, key, factory())
+    if (_object_id, key) not in _source.facts:
+        _source.facts[(_object_id, key)] = factory()
+    return _record_file_fact(project_path, file_path, key, _source.facts[(_object_id, key)])
+
+def _record_file_fact(project_path: str, file_path: str, key: str, value: Any) -> Any:
+    """ Keep a result of a single file, if the project scope records file facts.
+
+    Values of other types than their columns, like False for
+    the error density of empty files, are recorded as missing.
+
+    :returns: The value.
+    """
+    _file_facts = _PROJECT_SCOPES.get(project_path, {}).get('file_facts')
+    if _file_facts is None or key not in FILE_FACT_COLUMNS:
+        return value
+    _columns = FILE_FACT_COLUMNS[key]
+    _values = value if len(_columns) > 1 else (value,)
+    _record = _file_facts.setdefault(os.path.relpath(file_path, project_path), {})
+    for (_column, _), _value in zip(_columns, _values):
+        _is_number = isinstance(_value, (int, float)) and not isinstance(_value, bool)
+        _record[_column] = _value if _is_number else None
+    return value
+
+def get_source(project_path: str):
+    """ The source all files of a project are read from.
+
+    Inside a project_scope the source is opened once,
+    e.g. starting a single git process for a bare repository,
+    and closed when the scope ends. Outside of it only directories
+    can be read, since other sources would be opened again for every
+    file and never closed.
+
+    :param project_path: Full path to the project.
+    :returns:            A source from recoda.analyse.sources.
+    """
+    if project_path not in _PROJECT_SCOPES and (
+            is_archive(project_path) or is_bare_repository(project_path)
+    ):
+        raise ValueError(
+            'Bare repositories and archives are only read inside a project_scope: ' + project_path
+        )
+    return cached(project_path, 'source', lambda: open_source(project_path))
+
+def get_file_index(project_path: str) -> tuple:
+    """ List all files of a project once.
+
+    Like the globs of search_filename, the index leaves out
+    files and folders with names starting with a dot.
+
+    :param project_path: Full path to the project.
+    :returns:            Paths of all files relative to the project path.
+    """
+    return cached(project_path, 'file_index', lambda: get_source(project_path).list_files())
+
+def find_files(project_path: str, file_name: str, recursive_flag: bool = True) -> list:
+    """ Search the file index of a project for a file name or glob.
+
+    :param project_path:    Full path to the project.
+    :param file_name:       File name or glob matched against the file names only.
+    :param recursive_flag:  Also search the sub folders of the project.
+    :returns:               Full paths to all files matching file_name.
+    """
+    return [
+        os.path.join(project_path, _path)
+        for _path in get_file_index(project_path)
+        if (recursive_flag or os.sep not in _path)
+        and fnmatch.fnmatchcase(os.path.basename(_path), file_name)
+    ]
+
+def read_file(project_path: str, file_path: str) -> bytes:
+    """ Read the content of a project file from the source of the project.
+
+    :param project_path: Full path to the project.
+    :param file_path:    Full path to the file, as returned by find_files.
+    :returns:            The raw content of the file.
+    """
+    return get_source(project_path).read_bytes(os.path.relpath(file_path, project_path))
+
+def read_text(project_path: str, file_path: str, encoding: str = 'utf-8', errors: str = 'replace') -> str:
+    """ Read and decode a project file, with universal newlines like open() in text mode. """
+    _content = read_file(project_path, file_path).decode(encoding, errors)
+    return _content.replace('\r\n', '\n').replace('\r', '\n')
+
+def file_size(project_path: str, file_path: str) -> int:
+    """ Size of a project file in bytes. """
+    return get_source(project_path).size(os.path.relpath(file_path, project_path))
+
+def count_project_file_lines(project_path: str, file_path: str) -> int:
+    """ Count the non blank lines of a project file.
+
+    Files in the local file system are memory mapped if they are large,
+    other files are counted on their content.
+    """
+    _relative_path = os.path.relpath(file_path, project_path)
+    _source = get_source(project_path)
+    _local_path = _source.local_path(_relative_path)
+    if _local_path is not None:
+        return _record_file_fact(
+            project_path,
+            file_path,
+            'non_blank_lines',
+            count_non_blank_lines(_local_path)
+        )
+    return file_fact(
+        project_path,
+        file_path,
+        'non_blank_lines',
+        lambda: count_non_blank_lines_in_bytes(_source.read_bytes(_relative_path))
+    )
+
 def search_filename(
         base_folder: str,
         file_name: str,
@@ -42,6 +239,73 @@ def search_filename(
 
     return _findings
 
+# Files from this size on are memory mapped and classified with numpy.
+# Smaller files are faster to read and split in one go.
+_LARGE_FILE_SIZE = 1 << 20
+_BLOCK_SIZE = 1 << 23
+
+# Byte classes for counting lines:
+# 0 for blank characters, 1 for content and 2 for line breaks.
+_BYTE_CLASSES = numpy.ones(256, dtype=numpy.uint8)
+_BYTE_CLASSES[list(b' \t\x0b\x0c')] = 0
+_BYTE_CLASSES[list(b'\n\r')] = 2
+
+def count_non_blank_lines(file_path: str) -> int:
+    """ Count the lines of a file, that contain more than whitespace.
+
+    Lines are classified on the raw bytes, without decoding the file.
+    Like lines in text mode, they may end with a line feed,
+    a carriage return or both.
+    Only ASCII whitespace counts as blank.
+
+    :param file_path: Full path to the file.
+    :returns:         The number of non blank lines.
+    """
+    with open(file_path, 'rb') as _file:
+        _size = os.fstat(_file.fileno()).st_size
+        if _size < _LARGE_FILE_SIZE:
+            return count_non_blank_lines_in_bytes(_file.read())
+        with mmap.mmap(_file.fileno(), 0, access=mmap.ACCESS_READ) as _buffer:
+            return _count_non_blank_lines_in_buffer(_buffer, _size)
+
+def count_non_blank_lines_in_bytes(content: bytes) -> int:
+    """ Count the non blank lines of content, that is already in memory. """
+    if len(content) < _LARGE_FILE_SIZE:
+        return sum(1 for _line in content.splitlines() if _line.strip())
+    return _count_non_blank_lines_in_buffer(content, len(content))
+
+def _count_non_blank_lines_in_buffer(buffer, size: int) -> int:
+    """ Count non blank lines of a large buffer block by block with numpy.
+
+    Leaving out blank characters, a line is not blank, if a content
+    byte is directly followed by a line break or the end of the buffer.
+    """
+    _lines = 0
+    _last_class = 0
+    for _offset in range(0, size, _BLOCK_SIZE):
+        _block = numpy.frombuffer(
+            buffer,
+            dtype=numpy.uint8,
+            count=min(_BLOCK_SIZE, size - _offset),
+            offset=_offset
+        )
+        _classes = _BYTE_CLASSES[_block]
+        _classes = _classes[_classes != 0]
+        # The view on the buffer has to be released before it is closed.
+        del _block
+        if not _classes.size:
+            continue
+        if _last_class == 1 and _classes[0] == 2:
+            _lines = _lines + 1
+        _lines = _lines + int(numpy.count_nonzero(
+            (_classes[:-1] == 1) & (_classes[1:] == 2)
+        ))
+        _last_class = _classes[-1]
+
+    if _last_class == 1:
+        _lines = _lines + 1
+    return _lines
+
 # The strip functions are indirectly testet by tests for learnability metrics.
 def strip_text_from_html(html_content: str) -> str:
     """ Strips pure text from strings containing html. """
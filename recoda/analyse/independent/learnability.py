@@ -6,7 +6,10 @@ import warnings
 
 import numpy
 from recoda.analyse.helpers import (
-    search_filename,
+    file_fact,
+    file_size,
+    find_files,
+    read_text,
     strip_text_from_md,
     strip_text_from_rst
 )
@@ -24,7 +27,7 @@ def project_readme_size(project_path: str) -> int:
     _words = 0
 
     try:
-        _readme_string = _strip_text(_doc_file).strip()
+        _readme_string = _strip_text(project_path, _doc_file).strip()
         _words = len(re.split(r'\s', _readme_string))
     except:
         return 0
@@ -43,7 +46,7 @@ def project_doc_size(project_path: str) -> int:
 
     for _doc_file in _doc_files:
         try:
-            _readme_string = _strip_text(_doc_file).strip()
+            _readme_string = _strip_text(project_path, _doc_file).strip()
             _words = _words + len(re.split(r'\s', _readme_string))
         except:
             continue
@@ -81,10 +84,16 @@ def flesch_reading_ease(project_path: str, full_docs: bool = True) -> int:
 
     for _doc_file in _doc_files:
         try:
-            _readme_string = _strip_text(_doc_file)
+            _readme_string = _strip_text(project_path, _doc_file)
             if not _readme_string:
                 continue
-            _scores.append(textstat.flesch_reading_ease(_readme_string))
+            # Scores of single files are kept as file facts.
+            _scores.append(file_fact(
+                project_path,
+                _doc_file,
+                'flesch_reading_ease',
+                lambda: textstat.flesch_reading_ease(_readme_string)
+            ))
         except:
             continue
 
@@ -121,10 +130,16 @@ def flesch_kincaid_grade(project_path: str, full_docs: bool = True) -> int:
 
     for _doc_file in _doc_files:
         try:
-            _readme_string = _strip_text(_doc_file)
+            _readme_string = _strip_text(project_path, _doc_file)
             if not _readme_string:
                 continue
-            _scores.append(textstat.flesch_kincaid_grade(_readme_string))
+            # Scores of single files are kept as file facts.
+            _scores.append(file_fact(
+                project_path,
+                _doc_file,
+                'flesch_kincaid_grade',
+                lambda: textstat.flesch_kincaid_grade(_readme_string)
+            ))
         except:
             continue
 
@@ -148,9 +163,9 @@ def _get_main_readme(project_path: str) -> str:
 
     for _suffix in _doc_files_suffixes:
         _doc_files.extend(
-            search_filename(
-                base_folder=project_path,
-                file_name="[Rr][Ee][Aa][Dd][Mm][Ee]"+_suffix,
+            find_files(
+                project_path,
+                "[Rr][Ee][Aa][Dd][Mm][Ee]"+_suffix,
                 recursive_flag=False
             )
         )
@@ -163,8 +178,8 @@ def _get_main_readme(project_path: str) -> str:
     _file_size = -1
     _doc_file = ''
     for _file in _doc_files:
-        if os.path.getsize(_file) > _file_size:
-            _file_size = os.path.getsize(_file)
+        if file_size(project_path, _file) > _file_size:
+            _file_size = file_size(project_path, _file)
             _doc_file = _file
 
 
@@ -178,28 +193,16 @@ def _get_doc_files(project_path: str) -> list:
     _doc_files = set()
 
     for _suffix in _doc_files_suffixes:
-        _doc_files.update(
-            search_filename(
-                base_folder=project_path,
-                file_name="*"+_suffix,
-                recursive_flag=True
-            )
-        )
+        _doc_files.update(find_files(project_path, "*"+_suffix))
     for _suffix in _readme_files_suffixes:
-        _doc_files.update(
-            search_filename(
-                base_folder=project_path,
-                file_name="[Rr][Ee][Aa][Dd][Mm][Ee]"+_suffix,
-                recursive_flag=True
-            )
-        )
+        _doc_files.update(find_files(project_path, "[Rr][Ee][Aa][Dd][Mm][Ee]"+_suffix))
 
     if not _doc_files:
         return None
 
     return _doc_files
 
-def _strip_text(_doc_file: str) -> str:
+def _strip_text(project_path: str, _doc_file: str) -> str:
     """ Determines filetype of Docfile and calls the strip function to call.
 
     :returns: Input text without the markup parts.
@@ -207,16 +210,25 @@ def _strip_text(_doc_file: str) -> str:
     # Easy way to ignore the case of the original suffix.
     _file_name_lowercased = os.path.basename(_doc_file).lower()
 
-    _doc_string = ''
-    if not os.path.isfile(_doc_file):
+    if not _doc_file:
         return ""
 
-    with open(_doc_file, 'r') as file:
-        if re.match(r'^.*\.md$', _file_name_lowercased):
-            _doc_string = strip_text_from_md(file.read())
-        elif re.match(r'^.*\.rst$', _file_name_lowercased):
-            _doc_string = strip_text_from_rst(file.read())
-        else:
-            _doc_string = file.read()
-
-    return _doc_string
+    return file_fact(
+        project_path,
+        _doc_file,
+        # The same content is stripped differently depending on the suffix.
+        'stripped_text' + os.path.splitext(_file_name_lowercased)[1],
+        lambda: _strip_content(
+            _file_name_lowercased,
+            # Files, that cannot be decoded, raise and are skipped by the callers.
+            read_text(project_path, _doc_file, errors='strict')
+        )
+    )
+
+def _strip_content(file_name: str, content: str) -> str:
+    """ Strip the markup from the content of a file with a lowercased file_name. """
+    if re.match(r'^.*\.md$', file_name):
+        return strip_text_from_md(content)
+    if re.match(r'^.*\.rst$', file_name):
+        return strip_text_from_rst(content)
+    return content
@@ -1,8 +1,11 @@
 """ All metrics functions measuring the understandability subfactor. """
 
 import json
+import os
 from subprocess import Popen, PIPE
 
+from recoda.analyse.helpers import get_source
+
 _APACHE_SNIPPET = 'the Apache License, Version 2.0'
 
 def license_type(project_path: str) -> str:
@@ -16,7 +19,15 @@ def license_type(project_path: str) -> str:
     :param project_path: Path to the root folder of a project.
     :returns:            Name of the license with the highest
                          confidence value in the licensee output.
+                         None when the revisions of a history are measured
+                         or the project is an archive, since licensee only reads
+                         the current state of directories and repositories.
     """
+    if getattr(get_source(project_path), 'revision', 'HEAD') != 'HEAD':
+        return None
+    if not os.path.isdir(project_path):
+        return None
+
     _process = Popen(
         [
             "licensee",
@@ -1,14 +1,13 @@
 """ Measures that concern themselves with the correctness of projects. """
 
-import os
-import re
 import warnings
 from io import StringIO
 from typing import Union
 
 import numpy
-from pyflakes.api import checkPath
+from pyflakes.api import check
 from pyflakes.reporter import Reporter
+from recoda.analyse.helpers import count_project_file_lines, file_fact, read_file
 from recoda.analyse.python.helpers import get_python_files
 
 def project_errors(project_path:str) -> int:
@@ -30,10 +29,16 @@ def error_density(project_path: str) -> float:
 
     _scores = list()
     for _file_path in _python_files:
-        if os.path.isfile(_file_path):
-            _score = _get_error_density(_file_path)
-        else:
-            _score = None
+        try:
+            _score = file_fact(
+                project_path,
+                _file_path,
+                'error_density',
+                lambda _file_path=_file_path: _get_error_density(project_path, _file_path)
+            )
+        except OSError:
+            # Files, that vanished or cannot be read, are skipped.
+            continue
         if _score is None:
             continue
             #return None
@@ -49,7 +54,7 @@ def error_density(project_path: str) -> float:
         return numpy.nanmean(_scores)
 
 
-def _get_error_density(_file_path: str) -> Union[float, bool]:
+def _get_error_density(project_path: str, _file_path: str) -> Union[float, bool]:
     """ Get standard compliance for a single file. """
 
     _output_handler = StringIO()
@@ -57,7 +62,9 @@ def _get_error_density(_file_path: str) -> Union[float, bool]:
     _pyflake_reporter = Reporter(_output_handler, _error_handler)
 
 
-    checkPath(_file_path, _pyflake_reporter)
+    # The content is handed to pyflakes, since the file
+    # does not need to exist in the local file system.
+    check(read_file(project_path, _file_path), _file_path, _pyflake_reporter)
 
     _error_handler.close()
     _error_handler = None
@@ -85,15 +92,7 @@ def _get_error_density(_file_path: str) -> Union[float, bool]:
     if _errors is None:
         return None
 
-    _file = open(_file_path, 'r', encoding='utf-8', errors='ignore')
-
-    _line_number = 0
-    for _line in _file.readlines():
-        if re.match(r'^\s*$', _line):
-            continue
-        _line_number = _line_number + 1
-
-    _file.close()
+    _line_number = count_project_file_lines(project_path, _file_path)
 
     if _line_number == 0:
         return False
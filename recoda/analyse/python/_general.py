@@ -1,6 +1,5 @@
 """ General metrics potentially used for calculating several quality aspects. """
-import os
-import re
+from recoda.analyse.helpers import count_project_file_lines
 from recoda.analyse.python.helpers import get_python_files
 
 def count_loc(project_path: str) -> int:
@@ -14,18 +13,14 @@ def count_loc(project_path: str) -> int:
     _loc = 0
 
     for _file_path in _python_files:
-        if os.path.isfile(_file_path):
-            _loc = _loc + _single_file_loc(_file_path)
+        try:
+            _loc = _loc + _single_file_loc(project_path, _file_path)
+        except OSError:
+            # Files, that vanished or cannot be read, are skipped.
+            continue
 
     return _loc
 
-def _single_file_loc(file_path: str) -> int:
+def _single_file_loc(project_path: str, file_path: str) -> int:
     """ Count LOC for one file. """
-    _loc = 0
-    _file = open(file_path, 'r', errors='ignore')
-    for line in _file:
-        if not re.match(r'^\s*$', line):
-            _loc = _loc + 1
-
-    return _loc
-
+    return count_project_file_lines(project_path, file_path)
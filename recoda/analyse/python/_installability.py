@@ -1,6 +1,5 @@
 """ All metrics measuring th installability subfactor. """
 
-import ast
 import os
 import re
 import tempfile
@@ -8,9 +7,15 @@ from typing import Union
 
 from setuptools import find_namespace_packages
 
-import astroid
 from pipreqs import pipreqs
-from recoda.analyse.helpers import search_filename
+from recoda.analyse.helpers import find_files, read_text, search_filename
+from recoda.analyse.python.helpers import (
+    get_distribution_names,
+    get_external_imports,
+    get_import_index,
+    normalise_requirement
+)
+from recoda.analyse.python.metadata import get_declarative_metadata, get_setup_scripts
 
 
 def packageability(project_path: str) -> int:
@@ -21,89 +26,65 @@ def packageability(project_path: str) -> int:
     If at least one such setup.p file exists,
     the package is judged to be potentially packageable.
 
+    Declarative package metadata in a setup.cfg or pyproject.toml
+    also counts. If it exists, setup scripts are not analysed at all.
+
     :param project: Represents a software Project somewhere in local storage.
     :returns:       Projects potential packageability.
     """
-    _setup_file_folders = _get_setup_locations(project_path)
-
-    _packageable_setup_files = []
-    for _folder in _setup_file_folders:
-        _file = _folder+'/setup.py'
-        if os.path.isfile(_file):
-            _setup_file = open(_file, 'r', encoding='utf-8', errors='replace')
-        else:
-            continue
-        _setup_file_content = _setup_file.read()
-        try:
-            _setup_node = astroid.parse(_setup_file_content)
-        except astroid.exceptions.AstroidSyntaxError:
-            return None
-        if _astroid_setup_search(_setup_node):
-            _packageable_setup_files.append(1)
-        elif _regex_setup_search(_setup_file_content):
-            _packageable_setup_files.append(1)
-        else:
-            _packageable_setup_files.append(0)
-
-        # Clean up
-        _setup_file_content = None
-        _setup_file.close()
-
-    if not _packageable_setup_files:
+    if any(_metadata.package for _metadata in get_declarative_metadata(project_path)):
+        return True
+
+    _setup_scripts = get_setup_scripts(project_path)
+
+    if not _setup_scripts:
         return 0
 
-    if 1 in _packageable_setup_files:
-        return True
-    else:
-        return False
+    # We cannot judge setup files, that are no valid python.
+    if not all(_script.parsed for _script in _setup_scripts):
+        return None
+
+    return any(_script.setup_call for _script in _setup_scripts)
 
 
 def requirements_declared(project_path: str) -> Union[float, str]:
     """ Calculates percentage of not declared dependencies. """
-    _declared_requirements = _get_requirements_from_file(path=project_path)
-    _setup_requirements = _get_requirements_from_setup(path=project_path)
-    try:
-        _implied_dependencies = pipreqs.get_pkg_names(
-            pipreqs.get_all_imports(
-                path=project_path,
-                encoding='ISO-8859-1',
-                
-            )
-        )
-    except (IndentationError, SyntaxError, ValueError):
+    # Like pipreqs, we give up on projects with unparsable scripts,
+    # since their imports are incomplete.
+    if get_import_index(project_path).parse_errors:
         return None
-    
+    _implied_dependencies = get_distribution_names(
+        get_external_imports(project_path)
+    )
+
     # We cannot calculate a percentage for declared dependencies,
     # if there are no dependencies through imports.
     if not _implied_dependencies:
         return None
+
+    _declared_requirements = _get_requirements_from_file(path=project_path)
+    _setup_requirements = _get_requirements_from_metadata(path=project_path)
     if (not _declared_requirements) and (_setup_requirements is None):
         return "Error"
     if _setup_requirements is None:
         # If this is None,
-        # there was a problem parsing the setup file.
+        # there was a problem parsing the setup files.
         # This is handled in the if statement above.
-        # If we still calculate further, this needs
-        # to be iterable since we make an "in" comparison with it.
-        _setup_requirements = []
+        _setup_requirements = set()
 
-    _correctly_declared_requirements_count = len(_implied_dependencies)
-    for requirement in _implied_dependencies:
-        if requirement not in _declared_requirements and requirement not in _setup_requirements:
-            _correctly_declared_requirements_count = _correctly_declared_requirements_count - 1
+    # All names are normalised, so matching them is a set operation.
+    _correctly_declared_requirements = _implied_dependencies & (
+        _declared_requirements | _setup_requirements
+    )
 
-    return float(_correctly_declared_requirements_count) / len(_implied_dependencies)
+    return float(len(_correctly_declared_requirements)) / len(_implied_dependencies)
 
 def docker_setup(project_path: str) -> bool:
     """ Tries to find evidence of a docker setup in the project. """
     _file_names = ['[Dd]ockerfile', '[Dd]ocker-compose.yml']
 
     for name in _file_names:
-        _findings = search_filename(
-            base_folder=project_path,
-            file_name=name,
-            recursive_flag=True
-        )
+        _findings = find_files(project_path, name)
         if _findings:
             return True
 
@@ -114,11 +95,7 @@ def singularity_setup(project_path: str) -> bool:
     _file_names = ['[Ss]ingularity.*', '[Ss]ingularity']
 
     for name in _file_names:
-        _findings = search_filename(
-            base_folder=project_path,
-            file_name=name,
-            recursive_flag=True
-        )
+        _findings = find_files(project_path, name)
         if _findings:
             return True
 
@@ -128,48 +105,70 @@ def _get_requirements_from_file(path: str) -> set:
     """ Returns a list of requirements parsed from all requirements files insode a path.
 
     :param path: Full path to a python software project.
-    :returns:    A set of all requirements found in requirements.txt files.
+    :returns:    A set of the normalised names of all requirements
+                 found in requirements.txt files.
     """
-    _file_string = 'requirements.txt'
-    _file_list = search_filename(
-        base_folder=path,
-        file_name=_file_string
-    )
+    _file_list = find_files(path, 'requirements.txt')
     _requirements_content = set()
 
     for file_name in _file_list:
-        for requirement in pipreqs.parse_requirements(file_=file_name):
-            _requirements_content.add(requirement['name'])
-
+        for _line in read_text(path, file_name).splitlines():
+            # Like pipreqs.parse_requirements, only lines
+            # starting with a letter are requirements.
+            _line = _line.strip()
+            if not _line[:1].isalpha():
+                continue
+            _requirements_content.add(normalise_requirement(_line))
 
     return _requirements_content
 
-def _get_requirements_from_setup(path: str) -> str:
+def _get_requirements_from_metadata(path: str) -> set:
+    """ Extract requirements declared in the packaging metadata of a project.
+
+    Declarative files are preferred. Setup scripts are only
+    analysed, if none of those declares requirements.
+
+    :param path: Full path to the location of a python software project.
+    :returns:    The normalised names of all declared requirements,
+                 None if none could be found, because parsing failed.
+    """
+    _declarative_requirements = [
+        _metadata.requirements
+        for _metadata in get_declarative_metadata(path)
+        if _metadata.requirements is not None
+    ]
+    if not _declarative_requirements:
+        return _get_requirements_from_setup(path)
+
+    return {
+        normalise_requirement(_requirement)
+        for _requirements in _declarative_requirements
+        for _requirement in _requirements
+    }
+
+def _get_requirements_from_setup(path: str) -> set:
     """ Extract requirements declared in the setup.py files of a project.
 
     If several setup.py files are contained in a project,
-    their declared requirements are concatenated.
+    their declared requirements are combined.
 
     :param path: Full path to the location of a python software project.
-    :returns:    All declared requirements of a project contained in a string.
+    :returns:    The normalised names of all requirements declared in setup.py files,
+                 None if none could be found, because parsing failed.
     """
-    _setup_file_locations = _get_setup_locations(path)
-    if not _setup_file_locations:
-        return ''
-    _setup_files = [path+'/setup.py' for path in _setup_file_locations]
-    _requirements = list()
+    _requirements = set()
     _error = False
-    for _setup_file in _setup_files:
-        _parsed_requirements = _astroid_parse_setup(_setup_file)
-        if _parsed_requirements is None:
+    for _script in get_setup_scripts(path):
+        if _script.requirements_error:
             _error = True
-        if _parsed_requirements:
-            _requirements = _requirements + _parsed_requirements
+        _requirements.update(
+            normalise_requirement(_requirement)
+            for _requirement in _script.install_requires + _script.tests_require
+        )
 
-    if not _parsed_requirements and _error:
+    if not _requirements and _error:
         return None
 
-
     return _requirements
 
 def _get_implied_dependencies(path: str) -> list:
@@ -246,65 +245,6 @@ def _get_imports(file_path: str) -> list:
     return _import_matches
 
 
-def _astroid_parse_setup(path: str) -> list:
-    """ Extract requirements out of the setup call in a setup.py
-
-    If for som reason several setup calls are present,
-    their requirements are concatenated
-
-    :param path: Full path to the location of a setup.py file.
-    :returns:    All declared requirements of a setup.py file contained in a string.
-    """
-    if os.path.isfile(path):
-        _setup_file = open(path, 'r', errors='replace')
-    else:
-        return []
-    _setup_content = _setup_file.read()
-    _setup_file.close()
-    _setup_list = None
-    try:
-        _setup_list = _astroid_setup_search(
-            astroid.parse(_setup_content)
-        )
-        _setup_content = None
-    except (astroid.exceptions.AstroidSyntaxError, AttributeError):
-        _setup_content = re.sub(r'#.*?\n', '\n', _setup_content)
-        _setup_content = re.sub(r'(?m)"""[\s\S]*?"""', '', _setup_content)
-        _setup_content = re.sub(r'(?m)\'\'\'[\s\S]*?\'\'\'', '', _setup_content)
-
-    _requirements_regex = (
-        r'.*(?:(?:install_requires)|(?:tests_require))=(\[[\s\S]*?\]).*'
-     )
-
-    _requirement_list = list()
-    _requirement_strings = list()
-    if _setup_list:
-        for _setup in _setup_list:
-            _requirement_strings.extend(
-                re.findall(
-                    _requirements_regex,
-                    _setup
-                )
-            )
-    elif not _setup_content:
-        return None
-    else:
-        _requirement_strings = re.findall(
-            _requirements_regex,
-            _setup_content
-        )
-    for _requirement_string in _requirement_strings:
-        try:
-            _requirement_list = _requirement_list + ast.literal_eval(_requirement_string)
-        except (ValueError, SyntaxError):
-            return None
-
-    for _index, _requirement in enumerate(_requirement_list):
-        _requirement_list[_index] = re.sub(r'[\s><=].*', '', _requirement)
-
-
-    return _requirement_list
-
 def _clean_requirements_entries(requirements_list: list) -> list:
     """ Remove version information from a list with requirement strings. """
 
@@ -314,49 +254,3 @@ def _clean_requirements_entries(requirements_list: list) -> list:
         requirements_list[index] = re.sub(_entry_regex, r'\1', entry)
 
     return requirements_list
-
-def _regex_setup_search(setup_content: str) -> list:
-    """ Fallback for _astroid_setup_search.
-
-    May only match parts of the setup call.
-    Should not be used if full call is needed. 
-    """
-    # Remove matching error factors
-    setup_content = re.sub(r'#.*?\n', '\n', setup_content)
-    setup_content = re.sub(r'(?m)"""[\s\S]*?"""', '', setup_content)
-    setup_content = re.sub(r'(?m)\'\'\'[\s\S]*?\'\'\'', '', setup_content)
-
-
-    _setup_regex = r'.*(setup\([\s\S]*?\)).*'
-
-    return re.findall(_setup_regex, setup_content)
-
-
-def _astroid_setup_search(node: astroid.nodes) -> list:
-    """ Search for the setup function calls in a astroid tree recursively.
-
-    :param node: A astroid node object containing a setup.py parsetree or parts of it.  
-    :returns:    A list of strings containing a setup call each.
-    """
-
-    _setup_call_list = list()
-    for child in node.get_children(): 
-        if child.as_string()[:6] == 'setup(':
-            _setup_call_list.append(child.as_string())
-        else:
-            _setup_call_list = _setup_call_list + _astroid_setup_search(child)
-
-    return _setup_call_list
-
-def _get_setup_locations(path: str) -> list:
-    """ Returns a list of paths to setup.py files in a directory.
-
-    :returns: List of paths containing a setup.py file
-    """
-    _setup_file_string = 'setup.py'
-    _setup_file_list = search_filename(
-        base_folder=path,
-        file_name=_setup_file_string
-    )
-
-    return [os.path.dirname(_path) for _path in _setup_file_list]
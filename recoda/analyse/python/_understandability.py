@@ -1,12 +1,12 @@
 """ Module to contain the measuring tools for code understandability. """
 
-import os
 import re
 import tokenize
 from io import StringIO
 
 import astroid
-from recoda.analyse.python.helpers import get_python_files
+from recoda.analyse.helpers import file_fact, read_text
+from recoda.analyse.python.helpers import get_python_files, read_python_source
 import pycodestyle
 
 TIMEOUT = 200
@@ -36,7 +36,16 @@ def average_comment_density(project_path) -> float:
 
     _comment_density_scores = []
     for _file_path in _file_paths:
-        _comment_density_scores.append(_get_comment_density(_file_path))
+        try:
+            _comment_density_scores.append(file_fact(
+                project_path,
+                _file_path,
+                'comment_density',
+                lambda _file_path=_file_path: _get_comment_density(project_path, _file_path)
+            ))
+        except OSError:
+            # Files, that vanished or cannot be read, are skipped.
+            continue
 
     _comment_density_scores_cleaned = [
         _value
@@ -65,36 +74,60 @@ def standard_compliance(project_path: str) -> float:
 
     _style_checker = pycodestyle.StyleGuide(quiet=True)
 
-    _style_results = _style_checker.check_files(_python_files)
+    _lines = _style_errors = 0
+    for _file_path in _python_files:
+        if _style_checker.excluded(_file_path):
+            continue
+        try:
+            _file_lines, _file_errors = file_fact(
+                project_path,
+                _file_path,
+                'style_offences',
+                lambda _file_path=_file_path: _get_style_offences(
+                    _style_checker, project_path, _file_path
+                )
+            )
+        except OSError:
+            # Files, that vanished or cannot be read, are skipped.
+            continue
+        _lines = _lines + _file_lines
+        _style_errors = _style_errors + _file_errors
 
-    _lines = _style_results.counters['physical lines']
-    _style_errors = 0
+    if _lines > 0:
+        return 1 - float(_style_errors) / float(_lines)
+    return 0
+
+def _get_style_offences(style_checker: pycodestyle.StyleGuide, project_path: str, file_path: str) -> tuple:
+    """ Count the physical lines and style offences of a single file.
 
+    Like check_files, but the lines are handed to the checker,
+    since the files do not need to exist in the local file system.
+    """
+    _style_results = style_checker.init_report()
+    _style_results.start()
+    style_checker.input_file(
+        file_path,
+        lines=StringIO(read_python_source(project_path, file_path)).readlines()
+    )
+    _style_results.stop()
+
+    _style_errors = 0
     for key, value in _style_results.counters.items():
         if key[:1] in ['E', 'W']:
             _style_errors = _style_errors + value
+    return _style_results.counters['physical lines'], _style_errors
 
-    if _lines > 0:
-        return 1 - float(_style_errors) / float(_lines)
-    return 0
-
-def _get_comment_density(_file_path):
+def _get_comment_density(project_path, _file_path):
     """ Get the comment density for a single file. """
 
     # All the counting variables.
     _single_comments = _multiline_comments = _lines_of_code = 0
 
-    # We cannot count what does not exist.
-    # This is expected to be faulty input, so we cannot return 0,
-    # since this would influence the average.
-    if not os.path.isfile(_file_path):
-        return None
-
     # Characters, that cannot be recognized do not change line counts (hopefully)
     # and the actual text is not important for this measure.
-    # We let open replace those characters because we do not want it to cause
+    # We let read_text replace those characters because we do not want it to cause
     # the measurement run to exit on the error.
-    _file_content = open(_file_path, 'r', errors='replace')
+    _file_content = StringIO(read_text(project_path, _file_path, errors='replace'))
     _file_string = ''
 
     # We read the file this way to count all non blank lines of code.
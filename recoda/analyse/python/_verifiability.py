@@ -2,10 +2,11 @@
 
 """
 
-import os
 import re
+from io import StringIO
 
-from recoda.analyse.helpers import search_filename
+from recoda.analyse.helpers import read_text
+from recoda.analyse.python.helpers import get_import_index, get_python_modules
 
 PYTHON_TEST_LIBRARIES = (
     # Unit testing
@@ -43,56 +44,50 @@ PYTHON_TEST_LIBRARIES = (
     'lettuce',
 )
 
+# Fallback for scripts, that cannot be parsed, e.g. python 2 code.
+_TESTLIBRARY_IMPORT_REGEX = re.compile(
+    r'^\s*(?:(?:from)|(?:import)).*(?:' +
+    '|'.join(["(?:"+ re.escape(lib) +")" for lib in PYTHON_TEST_LIBRARIES]) +
+    ')'
+)
+
 def testlibrary_usage(project_path: str) -> bool:
     """ Check for the import of Test Libraries.
 
     Searches for the import of a test library inside the projects
     python-script files.
     A project is judged as using tests if one of the test libraries
-    in PYTHON_TEST_LIBRARIES is imported.
+    in PYTHON_TEST_LIBRARIES, or one of their submodules, is imported.
+
+    The imports are taken from the projects shared import index.
+    Only scripts, that could not be parsed, are searched line by line.
 
     :param project_path:    Root path to the Project to be measured.
     :returns:               True if a test library imported at least once.
 
     """
-    _python_script_files = search_filename(
-        base_folder=project_path,
-        file_name='*.py'
-    )
-
-    _test_exists = False
-
-    for _file_path in _python_script_files:
-        if os.path.isfile(_file_path):
-            _test_exists = _find_testlibrary_import(file_path=_file_path)
-        if _test_exists:
+    for _module in get_import_index(project_path).modules:
+        if _is_testlibrary(_module):
             return True
 
-    return _test_exists
-
-def _find_testlibrary_import(file_path: str) -> bool:
-    """ Search a single file for the import of a test library. """
-    # Multiprocessing gobbled up a lot of memory using with blocks.
-    # So we handle files here directly.
-    if os.path.isfile(file_path):
-        _file_handler = open(file_path, 'r', encoding='ISO-8859-1')
-    else:
-        return None
-
-    _grouped_library_strings = ["(?:"+ lib +")" for lib in PYTHON_TEST_LIBRARIES]
+    for _file_path, _tree in get_python_modules(project_path).items():
+        if _tree is None and _find_testlibrary_import(project_path, file_path=_file_path):
+            return True
 
-    _import_regex = re.compile(
-        r'^\s*(?:(?:from)|(?:import)).*(?:' +
-        '|'.join(_grouped_library_strings) +
-        ')'
-    )
+    return False
 
+def _is_testlibrary(module_name: str) -> bool:
+    """ Check if a dotted module name belongs to a test library. """
+    for _library in PYTHON_TEST_LIBRARIES:
+        if module_name == _library or module_name.startswith(_library + '.'):
+            return True
+    return False
 
-    for _line in _file_handler:
-        _match = re.match(_import_regex, _line)
+def _find_testlibrary_import(project_path: str, file_path: str) -> bool:
+    """ Search a single file for the import of a test library. """
+    for _line in StringIO(read_text(project_path, file_path, encoding='ISO-8859-1')):
+        _match = _TESTLIBRARY_IMPORT_REGEX.match(_line)
         if _match:
-            _file_handler.close()
             return True
 
-    _file_handler.close()
     return False
@@ -1,18 +1,212 @@
 """ Helper Functions for python specific measures. """
 
+import ast
+import io
 import os
+import re
+import tokenize
+from types import MappingProxyType
+from typing import NamedTuple, FrozenSet
 
-from recoda.analyse.helpers import search_filename
+from pipreqs import pipreqs
+
+from recoda.analyse.helpers import cached, file_fact, find_files, get_file_index, read_file
+
+# Folders pipreqs skips when looking for imports and local modules.
+# We keep to the same folders to stay comparable with earlier results.
+_IGNORED_FOLDERS = (
+    ".hg",
+    ".svn",
+    ".git",
+    ".tox",
+    "__pycache__",
+    "env",
+    "venv",
+    ".ipynb_checkpoints",
+)
+
+# The distribution name at the start of a requirement, see PEP 508.
+_REQUIREMENT_NAME_REGEX = re.compile(r'[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?')
+
+class ImportIndex(NamedTuple):
+    """ All imports of a projects python files.
+
+    :ivar modules:       Full dotted names of every absolutely imported module.
+                         For from-imports the imported names are appended
+                         as well, since they can be submodules.
+    :ivar top_level:     First part of every name in modules.
+    :ivar local:         Names of folders and python files in the project,
+                         that an import could refer to.
+    :ivar parse_errors:  Number of python files, that could not be parsed.
+    """
+    modules: FrozenSet[str]
+    top_level: FrozenSet[str]
+    local: FrozenSet[str]
+    parse_errors: int
 
 def get_python_files(project_path: str) -> list:
     """ Returns a list of all python files in a directory and its sub directories. """
-    _python_glob = "**/*.py"
-    _python_files = search_filename(
-        base_folder=project_path,
-        file_name=_python_glob,
-        recursive_flag=True
+    return cached(project_path, 'python_files', lambda: _find_python_files(project_path))
+
+def get_python_modules(project_path: str) -> dict:
+    """ Parse all python files of a project once.
+
+    :param project_path: Full path to the project.
+    :returns:            Dictionary with the paths of all python files as keys
+                         and their ast.Module as value. The value is None
+                         for files, that could not be parsed.
+    """
+    return cached(project_path, 'python_modules', lambda: _parse_python_files(project_path))
+
+def _parse_python_files(project_path: str) -> dict:
+    """ Parse the python files of a project, skipping files that cannot be read. """
+    _modules = {}
+    for _file in get_python_files(project_path):
+        try:
+            _modules[_file] = file_fact(
+                project_path,
+                _file,
+                'python_module',
+                lambda _file=_file: _parse_python_file(read_file(project_path, _file))
+            )
+        except OSError:
+            continue
+    return _modules
+
+def get_import_index(project_path: str) -> ImportIndex:
+    """ Collect the imports of a project from its parsed modules. """
+    return cached(project_path, 'import_index', lambda: _build_import_index(project_path))
+
+def get_external_imports(project_path: str) -> FrozenSet[str]:
+    """ Top level names of imports, that are neither local nor standard library. """
+    _index = get_import_index(project_path)
+    return _index.top_level - _index.local - _STANDARD_LIBRARY
+
+def read_python_source(project_path: str, file_path: str) -> str:
+    """ Decode a python file like the interpreter and style checkers do.
+
+    The encoding is taken from a declaration or byte order mark,
+    files that cannot be decoded that way are read as latin-1.
+    Line endings are normalised to line feeds.
+    """
+    _content = read_file(project_path, file_path)
+    try:
+        _encoding, _ = tokenize.detect_encoding(io.BytesIO(_content).readline)
+        _text = _content.decode(_encoding)
+    except (LookupError, SyntaxError, UnicodeError):
+        _text = _content.decode('ISO-8859-1')
+    return io.StringIO(_text, newline=None).getvalue()
+
+def _find_python_files(project_path: str) -> list:
+    """ Search the python files of a project in its file index. """
+    return find_files(project_path, '*.py')
+
+def _parse_python_file(content: bytes) -> ast.Module:
+    """ Parse the content of a single python file and return None if that fails. """
+    try:
+        # Parsing the bytes lets python honor encoding declarations.
+        return ast.parse(content)
+    except (SyntaxError, ValueError):
+        pass
+    try:
+        # Older scripts often are latin-1 encoded without declaring it.
+        return ast.parse(content.decode('ISO-8859-1'))
+    except (SyntaxError, ValueError):
+        return None
+
+def _build_import_index(project_path: str) -> ImportIndex:
+    """ Combine the imports of the shared parse trees of a project. """
+    _modules = set()
+    _parse_errors = 0
+    for _file, _tree in get_python_modules(project_path).items():
+        # Imports of bundled environments are not the projects own.
+        if _in_ignored_folder(os.path.relpath(_file, project_path)):
+            continue
+        if _tree is None:
+            _parse_errors = _parse_errors + 1
+            continue
+        _modules.update(file_fact(
+            project_path,
+            _file,
+            'imported_modules',
+            lambda _tree=_tree: _find_imported_modules(_tree)
+        ))
+
+    return ImportIndex(
+        modules=frozenset(_modules),
+        top_level=frozenset(_module.partition('.')[0] for _module in _modules),
+        local=_find_local_names(project_path),
+        parse_errors=_parse_errors
+    )
+
+def _find_imported_modules(tree: ast.Module) -> FrozenSet[str]:
+    """ Walk a parse tree for import statements. """
+    _modules = set()
+    for _node in ast.walk(tree):
+        if isinstance(_node, ast.Import):
+            _modules.update(_alias.name for _alias in _node.names)
+        # Relative imports always point inside the project.
+        elif isinstance(_node, ast.ImportFrom) and not _node.level and _node.module:
+            _modules.add(_node.module)
+            _modules.update(
+                _node.module + '.' + _alias.name
+                for _alias in _node.names
+                if _alias.name != '*'
+            )
+    return frozenset(_modules)
+
+def _find_local_names(project_path: str) -> FrozenSet[str]:
+    """ Names of folders and python files an import might refer to. """
+    _local_names = {os.path.basename(project_path)}
+    for _path in get_file_index(project_path):
+        if _in_ignored_folder(_path):
+            continue
+        _parts = _path.split(os.sep)
+        _local_names.update(_parts[:-1])
+        if _parts[-1].endswith('.py'):
+            _local_names.add(os.path.splitext(_parts[-1])[0])
+    return frozenset(_local_names)
+
+def _in_ignored_folder(path: str) -> bool:
+    """ If a path relative to the project lies in a folder pipreqs skips. """
+    return any(_folder in _IGNORED_FOLDERS for _folder in path.split(os.sep)[:-1])
+
+def get_distribution_names(imports) -> FrozenSet[str]:
+    """ Resolve import names to normalised distribution names.
+
+    Imports without a known mapping are expected to share the name
+    of their distribution, as pipreqs does.
+
+    :param imports: Top level import names.
+    :returns:       Normalised names of the distributions providing them.
+    """
+    return frozenset(
+        normalise_requirement(_DISTRIBUTION_NAMES.get(_import, _import))
+        for _import in imports
     )
 
-    _cleaned_files = [_file for _file in _python_files if os.path.isfile(_file)]
+def normalise_requirement(requirement: str) -> str:
+    """ Reduce a requirement string to its normalised distribution name.
+
+    Version specifiers, extras and environment markers are removed.
+    Case and runs of "-", "_" and "." are normalised as in PEP 503,
+    so "GitPython>=2.0" and "gitpython" are the same requirement.
+    """
+    _name = _REQUIREMENT_NAME_REGEX.match(requirement.strip())
+    if not _name:
+        return ''
+    return re.sub(r'[-_.]+', '-', _name.group(0)).lower()
+
+def _read_pipreqs_data(file_name: str) -> list:
+    """ Read the lines of a data file shipped with pipreqs. """
+    _data_file = os.path.join(os.path.dirname(pipreqs.__file__), file_name)
+    with open(_data_file, 'r') as _file:
+        return [_line.strip() for _line in _file if _line.strip()]
 
-    return _cleaned_files
+# Both tables are loaded once on import. Worker processes forked
+# after the import share them with the parent process,
+# instead of reading them again for every project.
+_STANDARD_LIBRARY = frozenset(_read_pipreqs_data('stdlib'))
+_DISTRIBUTION_NAMES = MappingProxyType(
+    dict(_line.split(':', 1) for _line in _read_pipreqs_data('mapping'))
+)
@@ -0,0 +1,366 @@
+""" Read the packaging metadata of python projects.
+
+Packaging related metrics share the results of this module,
+so every metadata file of a project is only read and analysed once.
+
+Declarative files (setup.cfg, pyproject.toml, Pipfile and environment.yml)
+are read as data. Setup scripts need a static analysis of python code,
+so metrics should only fall back to them, if the declarative files
+do not answer their question.
+"""
+
+import ast
+import configparser
+import os
+import re
+from typing import NamedTuple, Optional, Tuple
+
+import yaml
+
+from recoda.analyse.helpers import cached, find_files, read_text
+from recoda.analyse.python.helpers import get_python_modules
+
+try:
+    # Part of the standard library since python 3.11.
+    import tomllib as toml
+except ImportError:
+    import toml
+
+# Keywords of a setup() call, that declare requirements.
+_REQUIREMENT_KEYWORDS = ('install_requires', 'tests_require')
+
+class DeclarativeMetadata(NamedTuple):
+    """ What a declarative packaging or environment file tells about a project.
+
+    :ivar path:         Full path to the file.
+    :ivar package:      True if the file describes an installable package.
+    :ivar requirements: Requirement strings declared in the file,
+                        None if the file does not declare requirements.
+    """
+    path: str
+    package: bool
+    requirements: Optional[Tuple[str, ...]]
+
+def get_declarative_metadata(project_path: str) -> Tuple[DeclarativeMetadata, ...]:
+    """ Read all declarative packaging and environment files of a project.
+
+    Files, that cannot be read, are left out.
+
+    :param project_path: Full path to the project.
+    :returns:            A DeclarativeMetadata for every readable file.
+    """
+    return cached(
+        project_path,
+        'declarative_metadata',
+        lambda: tuple(
+            _metadata
+            for _metadata in (
+                _read_declarative_file(project_path, _path, _reader)
+                for _file_name, _reader in _DECLARATIVE_READERS
+                for _path in find_files(project_path, _file_name)
+            )
+            if _metadata is not None
+        )
+    )
+
+class SetupScript(NamedTuple):
+    """ What a setup.py tells about a project.
+
+    :ivar path:                 Full path to the setup.py file.
+    :ivar parsed:               False if the file is not valid python 3.
+    :ivar setup_call:           True if the file calls setup().
+    :ivar install_requires:     Requirement strings of all install_requires arguments.
+    :ivar tests_require:        Requirement strings of all tests_require arguments.
+    :ivar requirements_error:   True if the declared requirements could not be
+                                determined completely, e.g. since there was no
+                                setup call or the requirements are computed at runtime.
+    """
+    path: str
+    parsed: bool
+    setup_call: bool
+    install_requires: Tuple[str, ...]
+    tests_require: Tuple[str, ...]
+    requirements_error: bool
+
+def get_setup_scripts(project_path: str) -> Tuple[SetupScript, ...]:
+    """ Analyse all setup.py files of a project.
+
+    :param project_path: Full path to the project.
+    :returns:            A SetupScript for every setup.py in the project.
+    """
+    return cached(
+        project_path,
+        'setup_scripts',
+        lambda: tuple(
+            _read_project_setup_script(project_path, _path)
+            for _path in find_files(project_path, 'setup.py')
+        )
+    )
+
+def _read_project_setup_script(project_path: str, file_path: str) -> SetupScript:
+    """ Analyse a setup.py, reusing the shared parse tree if there is one. """
+    _tree = get_python_modules(project_path).get(file_path)
+    if _tree is not None:
+        return read_setup_script(file_path, _tree)
+    return read_setup_script(file_path, content=read_text(project_path, file_path))
+
+def read_setup_script(file_path: str, tree: ast.Module = None, content: str = None) -> SetupScript:
+    """ Find setup() calls and their requirements in a single visit of a setup.py.
+
+    :param file_path:   Full path to the setup.py file.
+    :param tree:        The already parsed file, if there is one.
+    :param content:     The content of the file, if it is already read.
+                        Otherwise it is read from file_path.
+    :returns:           The setup script model of the file.
+    """
+    if tree is None:
+        if content is None:
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as _file:
+                content = _file.read()
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError):
+            return _read_unparsable_setup_script(file_path, content)
+
+    _visitor = _SetupCallVisitor()
+    _visitor.visit(tree)
+
+    _requirements = {_keyword: [] for _keyword in _REQUIREMENT_KEYWORDS}
+    # Without a setup call, we do not know what the requirements are.
+    _error = not _visitor.setup_calls
+    for _call in _visitor.setup_calls:
+        for _keyword in _call.keywords:
+            if _keyword.arg not in _REQUIREMENT_KEYWORDS:
+                continue
+            _values = _resolve_requirements(_keyword.value, _visitor.assignments)
+            if _values is None:
+                _error = True
+            else:
+                _requirements[_keyword.arg].extend(_values)
+
+    return SetupScript(
+        path=file_path,
+        parsed=True,
+        setup_call=bool(_visitor.setup_calls),
+        install_requires=tuple(_requirements['install_requires']),
+        tests_require=tuple(_requirements['tests_require']),
+        requirements_error=_error
+    )
+
+class _SetupCallVisitor(ast.NodeVisitor):
+    """ Collect setup() calls and module level assignments of a setup.py. """
+
+    def __init__(self):
+        self.setup_calls = []
+        self.assignments = {}
+        self._depth = 0
+
+    def visit_Call(self, node: ast.Call):
+        """ Remember calls to setup() or anything.setup(). """
+        _function = node.func
+        if (
+                (isinstance(_function, ast.Name) and _function.id == 'setup') or
+                (isinstance(_function, ast.Attribute) and _function.attr == 'setup')
+        ):
+            self.setup_calls.append(node)
+        self.generic_visit(node)
+
+    def visit_Assign(self, node: ast.Assign):
+        """ Remember simple assignments to names, requirements may be stored in them. """
+        if not self._depth:
+            for _target in node.targets:
+                if isinstance(_target, ast.Name):
+                    self.assignments[_target.id] = node.value
+        self.generic_visit(node)
+
+    def _visit_scope(self, node: ast.AST):
+        """ Assignments inside functions and classes are not visible to setup(). """
+        self._depth = self._depth + 1
+        self.generic_visit(node)
+        self._depth = self._depth - 1
+
+    visit_FunctionDef = _visit_scope
+    visit_AsyncFunctionDef = _visit_scope
+    visit_ClassDef = _visit_scope
+
+def _resolve_requirements(node: ast.AST, assignments: dict, _seen: frozenset = frozenset()) -> list:
+    """ Statically evaluate the value of a requirement keyword.
+
+    Literal lists, names bound to them and concatenations of both are understood.
+
+    :returns: A list of requirement strings or None, if the value is only known at runtime.
+    """
+    if isinstance(node, ast.Name):
+        if node.id in _seen or node.id not in assignments:
+            return None
+        return _resolve_requirements(assignments[node.id], assignments, _seen | {node.id})
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        _left = _resolve_requirements(node.left, assignments, _seen)
+        _right = _resolve_requirements(node.right, assignments, _seen)
+        if _left is None or _right is None:
+            return None
+        return _left + _right
+    try:
+        _value = ast.literal_eval(node)
+    except (ValueError, TypeError, MemoryError, RecursionError):
+        # Malformed literals, like sets of lists or deeply nested ones.
+        return None
+    if isinstance(_value, str):
+        # A single requirement or several separated by newlines.
+        return [_line for _line in _value.splitlines() if _line.strip()]
+    if isinstance(_value, (list, tuple)) and all(isinstance(_item, str) for _item in _value):
+        return list(_value)
+    return None
+
+def _read_unparsable_setup_script(file_path: str, content: str) -> SetupScript:
+    """ Fallback for setup.py files, that are not valid python 3.
+
+    May only match parts of the setup call,
+    but python 2 setup scripts tend to declare
+    their requirements as literal lists.
+    """
+    # Remove matching error factors
+    content = re.sub(r'#.*?\n', '\n', content)
+    content = re.sub(r'(?m)"""[\s\S]*?"""', '', content)
+    content = re.sub(r'(?m)\'\'\'[\s\S]*?\'\'\'', '', content)
+
+    _requirements = {_keyword: [] for _keyword in _REQUIREMENT_KEYWORDS}
+    _error = False
+    for _keyword, _list_string in re.findall(
+            r'((?:install_requires)|(?:tests_require))\s*=\s*(\[[\s\S]*?\])',
+            content
+    ):
+        try:
+            _requirements[_keyword].extend(ast.literal_eval(_list_string))
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            _error = True
+
+    return SetupScript(
+        path=file_path,
+        parsed=False,
+        setup_call=bool(re.search(r'setup\([\s\S]*?\)', content)),
+        install_requires=tuple(_requirements['install_requires']),
+        tests_require=tuple(_requirements['tests_require']),
+        requirements_error=_error
+    )
+
+def _read_declarative_file(project_path: str, file_path: str, reader) -> DeclarativeMetadata:
+    """ Read a declarative file and return None if it is malformed.
+
+    Readers get the content of the file and a function, that reads
+    files referenced relative to the folder of the file.
+    """
+    _folder = os.path.dirname(file_path)
+    try:
+        _package, _requirements = reader(
+            read_text(project_path, file_path),
+            lambda _name: read_text(project_path, os.path.join(_folder, _name))
+        )
+    except (ValueError, TypeError, AttributeError, KeyError,
+            configparser.Error, yaml.YAMLError, OSError):
+        return None
+    if _requirements is not None:
+        _requirements = tuple(_requirements)
+    return DeclarativeMetadata(path=file_path, package=_package, requirements=_requirements)
+
+def _read_setup_cfg(content: str, read_referenced) -> tuple:
+    """ Read the declarative setuptools configuration. """
+    _config = configparser.ConfigParser(interpolation=None)
+    _config.read_string(content)
+
+    _package = _config.has_option('metadata', 'name')
+    _requirements = None
+    for _option in _REQUIREMENT_KEYWORDS:
+        if _config.has_option('options', _option):
+            _requirements = (_requirements or []) + _read_setup_cfg_list(
+                _config.get('options', _option), read_referenced
+            )
+    if _config.has_section('options.extras_require'):
+        for _extra in _config.options('options.extras_require'):
+            _requirements = (_requirements or []) + _read_setup_cfg_list(
+                _config.get('options.extras_require', _extra), read_referenced
+            )
+    return _package, _requirements
+
+def _read_setup_cfg_list(value: str, read_referenced) -> list:
+    """ Split a setup.cfg list, following "file:" references. """
+    value = value.strip()
+    if value.startswith('file:'):
+        _requirements = []
+        for _referenced_file in value[len('file:'):].split(','):
+            _requirements.extend(
+                _split_requirement_lines(read_referenced(_referenced_file.strip()))
+            )
+        return _requirements
+    _requirements = []
+    for _line in _split_requirement_lines(value):
+        # Commas followed by an operator separate version specifiers, not requirements.
+        _requirements.extend(re.split(r',\s*(?=[A-Za-z0-9])', _line))
+    # Environment markers follow a semicolon, see PEP 508.
+    _requirements = [_item.partition(';')[0].strip() for _item in _requirements]
+    return [_item for _item in _requirements if _item]
+
+def _split_requirement_lines(content: str) -> list:
+    """ Requirement lines without comments and pip options. """
+    _lines = [re.sub(r'(^|\s)#.*$', '', _line).strip() for _line in content.splitlines()]
+    return [_line for _line in _lines if _line and not _line.startswith('-')]
+
+def _read_pyproject_toml(content: str, _read_referenced) -> tuple:
+    """ Read PEP 621 and poetry metadata. """
+    _data = toml.loads(content)
+    _project = _data.get('project')
+    _poetry = _data.get('tool', {}).get('poetry')
+
+    _package = bool(_project and _project.get('name')) or bool(_poetry and _poetry.get('name'))
+    _requirements = None
+    if _project is not None and 'dependencies' not in _project.get('dynamic', []):
+        _requirements = list(_project.get('dependencies', []))
+        for _extra in _project.get('optional-dependencies', {}).values():
+            _requirements.extend(_extra)
+    if _poetry is not None:
+        _tables = [_poetry.get('dependencies'), _poetry.get('dev-dependencies')]
+        _tables.extend(
+            _group.get('dependencies')
+            for _group in _poetry.get('group', {}).values()
+        )
+        for _table in _tables:
+            if _table is None:
+                continue
+            _requirements = (_requirements or []) + [
+                _name for _name in _table if _name.lower() != 'python'
+            ]
+    return _package, _requirements
+
+def _read_pipfile(content: str, _read_referenced) -> tuple:
+    """ Read the packages of a pipenv environment. """
+    _data = toml.loads(content)
+    _requirements = None
+    for _table in ('packages', 'dev-packages'):
+        if _table in _data:
+            _requirements = (_requirements or []) + list(_data[_table])
+    return False, _requirements
+
+def _read_environment_yml(content: str, _read_referenced) -> tuple:
+    """ Read the conda and pip packages of a conda environment. """
+    _data = yaml.safe_load(content)
+    if not isinstance(_data, dict) or 'dependencies' not in _data:
+        return False, None
+    _requirements = []
+    for _dependency in _data['dependencies'] or []:
+        if isinstance(_dependency, dict):
+            _requirements.extend(_dependency.get('pip') or [])
+        elif isinstance(_dependency, str):
+            # Remove the channel in specs like conda-forge::numpy=1.15
+            _requirements.append(_dependency.split('::')[-1])
+    return False, [
+        _requirement for _requirement in _requirements
+        if not re.match(r'^\s*python\b(?![-_.])', _requirement)
+    ]
+
+_DECLARATIVE_READERS = (
+    ('setup.cfg', _read_setup_cfg),
+    ('pyproject.toml', _read_pyproject_toml),
+    ('Pipfile', _read_pipfile),
+    ('environment.yml', _read_environment_yml),
+    ('environment.yaml', _read_environment_yml),
+)
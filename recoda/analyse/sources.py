@@ -0,0 +1,480 @@
+""" Access to the files of a project, wherever they are stored.
+
+Metrics do not open project files themselves. They go through
+the helpers in recoda.analyse.helpers, which ask the source of
+the project for its files. Sources are picked by open_source()
+based on what the project path points to.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import stat
+import subprocess
+import tarfile
+import tempfile
+import zipfile
+from typing import IO, NamedTuple, Union
+
+# Suffixes of the archives, that are read as projects.
+ARCHIVE_SUFFIXES = ('.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz', '.tar', '.zip')
+
+# Members of compressed tarballs larger than this many bytes are held
+# in a temporary file instead of the memory, e.g. data files bundled with code.
+MAX_MEMBER_MEMORY = 16 * 1024 * 1024
+
+
+class DirectorySource():
+    """ Files of a project checked out into a directory. """
+
+    def __init__(self, root: str):
+        """ :param root: Full path to the project directory. """
+        self.root = root
+
+    def list_files(self) -> tuple:
+        """ Paths of all files relative to the root.
+
+        Like the globs of search_filename, files and folders
+        with names starting with a dot are left out.
+        """
+        _files = []
+        for _root, _folders, _file_names in os.walk(self.root):
+            _folders[:] = sorted(_folder for _folder in _folders if not _folder.startswith('.'))
+            _relative_root = os.path.relpath(_root, self.root)
+            for _file_name in sorted(_file_names):
+                if _file_name.startswith('.'):
+                    continue
+                # Only regular files, walk also lists broken symbolic links.
+                if not os.path.isfile(os.path.join(_root, _file_name)):
+                    continue
+                if _relative_root == os.curdir:
+                    _files.append(_file_name)
+                else:
+                    _files.append(os.path.join(_relative_root, _file_name))
+        return tuple(_files)
+
+    def read_bytes(self, relative_path: str) -> bytes:
+        """ Read the content of a file. """
+        with open(os.path.join(self.root, relative_path), 'rb') as _file:
+            return _file.read()
+
+    def size(self, relative_path: str) -> int:
+        """ Size of a file in bytes. """
+        return os.path.getsize(os.path.join(self.root, relative_path))
+
+    def local_path(self, relative_path: str) -> str:
+        """ Path of the file in the local file system. """
+        return os.path.join(self.root, relative_path)
+
+    @staticmethod
+    def object_id(_relative_path: str) -> str:
+        """ Files in directories have no content address, so facts about them are not kept. """
+        return None
+
+    def close(self):
+        """ Nothing to release for directories. """
+
+
+class GitTreeSource():
+    """ Files of the HEAD commit of a repository, read from its object database.
+
+    Nothing is checked out. Blobs are read through one
+    `git cat-file --batch` process per repository, which
+    is started on the first read and kept until close().
+
+    :ivar facts: Results computed from single blobs, keyed by
+                 object id and name of the result. Sources derived
+                 with at_revision() keep the facts of unchanged blobs.
+    """
+
+    def __init__(self, git_dir: str, revision: str = 'HEAD'):
+        """
+        :param git_dir:     Path to the git directory, e.g. a bare repository.
+        :param revision:    The commit or tree to read.
+        """
+        self.git_dir = git_dir
+        self.revision = revision
+        self.facts = {}
+        self._blobs = None
+        self._process = None
+
+    def at_revision(self, revision: str):
+        """ Derive the source of another revision from this one.
+
+        Only the differences between both trees are listed. If git
+        cannot diff them, e.g. for a missing object, the tree of the
+        revision is listed in full instead. The cat-file process and the facts of blobs, that did not
+        change, are handed over, so this source should not be used
+        afterwards.
+
+        :param revision:    The commit to read next, usually a child of the current one.
+        :returns:           A GitTreeSource for revision.
+        """
+        _source = GitTreeSource(self.git_dir, revision)
+        try:
+            _source._blobs = _apply_tree_diff(
+                dict(self._get_blobs()),
+                _diff_trees(self.git_dir, self.revision, revision)
+            )
+        except subprocess.CalledProcessError:
+            _source._blobs = _list_tree(self.git_dir, revision)
+        _object_ids = {_object_id for _object_id, _ in _source._blobs.values()}
+        _source.facts = {
+            _key: _value for _key, _value in self.facts.items()
+            if _key[0] in _object_ids
+        }
+        _source._process, self._process = self._process, None
+        return _source
+
+    def list_files(self) -> tuple:
+        """ Paths of all regular files in the tree, without hidden files and folders. """
+        return tuple(self._get_blobs())
+
+    def read_bytes(self, relative_path: str) -> bytes:
+        """ Read the content of a blob. """
+        _object_id, _ = self._get_blobs()[relative_path]
+        return self.read_object(_object_id)
+
+    def size(self, relative_path: str) -> int:
+        """ Size of a blob in bytes. """
+        _object_id, _size = self._get_blobs()[relative_path]
+        if _size is None:
+            # Tree diffs do not list sizes.
+            _size = len(self.read_object(_object_id))
+            self._blobs[relative_path] = (_object_id, _size)
+        return _size
+
+    @staticmethod
+    def local_path(_relative_path: str) -> str:
+        """ Blobs do not exist in the local file system. """
+        return None
+
+    def object_id(self, relative_path: str) -> str:
+        """ The id of the blob, identifying its content. """
+        return self._get_blobs()[relative_path][0]
+
+    def read_object(self, object_id: str) -> bytes:
+        """ Read any object through the persistent cat-file process. """
+        if self._process is None:
+            self._process = subprocess.Popen(
+                ['git', '--git-dir', self.git_dir, 'cat-file', '--batch'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+        self._process.stdin.write(object_id.encode('ascii') + b'\n')
+        self._process.stdin.flush()
+        _header = self._process.stdout.readline().split()
+        if len(_header) != 3:
+            raise KeyError(object_id)
+        _content = self._process.stdout.read(int(_header[2]))
+        # Every object is followed by a line feed.
+        self._process.stdout.read(1)
+        return _content
+
+    def close(self):
+        """ Stop the cat-file process. """
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+    def __del__(self):
+        self.close()
+
+    def _get_blobs(self) -> dict:
+        """ List the tree once, keyed by path with object id and size as value. """
+        if self._blobs is None:
+            self._blobs = _list_tree(self.git_dir, self.revision)
+        return self._blobs
+
+
+def _list_tree(git_dir: str, revision: str) -> dict:
+    """ List the regular files in the tree of a revision with `git ls-tree`. """
+    try:
+        _output = subprocess.run(
+            ['git', '--git-dir', git_dir, 'ls-tree', '-r', '-z', '--long', revision],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True
+        ).stdout
+    except subprocess.CalledProcessError:
+        # Repositories without commits have no tree.
+        return {}
+
+    _blobs = {}
+    for _entry in _output.split(b'\0'):
+        if not _entry:
+            continue
+        _info, _path = _entry.split(b'\t', 1)
+        _mode, _type, _object_id, _size = _info.split()
+        # Symbolic links and submodules are no regular files.
+        if _type != b'blob' or _mode == b'120000':
+            continue
+        _path = _tree_path(_path)
+        if _path is not None:
+            _blobs[_path] = (_object_id.decode('ascii'), int(_size))
+    return _blobs
+
+def _tree_path(path: bytes) -> str:
+    """ Convert a path of a tree to a local relative path, None for hidden files. """
+    _path = os.fsdecode(path)
+    if any(_part.startswith('.') for _part in _path.split('/')):
+        return None
+    return _path.replace('/', os.sep)
+
+def _diff_trees(git_dir: str, old_revision: str, new_revision: str) -> list:
+    """ List the changed files between two revisions with `git diff-tree`.
+
+    :returns: Tuples of path and new object id, which is None
+              if the path is no regular file any more.
+    """
+    _output = subprocess.run(
+        [
+            'git', '--git-dir', git_dir, 'diff-tree',
+            '-r', '-z', '--raw', '--no-renames', old_revision, new_revision
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        check=True
+    ).stdout
+
+    _changes = []
+    _fields = _output.split(b'\0')
+    # Entries are a line of modes, ids and status followed by the path.
+    for _info, _path in zip(_fields[0::2], _fields[1::2]):
+        _path = _tree_path(_path)
+        if _path is None:
+            continue
+        _, _new_mode, _, _new_object_id, _ = _info.split()
+        # Deleted files, symbolic links and submodules.
+        if _new_mode[:3] != b'100':
+            _changes.append((_path, None))
+        else:
+            _changes.append((_path, _new_object_id.decode('ascii')))
+    return _changes
+
+def _apply_tree_diff(blobs: dict, changes: list) -> dict:
+    """ Update a listing of blobs with the changes of a tree diff. """
+    for _path, _object_id in changes:
+        if _object_id is None:
+            blobs.pop(_path, None)
+        else:
+            blobs[_path] = (_object_id, None)
+    return blobs
+
+
+class ArchiveSource():
+    """ Files of a project packed into a tarball or zip file.
+
+    Nothing is extracted. Members of zip files and plain tarballs
+    are read on demand, at their offset in the archive. Compressed
+    tarballs cannot be read at random, so they are read in one streaming
+    pass, that lists the members and keeps their content in memory.
+    Only members larger than MAX_MEMBER_MEMORY go to temporary files.
+    If all members are inside one top level folder, as in
+    release archives, paths are relative to that folder.
+
+    Broken or truncated archives raise tarfile.ReadError, EOFError
+    or zipfile.BadZipFile, instead of being measured partially.
+    """
+
+    def __init__(self, archive_path: str):
+        """ :param archive_path: Full path to the archive file. """
+        self.archive_path = archive_path
+        self._members = None
+        self._zip_file = None
+        self._tar_file = None
+
+    def list_files(self) -> tuple:
+        """ Paths of all regular members, without hidden files and folders. """
+        return tuple(self._get_members())
+
+    def read_bytes(self, relative_path: str) -> bytes:
+        """ Read the content of a member. """
+        _member = self._get_members()[relative_path]
+        if self._zip_file is not None:
+            return self._zip_file.read(_member)
+        if isinstance(_member, _StreamedMember):
+            if isinstance(_member.content, bytes):
+                return _member.content
+            _member.content.seek(0)
+            return _member.content.read()
+        return self._tar_file.extractfile(_member).read()
+
+    def size(self, relative_path: str) -> int:
+        """ Uncompressed size of a member in bytes. """
+        _member = self._get_members()[relative_path]
+        if self._zip_file is not None:
+            return _member.file_size
+        return _member.size
+
+    @staticmethod
+    def local_path(_relative_path: str) -> str:
+        """ Members do not exist in the local file system. """
+        return None
+
+    @staticmethod
+    def object_id(_relative_path: str) -> str:
+        """ Members have no content address, so facts about them are not kept. """
+        return None
+
+    def close(self):
+        """ Close the archive and the temporary files of large members. """
+        if self._zip_file is not None:
+            self._zip_file.close()
+            self._zip_file = None
+        if self._tar_file is not None:
+            self._tar_file.close()
+            self._tar_file = None
+        for _member in (self._members or {}).values():
+            if isinstance(_member, _StreamedMember):
+                _close_content(_member)
+        self._members = None
+
+    def _get_members(self) -> dict:
+        """ Read the member listing once, keyed by relative path.
+
+        Values are zipfile.ZipInfo objects for zip files, tarfile.TarInfo
+        objects for plain tarballs and _StreamedMember for compressed ones.
+        """
+        if self._members is None:
+            if zipfile.is_zipfile(self.archive_path):
+                self._zip_file = zipfile.ZipFile(self.archive_path)
+                _members = _read_zip_members(self._zip_file)
+            else:
+                _decompress = self._decompressor()
+                if _decompress is None:
+                    self._tar_file = tarfile.open(self.archive_path, 'r:')
+                    _members = _read_tar_members(self._tar_file)
+                else:
+                    with _decompress(self.archive_path) as _stream:
+                        _members = _stream_tar_members(_stream)
+            self._members = _strip_common_folder(_members)
+            # Hidden members are read while streaming, but not kept.
+            _kept = {id(_member) for _member in self._members.values()}
+            for _member in _members.values():
+                if isinstance(_member, _StreamedMember) and id(_member) not in _kept:
+                    _close_content(_member)
+        return self._members
+
+    def _decompressor(self):
+        """ The function opening the decompressed stream of a tarball, None for plain tarballs. """
+        with open(self.archive_path, 'rb') as _archive:
+            _magic = _archive.read(6)
+        for _prefix, _open in _DECOMPRESSORS:
+            if _magic.startswith(_prefix):
+                return _open
+        return None
+
+
+class _StreamedMember(NamedTuple):
+    """ A regular member of a compressed tarball, read while streaming it.
+
+    :ivar size:     Size in bytes.
+    :ivar content:  The bytes, or a temporary file with them for large members.
+    """
+    size: int
+    content: Union[bytes, IO]
+
+# Magic numbers of the compressions of tarballs and how to decompress them.
+_DECOMPRESSORS = (
+    (b'\x1f\x8b', gzip.open),
+    (b'BZh', bz2.open),
+    (b'\xfd7zXZ\x00', lzma.open),
+)
+
+def _read_zip_members(zip_file: zipfile.ZipFile) -> dict:
+    """ List the regular files of a zip file. """
+    _members = {}
+    for _info in zip_file.infolist():
+        # Symbolic links are stored as files with the link target as content.
+        if _info.is_dir() or stat.S_ISLNK(_info.external_attr >> 16):
+            continue
+        _members[_info.filename] = _info
+    return _members
+
+def _read_tar_members(tar_file: tarfile.TarFile) -> dict:
+    """ List the regular files of a tarball, checking that their data is complete. """
+    _members = {}
+    for _info in tar_file.getmembers():
+        if _info.isfile():
+            _members[_info.name] = _info
+    tar_file.fileobj.seek(0, os.SEEK_END)
+    if _members and max(
+            _info.offset_data + _info.size for _info in _members.values()
+    ) > tar_file.fileobj.tell():
+        raise tarfile.ReadError('unexpected end of data')
+    return _members
+
+def _stream_tar_members(stream) -> dict:
+    """ Read the regular files of a decompressed tarball in one pass, keyed by name.
+
+    The stream is read to its end, so decompressors check, that it is complete.
+    """
+    _members = {}
+    with tarfile.open(fileobj=stream, mode='r|') as _tar_file:
+        for _info in _tar_file:
+            if not _info.isfile():
+                continue
+            _data = _tar_file.extractfile(_info)
+            if _info.size <= MAX_MEMBER_MEMORY:
+                _content = _data.read()
+            else:
+                _content = tempfile.TemporaryFile()
+                shutil.copyfileobj(_data, _content)
+            _members[_info.name] = _StreamedMember(_info.size, _content)
+    # The end of the tarball is padded, the rest holds the checksum of gzip, bz2 and xz.
+    while stream.read(1024 * 1024):
+        pass
+    return _members
+
+def _close_content(member: _StreamedMember) -> None:
+    """ Remove the temporary file of a large member. """
+    if not isinstance(member.content, bytes):
+        member.content.close()
+
+def _strip_common_folder(members: dict) -> dict:
+    """ Make member paths relative and drop a top level folder all members share. """
+    _members = {}
+    for _name, _member in members.items():
+        _parts = [_part for _part in _name.split('/') if _part not in ('', '.')]
+        if _parts:
+            _members[tuple(_parts)] = _member
+    _top_level = {_parts[0] for _parts in _members}
+    if len(_top_level) == 1 and all(len(_parts) > 1 for _parts in _members):
+        _members = {_parts[1:]: _member for _parts, _member in _members.items()}
+    return {
+        os.path.join(*_parts): _member
+        for _parts, _member in sorted(_members.items())
+        if not any(_part.startswith('.') or _part == '..' for _part in _parts)
+    }
+
+def is_archive(path: str) -> bool:
+    """ Check if a path is an archive file, that can be read as a project. """
+    return path.lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+def is_bare_repository(path: str) -> bool:
+    """ Check if a path is a git directory without working tree. """
+    return (
+        os.path.isfile(os.path.join(path, 'HEAD')) and
+        os.path.isdir(os.path.join(path, 'objects')) and
+        os.path.isdir(os.path.join(path, 'refs'))
+    )
+
+
+def open_source(project_path: str):
+    """ Create the source for the files of a project.
+
+    :param project_path: Path to a project directory, a bare repository or an archive.
+    :returns:            A source object offering list_files, read_bytes,
+                         size, local_path, object_id and close.
+    """
+    if is_archive(project_path):
+        return ArchiveSource(project_path)
+    if is_bare_repository(project_path):
+        return GitTreeSource(project_path)
+    return DirectorySource(project_path)
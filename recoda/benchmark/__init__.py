@@ -0,0 +1,4 @@
+""" Tools to benchmark recoda on generated corpora of research code.
+
+Run them with: python -m recoda.benchmark
+"""
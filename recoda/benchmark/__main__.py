@@ -0,0 +1,272 @@
+""" Command line of the benchmark tools.
+
+python -m recoda.benchmark corpus   writes a synthetic corpus into a folder.
+python -m recoda.benchmark run      times the metrics and the pipeline on one.
+python -m recoda.benchmark scaling  runs recoda with more processes and larger corpora.
+python -m recoda.benchmark compare  compares two stored runs of run or scaling.
+"""
+
+import argparse
+import sys
+
+import pandas
+
+from recoda.benchmark.corpus import CorpusSpec, generate_corpus
+from recoda.benchmark import scaling, suite
+
+
+def parse_arguments(arguments: list) -> argparse.Namespace:
+    """ Reads the command line arguments of the benchmark tools.
+
+    :param arguments:   The command line arguments.
+    :returns:           Values of accepted command line arguments.
+    """
+    _parser = argparse.ArgumentParser(
+        prog='python -m recoda.benchmark',
+        description="""Benchmarks recoda on seeded, synthetic corpora of research code."""
+    )
+    _commands = _parser.add_subparsers(dest='command')
+    _commands.required = True
+
+    _corpus = _commands.add_parser('corpus', help="Write a synthetic corpus into a folder.")
+    _corpus.add_argument('path', type=str, help="Folder to write the projects into.")
+    _add_corpus_arguments(_corpus)
+
+    _run = _commands.add_parser(
+        'run',
+        help="Time every metric and the pipeline on a generated corpus and store the results."
+    )
+    _add_corpus_arguments(_run)
+    _run.add_argument(
+        '-l',
+        '--language',
+        type=str,
+        choices=['python'],
+        help="Language of the metrics to time.",
+        default='python'
+    )
+    _run.add_argument(
+        '--repeat',
+        type=int,
+        help="How often every benchmark is run, the fastest run is kept.",
+        default=3
+    )
+    _run.add_argument(
+        '-p',
+        '--processes',
+        type=int,
+        help="Number of processes of the pipeline.",
+        default=1
+    )
+    _run.add_argument(
+        '--results-dir',
+        type=str,
+        help="Folder to store the results in.",
+        default='benchmark_results'
+    )
+    _run.add_argument(
+        '--baseline',
+        type=str,
+        help="Stored results to compare the run with.",
+        default=None
+    )
+    _add_tolerance_argument(_run)
+
+    _scaling = _commands.add_parser(
+        'scaling',
+        help="Run recoda over generated corpora with 1 to N processes for strong and weak scaling."
+    )
+    _add_corpus_arguments(_scaling)
+    _scaling.add_argument(
+        '-l',
+        '--language',
+        type=str,
+        choices=['python'],
+        help="Language of the metrics.",
+        default='python'
+    )
+    _scaling.add_argument(
+        '-p',
+        '--processes',
+        type=int,
+        nargs='+',
+        help="Numbers of processes to run with.",
+        default=[1, 2, 4]
+    )
+    _scaling.add_argument(
+        '--sizes',
+        type=int,
+        nargs='+',
+        help="Numbers of projects of the corpora measured for strong scaling.",
+        default=[20]
+    )
+    _scaling.add_argument(
+        '--projects-per-process',
+        type=int,
+        help="Projects per process for weak scaling. The smallest size by default.",
+        default=None
+    )
+    _scaling.add_argument(
+        '--repeat',
+        type=int,
+        help="How often every run is repeated, the fastest run is kept.",
+        default=1
+    )
+    _scaling.add_argument(
+        '--results-dir',
+        type=str,
+        help="Folder to store the results in.",
+        default='benchmark_results'
+    )
+    _scaling.add_argument(
+        '--baseline',
+        type=str,
+        help="Stored scaling results to compare with.",
+        default=None
+    )
+    _add_tolerance_argument(_scaling)
+
+    _compare = _commands.add_parser('compare', help="Compare two stored runs.")
+    _compare.add_argument('baseline', type=str, help="Results of the earlier run.")
+    _compare.add_argument('current', type=str, help="Results of the later run.")
+    _add_tolerance_argument(_compare)
+    return _parser.parse_args(arguments)
+
+def _add_corpus_arguments(parser: argparse.ArgumentParser) -> None:
+    """ Arguments shaping the corpus. """
+    _defaults = CorpusSpec()
+    parser.add_argument('--seed', type=int, help="Seed of the corpus.", default=0)
+    parser.add_argument(
+        '--projects',
+        type=int,
+        help="Number of projects.",
+        default=_defaults.projects
+    )
+    parser.add_argument(
+        '--files-per-project',
+        type=int,
+        nargs=2,
+        metavar=('MIN', 'MAX'),
+        help="Range of python modules of a project.",
+        default=_defaults.files_per_project
+    )
+    parser.add_argument(
+        '--lines-per-file',
+        type=int,
+        nargs=2,
+        metavar=('MIN', 'MAX'),
+        help="Range of lines of a module.",
+        default=_defaults.lines_per_file
+    )
+    parser.add_argument(
+        '--docstring-ratio',
+        type=float,
+        help="Chance of modules, classes and functions to have a docstring.",
+        default=_defaults.docstring_ratio
+    )
+    parser.add_argument(
+        '--comment-ratio',
+        type=float,
+        help="Chance of a line of code to be preceded by a comment.",
+        default=_defaults.comment_ratio
+    )
+    parser.add_argument(
+        '--vendored-ratio',
+        type=float,
+        help="Chance of a project to include a tree of third party code.",
+        default=_defaults.vendored_ratio
+    )
+
+def _add_tolerance_argument(parser: argparse.ArgumentParser) -> None:
+    """ Argument deciding which slowdowns are regressions. """
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        help="How much slower, as a fraction, a benchmark may get, e.g. 0.1 for 10%%.",
+        default=0.1
+    )
+
+def _spec(arguments: argparse.Namespace) -> CorpusSpec:
+    """ The corpus shape given on the command line. """
+    return CorpusSpec(
+        projects=arguments.projects,
+        files_per_project=tuple(arguments.files_per_project),
+        lines_per_file=tuple(arguments.lines_per_file),
+        docstring_ratio=arguments.docstring_ratio,
+        comment_ratio=arguments.comment_ratio,
+        vendored_ratio=arguments.vendored_ratio
+    )
+
+def _print_comparison(comparison: list) -> bool:
+    """ Print a comparison of two runs.
+
+    :returns: True if a benchmark regressed.
+    """
+    print('{:<30} {:>12} {:>12} {:>8}'.format('benchmark', 'baseline s', 'current s', 'ratio'))
+    for _name, _before, _after, _ratio, _regressed in comparison:
+        print('{:<30} {:>12.3f} {:>12.3f} {:>8.2f}{}'.format(
+            _name, _before, _after, _ratio, '  REGRESSION' if _regressed else ''
+        ))
+    return any(_item[4] for _item in comparison)
+
+def _main() -> int:
+    """ Main function for executing from the command line.
+
+    :returns: Exit code, 1 if a compared benchmark regressed.
+    """
+    _arguments = parse_arguments(sys.argv[1:])
+    if _arguments.command == 'corpus':
+        _projects = generate_corpus(_arguments.path, _spec(_arguments), _arguments.seed)
+        print(len(_projects), 'projects written to', _arguments.path)
+        return 0
+
+    if _arguments.command == 'scaling':
+        _results = scaling.run_scaling(
+            _arguments.processes,
+            _arguments.sizes,
+            projects_per_process=_arguments.projects_per_process,
+            spec=_spec(_arguments),
+            seed=_arguments.seed,
+            language=_arguments.language,
+            repeat=_arguments.repeat
+        )
+        print('Results stored in', suite.store(_results, _arguments.results_dir, 'scaling_'))
+        _strong, _weak = scaling.tables(_results)
+        with pandas.option_context('display.width', 200, 'display.max_columns', None):
+            print('Strong scaling:')
+            print(_strong.to_string(float_format='{:.3f}'.format))
+            print()
+            print('Weak scaling:')
+            print(_weak.to_string(float_format='{:.3f}'.format))
+        if _arguments.baseline is None:
+            return 0
+        _regressed = _print_comparison(scaling.compare(
+            suite.load(_arguments.baseline), _results, _arguments.tolerance
+        ))
+        return 1 if _regressed else 0
+
+    if _arguments.command == 'run':
+        _results = suite.run_suite(
+            _spec(_arguments),
+            seed=_arguments.seed,
+            language=_arguments.language,
+            repeat=_arguments.repeat,
+            processes=_arguments.processes
+        )
+        print('Results stored in', suite.store(_results, _arguments.results_dir))
+        if _arguments.baseline is None:
+            for _metric, _result in _results['metrics'].items():
+                print('{:<30} {:>12.3f}'.format(_metric, _result['wall_seconds']))
+            print('{:<30} {:>12.3f}'.format('pipeline', _results['pipeline']['wall_seconds']))
+            return 0
+        _baseline = suite.load(_arguments.baseline)
+    else:
+        _baseline = suite.load(_arguments.baseline)
+        _results = suite.load(_arguments.current)
+    # Results of scaling benchmarks have tables instead of metrics.
+    _compare = scaling.compare if 'strong' in _results else suite.compare
+    _regressed = _print_comparison(_compare(_baseline, _results, _arguments.tolerance))
+    return 1 if _regressed else 0
+
+if __name__ == '__main__':
+    sys.exit(_main())
@@ -0,0 +1,326 @@
+""" The corpus module generates corpora of synthetic research code projects.
+
+Projects look like typical research code: python packages with modules
+of functions and classes, docstrings and comments, some style offences,
+README and documentation files in Markdown and reStructuredText,
+setup.py and requirements.txt files declaring part of the imported
+distributions, tests, container recipes, licenses and vendored trees of
+third party code.
+
+Generation is seeded. Every project is generated from its own seed,
+which is drawn from the seed of the corpus, so corpora with more projects
+start with the same projects as smaller ones of the same seed.
+Sizes are drawn log-uniformly between their bounds, so most files
+and projects are small and a few are large, like in real corpora.
+"""
+
+import math
+import os
+import random
+from typing import NamedTuple
+
+# Imports of research code and the distributions providing them.
+_THIRD_PARTY = {
+    'numpy': 'numpy',
+    'scipy': 'scipy',
+    'pandas': 'pandas',
+    'matplotlib': 'matplotlib',
+    'requests': 'requests',
+    'yaml': 'PyYAML',
+    'sklearn': 'scikit-learn',
+    'networkx': 'networkx',
+    'h5py': 'h5py',
+    'tqdm': 'tqdm',
+}
+_STANDARD_LIBRARY = ('os', 'sys', 're', 'json', 'math', 'collections', 'itertools', 'argparse')
+
+_WORDS = (
+    'data', 'model', 'analysis', 'sample', 'result', 'value', 'signal', 'matrix',
+    'experiment', 'parameter', 'measurement', 'simulation', 'distribution', 'estimate',
+    'cell', 'gene', 'protein', 'spectrum', 'particle', 'energy', 'field', 'grid', 'time',
+    'step', 'error', 'noise', 'filter', 'average', 'variance', 'observation', 'calibration',
+    'file', 'input', 'output', 'config', 'path', 'index', 'count', 'weight', 'feature',
+)
+_PROSE = _WORDS + (
+    'the', 'a', 'of', 'to', 'and', 'is', 'in', 'we', 'this', 'for', 'with', 'are',
+    'computes', 'reads', 'writes', 'uses', 'returns', 'describes', 'reproducible',
+    'approximately', 'corresponding', 'independently', 'statistical', 'numerical',
+)
+
+_MIT_LICENSE = """MIT License
+
+Copyright (c) {year} {author}
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+class CorpusSpec(NamedTuple):
+    """ The shape of a generated corpus.
+
+    Ranges are tuples of the smallest and largest value.
+    Ratios are the chance of a project, function or line to have something.
+
+    :ivar projects:             Number of projects.
+    :ivar files_per_project:    Range of python modules of a project's own code.
+    :ivar lines_per_file:       Range of lines of a module.
+    :ivar docstring_ratio:      Chance of modules, classes and functions to have a docstring.
+    :ivar comment_ratio:        Chance of a line of code to be preceded by a comment.
+    :ivar docs_per_project:     Range of Markdown and reStructuredText files besides the README.
+    :ivar words_per_doc:        Range of words of a documentation file.
+    :ivar setup_ratio:          Chance of a project to have a setup.py.
+    :ivar requirements_ratio:   Chance of a project to have a requirements.txt.
+    :ivar test_ratio:           Chance of a project to have tests.
+    :ivar container_ratio:      Chance of a project to have a Dockerfile.
+    :ivar license_ratio:        Chance of a project to have a license file.
+    :ivar vendored_ratio:       Chance of a project to include third party code.
+    :ivar vendored_files:       Range of modules of a vendored tree.
+    """
+    projects: int = 20
+    files_per_project: tuple = (2, 30)
+    lines_per_file: tuple = (20, 400)
+    docstring_ratio: float = 0.6
+    comment_ratio: float = 0.1
+    docs_per_project: tuple = (0, 4)
+    words_per_doc: tuple = (50, 2000)
+    setup_ratio: float = 0.6
+    requirements_ratio: float = 0.5
+    test_ratio: float = 0.4
+    container_ratio: float = 0.1
+    license_ratio: float = 0.7
+    vendored_ratio: float = 0.2
+    vendored_files: tuple = (10, 60)
+
+
+def generate_corpus(path: str, spec: CorpusSpec = CorpusSpec(), seed: int = 0) -> list:
+    """ Write a corpus of projects into a folder.
+
+    :param path:    The folder, it is created if needed.
+                    Every project is a folder in it.
+    :param spec:    The shape of the corpus.
+    :param seed:    Seed of the corpus, the same seed gives the same corpus.
+    :returns:       The paths of the projects.
+    """
+    _random = random.Random(seed)
+    _projects = []
+    for _number in range(spec.projects):
+        _project_seed = _random.randrange(2 ** 32)
+        _project = os.path.join(path, 'project_{:05d}'.format(_number))
+        generate_project(_project, spec, _project_seed)
+        _projects.append(_project)
+    return _projects
+
+def generate_project(path: str, spec: CorpusSpec, seed: int) -> None:
+    """ Write one project into a folder.
+
+    :param path:    The folder of the project, it is created if needed.
+    :param spec:    The shape of the corpus the project belongs to.
+    :param seed:    Seed of the project.
+    """
+    _random = random.Random(seed)
+    _package = _identifier(_random)
+    _imports = _random.sample(sorted(_THIRD_PARTY), _random.randint(0, 5))
+
+    for _number in range(_skewed(_random, spec.files_per_project)):
+        _module = _package + '/__init__.py' if _number == 0 else '{}/{}.py'.format(
+            _package, _identifier(_random)
+        )
+        _write(path, _module, _python_module(_random, spec, _imports, spec.docstring_ratio))
+
+    _write(path, 'README.md', _markdown(_random, spec, _package))
+    for _ in range(_skewed(_random, spec.docs_per_project, minimum=0)):
+        if _random.random() < 0.5:
+            _write(path, 'docs/{}.rst'.format(_identifier(_random)), _restructured_text(_random, spec))
+        else:
+            _write(path, 'docs/{}.md'.format(_identifier(_random)), _markdown(_random, spec))
+
+    # Only part of the imports are declared, like in real projects.
+    _declared = [_module for _module in _imports if _random.random() < 0.7]
+    if _random.random() < spec.setup_ratio:
+        _write(path, 'setup.py', _setup_script(_package, _declared))
+    if _random.random() < spec.requirements_ratio:
+        _write(path, 'requirements.txt', ''.join(
+            '{}>={}.{}\n'.format(_THIRD_PARTY[_module], _random.randint(0, 3), _random.randint(0, 20))
+            for _module in _declared
+        ))
+    if _random.random() < spec.test_ratio:
+        _write(path, 'tests/test_{}.py'.format(_package), _test_module(_random, spec, _package))
+    if _random.random() < spec.container_ratio:
+        _write(path, 'Dockerfile', 'FROM python:3.7\nCOPY . /app\nRUN pip install /app\n')
+    if _random.random() < spec.license_ratio:
+        _write(path, 'LICENSE', _MIT_LICENSE.format(
+            year=_random.randint(2005, 2020),
+            author=' '.join(_random.sample(_WORDS, 2)).title()
+        ))
+    if _random.random() < spec.vendored_ratio:
+        # Third party code is larger and less documented.
+        _vendored = 'third_party/' + _identifier(_random)
+        for _ in range(_skewed(_random, spec.vendored_files)):
+            _write(path, '{}/{}.py'.format(_vendored, _identifier(_random)), _python_module(
+                _random, spec, [], spec.docstring_ratio / 3
+            ))
+
+
+def _python_module(_random: random.Random, spec: CorpusSpec, imports: list, docstring_ratio: float) -> str:
+    """ Source of a module of functions and classes with about as many lines as drawn. """
+    _lines = []
+    if _random.random() < docstring_ratio:
+        _lines.append('""" {} """'.format(_sentence(_random)))
+    for _module in sorted(_random.sample(_STANDARD_LIBRARY, _random.randint(0, 3))) + imports:
+        _lines.append('import {}'.format(_module))
+    _lines.append('')
+    _target = _skewed(_random, spec.lines_per_file)
+    while len(_lines) < _target:
+        if _random.random() < 0.2:
+            _lines.extend(_class(_random, spec, docstring_ratio))
+        else:
+            _lines.extend(_function(_random, spec, docstring_ratio, indent=''))
+    return '\n'.join(_lines) + '\n'
+
+def _class(_random: random.Random, spec: CorpusSpec, docstring_ratio: float) -> list:
+    """ Lines of a class with a few methods. """
+    _lines = ['', 'class {}():'.format(_identifier(_random).title().replace('_', ''))]
+    if _random.random() < docstring_ratio:
+        _lines.append('    """ {} """'.format(_sentence(_random)))
+    for _ in range(_random.randint(1, 4)):
+        _lines.extend(_function(_random, spec, docstring_ratio, indent='    ', method=True))
+    return _lines
+
+def _function(
+        _random: random.Random,
+        spec: CorpusSpec,
+        docstring_ratio: float,
+        indent: str,
+        method: bool = False
+) -> list:
+    """ Lines of a function of assignments, loops and calls. """
+    _arguments = _random.sample(_WORDS, _random.randint(0, 3))
+    _names = list(_arguments) or ['value']
+    _lines = ['', '{}def {}({}):'.format(
+        indent, _identifier(_random), ', '.join((['self'] if method else []) + _arguments)
+    )]
+    _body = indent + '    '
+    if _random.random() < docstring_ratio:
+        _lines.append('{}"""{}'.format(_body, _sentence(_random)))
+        for _argument in _arguments:
+            _lines.append('{}:param {}: {}'.format(_body, _argument, _sentence(_random)))
+        _lines.append(_body + '"""')
+    if not _arguments:
+        _lines.append('{}value = {}'.format(_body, _random.randint(0, 100)))
+    for _ in range(_random.randint(2, 12)):
+        if _random.random() < spec.comment_ratio:
+            _lines.append('{}# {}'.format(_body, _sentence(_random)))
+        _name = _identifier(_random, 1)
+        _kind = _random.random()
+        if _kind < 0.5:
+            _lines.append('{}{} = {} * {} + {}'.format(
+                _body, _name, _random.choice(_names), _random.random(), _random.randint(0, 9)
+            ))
+        elif _kind < 0.7:
+            _lines.append('{}{} = [{} for _ in range({})]'.format(
+                _body, _name, _random.choice(_names), _random.randint(1, 20)
+            ))
+        elif _kind < 0.85:
+            _lines.append('{}for {} in range({}):'.format(_body, _name, _random.randint(1, 100)))
+            _lines.append('{}    {} = {} - {}'.format(_body, _random.choice(_names), _name, _random.choice(_names)))
+        elif _kind < 0.95:
+            _lines.append('{}if {} > {}:'.format(_body, _random.choice(_names), _random.randint(0, 50)))
+            _lines.append('{}    {} = {}'.format(_body, _name, _random.choice(_names)))
+        else:
+            # Lines too long for pycodestyle.
+            _lines.append('{}{} = {}'.format(
+                _body, _name, ' + '.join(_random.choice(_names) for _ in range(20))
+            ))
+        _names.append(_name)
+    _lines.append('{}return {}'.format(_body, _random.choice(_names)))
+    return _lines
+
+def _test_module(_random: random.Random, spec: CorpusSpec, package: str) -> str:
+    """ Source of a test module using unittest or pytest. """
+    _library = _random.choice(('unittest', 'pytest'))
+    _lines = ['import {}'.format(_library), 'import {}'.format(package), '']
+    for _ in range(_random.randint(1, 5)):
+        _lines.extend(['', 'def test_{}():'.format(_identifier(_random)), '    assert {}'.format(package)])
+    return '\n'.join(_lines) + '\n'
+
+def _setup_script(package: str, declared: list) -> str:
+    """ Source of a setup.py installing the package. """
+    return (
+        'from setuptools import setup, find_packages\n\n'
+        'setup(\n'
+        "    name='{}',\n"
+        "    version='0.1.0',\n"
+        '    packages=find_packages(),\n'
+        '    install_requires={},\n'
+        ')\n'
+    ).format(package, [_THIRD_PARTY[_module] for _module in declared])
+
+def _markdown(_random: random.Random, spec: CorpusSpec, title: str = None) -> str:
+    """ Markdown with headings, paragraphs, a list and a code block. """
+    _text = ['# {}'.format(title or _sentence(_random, 2, 5).rstrip('.')), '']
+    for _section, _paragraph in enumerate(_paragraphs(_random, spec)):
+        if _section and _random.random() < 0.3:
+            _text.extend(['## {}'.format(_sentence(_random, 1, 4).rstrip('.')), ''])
+        _text.extend([_paragraph, ''])
+    _text.extend(['* ' + _sentence(_random) for _ in range(_random.randint(0, 4))])
+    _text.extend(['', '```', 'pip install .', '```', ''])
+    return '\n'.join(_text)
+
+def _restructured_text(_random: random.Random, spec: CorpusSpec) -> str:
+    """ reStructuredText with a title, paragraphs and a code block. """
+    _title = _sentence(_random, 2, 5).rstrip('.')
+    _text = [_title, '=' * len(_title), '']
+    for _paragraph in _paragraphs(_random, spec):
+        _text.extend([_paragraph, ''])
+    _text.extend(['.. code-block:: python', '', '    import numpy', ''])
+    return '\n'.join(_text)
+
+def _paragraphs(_random: random.Random, spec: CorpusSpec) -> list:
+    """ Paragraphs of prose with about as many words as drawn for a document. """
+    _words = _skewed(_random, spec.words_per_doc)
+    _paragraphs = []
+    while _words > 0:
+        _sentences = [_sentence(_random) for _ in range(_random.randint(2, 6))]
+        _words = _words - sum(len(_item.split()) for _item in _sentences)
+        _paragraphs.append(' '.join(_sentences))
+    return _paragraphs
+
+def _sentence(_random: random.Random, shortest: int = 6, longest: int = 20) -> str:
+    """ A sentence of prose. """
+    _words = [_random.choice(_PROSE) for _ in range(_random.randint(shortest, longest))]
+    return ' '.join(_words).capitalize() + '.'
+
+def _identifier(_random: random.Random, words: int = None) -> str:
+    """ A snake case name of one to three words. """
+    return '_'.join(_random.choice(_WORDS) for _ in range(words or _random.randint(1, 3)))
+
+def _skewed(_random: random.Random, bounds: tuple, minimum: int = 1) -> int:
+    """ Draw a number log-uniformly between bounds, so small numbers are more likely. """
+    _low, _high = max(bounds[0], minimum), max(bounds[1], minimum)
+    if _low == 0:
+        # Log-uniform between 1 and high + 1, shifted to start at 0.
+        return int(math.exp(_random.uniform(0, math.log(_high + 1)))) - 1
+    return int(math.exp(_random.uniform(math.log(_low), math.log(_high + 1))))
+
+def _write(project: str, relative_path: str, content: str) -> None:
+    """ Write a file of a project, creating its folders. """
+    _path = os.path.join(project, relative_path)
+    os.makedirs(os.path.dirname(_path), exist_ok=True)
+    with open(_path, 'w') as _file:
+        _file.write(content)
@@ -0,0 +1,214 @@
+""" The scaling module measures how whole runs of recoda scale.
+
+The command line of recoda measures generated corpora of several sizes
+with 1 to N processes, like a user would run it.
+
+Strong scaling measures the same corpus with more processes.
+Ideally the wall time halves with twice the processes, which the
+parallel efficiency, the speedup divided by the processes, tells.
+Weak scaling grows the corpus with the processes, keeping the projects
+per process. Ideally the wall time stays the same, so its efficiency
+is the wall time with one process divided by the wall time with more.
+
+The peak memory of a run is the resident set size of its largest
+process, the main process or one of its workers.
+"""
+
+import concurrent.futures
+import datetime
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas
+
+from recoda.benchmark.corpus import CorpusSpec, generate_corpus
+from recoda.benchmark.suite import recoda_revision
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak memory is not measured there.
+    resource = None
+
+
+def run_scaling(
+        processes: list,
+        sizes: list,
+        projects_per_process: int = None,
+        spec: CorpusSpec = CorpusSpec(),
+        seed: int = 0,
+        language: str = 'python',
+        repeat: int = 1
+) -> dict:
+    """ Run recoda over generated corpora for strong and weak scaling.
+
+    :param processes:               Numbers of processes to run with, e.g. [1, 2, 4, 8].
+    :param sizes:                   Numbers of projects of the corpora for strong scaling.
+    :param projects_per_process:    Projects per process for weak scaling.
+                                    The smallest size by default.
+    :param spec:                    Shape of the corpora, apart from their number of projects.
+    :param seed:                    Seed of the corpora.
+    :param language:                Language of the metrics.
+    :param repeat:                  How often every run is repeated, the fastest is kept.
+    :returns:                       The rows of both tables with what they were measured on.
+    """
+    processes = sorted(set(processes))
+    projects_per_process = projects_per_process or min(sizes)
+    _corpora = tempfile.mkdtemp(prefix='recoda_scaling_')
+    try:
+        _strong = []
+        for _size in sorted(set(sizes)):
+            _corpus, _files = _corpus_of_size(_corpora, spec, seed, _size)
+            _rows = [
+                _best_run(_corpus, _size, _files, _processes, language, repeat)
+                for _processes in processes
+            ]
+            for _row in _rows:
+                _row['speedup'] = _rows[0]['wall_seconds'] / _row['wall_seconds']
+                _row['efficiency'] = (
+                    _row['speedup'] * _rows[0]['processes'] / _row['processes']
+                )
+            _strong.extend(_rows)
+
+        _weak = []
+        for _processes in processes:
+            _size = projects_per_process * _processes
+            _corpus, _files = _corpus_of_size(_corpora, spec, seed, _size)
+            _weak.append(_best_run(_corpus, _size, _files, _processes, language, repeat))
+        for _row in _weak:
+            _row['efficiency'] = _weak[0]['wall_seconds'] / _row['wall_seconds']
+    finally:
+        shutil.rmtree(_corpora, ignore_errors=True)
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'recoda_revision': recoda_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'corpus': {'seed': seed, 'spec': spec._asdict()},
+        'language': language,
+        'repeat': repeat,
+        'strong': _strong,
+        'weak': _weak,
+    }
+
+def tables(results: dict) -> tuple:
+    """ The strong and weak scaling tables of results of run_scaling. """
+    _columns = ['projects', 'processes']
+    return (
+        pandas.DataFrame(results['strong']).set_index(_columns),
+        pandas.DataFrame(results['weak']).set_index(_columns),
+    )
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.1) -> list:
+    """ Compare the wall times of the runs of two scaling benchmarks.
+
+    :param baseline:    Results of the earlier benchmark.
+    :param current:     Results of the later benchmark.
+    :param tolerance:   How much slower, as a fraction, a run may get
+                        before it counts as a regression.
+    :returns:           Tuples of run name, baseline and current seconds,
+                        their ratio and if it is a regression, for every
+                        run in both benchmarks.
+    """
+    _comparison = []
+    for _table in ('strong', 'weak'):
+        _before = {
+            (_row['projects'], _row['processes']): _row['wall_seconds']
+            for _row in baseline[_table]
+        }
+        for _row in current[_table]:
+            _key = (_row['projects'], _row['processes'])
+            if _key not in _before:
+                continue
+            _ratio = _row['wall_seconds'] / _before[_key] if _before[_key] else float('inf')
+            _comparison.append((
+                '{} {}x{}'.format(_table, *_key),
+                _before[_key],
+                _row['wall_seconds'],
+                _ratio,
+                _ratio > 1 + tolerance
+            ))
+    return _comparison
+
+
+def _corpus_of_size(corpora: str, spec: CorpusSpec, seed: int, size: int) -> tuple:
+    """ Generate a corpus with a number of projects, once.
+
+    :returns: The folder of the corpus and its number of files.
+    """
+    _corpus = os.path.join(corpora, str(size))
+    if not os.path.isdir(_corpus):
+        generate_corpus(_corpus, spec._replace(projects=size), seed)
+    _files = sum(len(_names) for _, _, _names in os.walk(_corpus))
+    return _corpus, _files
+
+def _best_run(
+        corpus: str,
+        projects: int,
+        files: int,
+        processes: int,
+        language: str,
+        repeat: int
+) -> dict:
+    """ Run recoda over a corpus repeatedly and describe its fastest run. """
+    _runs = [_run(corpus, processes, language) for _ in range(repeat)]
+    _wall_seconds = min(_wall for _wall, _ in _runs)
+    _peaks = [_peak for _, _peak in _runs if _peak is not None]
+    return {
+        'projects': projects,
+        'processes': processes,
+        'files': files,
+        'wall_seconds': _wall_seconds,
+        'projects_per_second': projects / _wall_seconds,
+        'files_per_second': files / _wall_seconds,
+        'peak_rss_mib': max(_peaks) / 1024 if _peaks else None,
+    }
+
+def _run(corpus: str, processes: int, language: str) -> tuple:
+    """ Run recoda over a corpus in a fresh process.
+
+    The peak memory of a process' children is the largest of all of them,
+    so every run gets a process of its own to start recoda from.
+
+    :returns: The wall seconds and the peak resident set size in KiB.
+    """
+    _context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=_context) as _executor:
+        return _executor.submit(_run_command_line, corpus, processes, language).result()
+
+def _run_command_line(corpus: str, processes: int, language: str) -> tuple:
+    """ Run the command line of recoda and measure it. """
+    _output_folder = tempfile.mkdtemp(prefix='recoda_scaling_output_')
+    try:
+        _start = time.perf_counter()
+        _process = subprocess.run(
+            [
+                sys.executable, '-m', 'recoda',
+                '-l', language,
+                '-b', corpus,
+                '-t', 'directory',
+                '-f', os.path.join(_output_folder, 'results.csv'),
+                '-p', str(processes),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        _wall_seconds = time.perf_counter() - _start
+    finally:
+        shutil.rmtree(_output_folder, ignore_errors=True)
+    if _process.returncode != 0:
+        raise RuntimeError('recoda failed: ' + _process.stderr.decode(errors='replace')[-2000:])
+    if resource is None:
+        return _wall_seconds, None
+    _peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if sys.platform == 'darwin':
+        # Given in bytes instead of KiB.
+        _peak = _peak // 1024
+    return _wall_seconds, _peak
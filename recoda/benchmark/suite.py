@@ -0,0 +1,189 @@
+""" The suite module times recoda on a generated corpus and compares runs.
+
+Every metric is timed on every project of the corpus, each in its own
+project scope, so a metric is charged for the parsing it needs and its
+time does not depend on the metrics run before it. Then the whole
+MeasureProjects pipeline measures the corpus, like a regular run.
+Every benchmark is repeated and the fastest repetition is kept,
+which is the least disturbed by other load on the machine.
+
+Results are stored as JSON files, with the corpus, the machine
+and the revision of recoda they were measured with, so later runs
+can be compared with them to find regressions.
+"""
+
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+from recoda.analyse.helpers import project_scope
+from recoda.benchmark.corpus import CorpusSpec, generate_corpus
+from recoda.instrumentation import timed_call
+import recoda.project_handler.directory
+
+
+def run_suite(
+        spec: CorpusSpec = CorpusSpec(),
+        seed: int = 0,
+        language: str = 'python',
+        repeat: int = 3,
+        processes: int = 1
+) -> dict:
+    """ Generate a corpus and time every metric and the pipeline on it.
+
+    :param spec:        The shape of the corpus.
+    :param seed:        Seed of the corpus.
+    :param language:    Language of the metrics to time.
+    :param repeat:      How often every benchmark is run.
+    :param processes:   Number of processes of the pipeline.
+    :returns:           The results with what they were measured on.
+    """
+    _corpus = tempfile.mkdtemp(prefix='recoda_corpus_')
+    try:
+        _projects = generate_corpus(_corpus, spec, seed)
+        _metrics = benchmark_metrics(_projects, language, repeat)
+        _pipeline = benchmark_pipeline(_corpus, language, repeat, processes)
+    finally:
+        shutil.rmtree(_corpus, ignore_errors=True)
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'recoda_revision': recoda_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'corpus': {'seed': seed, 'spec': spec._asdict()},
+        'language': language,
+        'repeat': repeat,
+        'processes': processes,
+        'metrics': _metrics,
+        'pipeline': _pipeline,
+    }
+
+def benchmark_metrics(projects: list, language: str = 'python', repeat: int = 3) -> dict:
+    """ Time every metric on all projects.
+
+    :param projects:    Paths of the projects.
+    :param language:    Language of the metrics.
+    :param repeat:      How often every metric measures all projects.
+    :returns:           Wall and CPU seconds of the fastest repetition, keyed by metric.
+    """
+    # Imported here, since the command line module imports all metrics.
+    from recoda.__main__ import MeasureProjects
+
+    _results = {}
+    for _metric, _function in MeasureProjects.metric_functions(language).items():
+        _repetitions = []
+        for _ in range(repeat):
+            _wall_seconds = 0
+            _cpu_seconds = 0
+            for _project in projects:
+                with project_scope(_project):
+                    _, _record = timed_call(_function, _project)
+                _wall_seconds = _wall_seconds + _record['wall_seconds']
+                _cpu_seconds = _cpu_seconds + _record['cpu_seconds']
+            _repetitions.append((_wall_seconds, _cpu_seconds))
+        _wall_seconds, _cpu_seconds = min(_repetitions)
+        _results[_metric] = {'wall_seconds': _wall_seconds, 'cpu_seconds': _cpu_seconds}
+    return _results
+
+def benchmark_pipeline(
+        corpus: str,
+        language: str = 'python',
+        repeat: int = 3,
+        processes: int = 1
+) -> dict:
+    """ Time measuring a corpus with MeasureProjects, like a run of recoda.
+
+    :param corpus:      Folder with a project in every sub folder.
+    :param language:    Language of the metrics.
+    :param repeat:      How often the corpus is measured.
+    :param processes:   Number of processes measuring projects.
+    :returns:           Wall seconds of the fastest repetition and projects per second.
+    """
+    from recoda.__main__ import MeasureProjects
+
+    _repetitions = []
+    for _ in range(repeat):
+        _measurement = MeasureProjects(
+            recoda.project_handler.directory.Handler(corpus),
+            language,
+            multiprocessing_chunk_size=processes
+        )
+        _start = time.perf_counter()
+        # The progress of every project is not of interest here.
+        with contextlib.redirect_stdout(io.StringIO()):
+            _projects = sum(len(_chunk) for _chunk in _measurement.measure())
+        _repetitions.append(time.perf_counter() - _start)
+    _wall_seconds = min(_repetitions)
+    return {
+        'wall_seconds': _wall_seconds,
+        'projects': _projects,
+        'projects_per_second': _projects / _wall_seconds,
+    }
+
+def store(results: dict, results_dir: str, prefix: str = '') -> str:
+    """ Write results into a folder of results, named by date and revision.
+
+    :param prefix:  Start of the file name, e.g. to tell kinds of benchmarks apart.
+    :returns:       Path to the written file.
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    _name = '{}{}_{}.json'.format(
+        prefix,
+        results['created'].replace(':', '-'),
+        (results.get('recoda_revision') or 'unknown')[:12]
+    )
+    _path = os.path.join(results_dir, _name)
+    with open(_path, 'w') as _file:
+        json.dump(results, _file, indent=2, sort_keys=True)
+    return _path
+
+def load(path: str) -> dict:
+    """ Read results written by store. """
+    with open(path, 'r') as _file:
+        return json.load(_file)
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.1) -> list:
+    """ Compare the wall times of two runs of the suite.
+
+    Runs should use the same corpus and machine, to be comparable.
+
+    :param baseline:    Results of the earlier run.
+    :param current:     Results of the later run.
+    :param tolerance:   How much slower, as a fraction, a benchmark may get
+                        before it counts as a regression.
+    :returns:           Tuples of benchmark name, baseline and current seconds,
+                        their ratio and if it is a regression, for every
+                        benchmark in both runs. The pipeline comes last.
+    """
+    _times = [
+        (_metric, baseline['metrics'][_metric]['wall_seconds'], _result['wall_seconds'])
+        for _metric, _result in current['metrics'].items()
+        if _metric in baseline['metrics']
+    ]
+    _times.append(('pipeline', baseline['pipeline']['wall_seconds'], current['pipeline']['wall_seconds']))
+    _comparison = []
+    for _name, _before, _after in _times:
+        _ratio = _after / _before if _before else float('inf')
+        _comparison.append((_name, _before, _after, _ratio, _ratio > 1 + tolerance))
+    return _comparison
+
+def recoda_revision() -> str:
+    """ The git revision of the recoda source, None if it is not in a repository. """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True
+        ).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
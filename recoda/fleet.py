@@ -0,0 +1,310 @@
+""" The fleet module spreads the measurements of one run over workers on several machines.
+
+A coordinator discovers the projects and writes the output, like a regular run.
+Instead of measuring projects itself, it hands them to workers connecting
+to it over TCP, e.g. one worker per node with all its cores.
+Workers measure the projects with a local process pool and send the rows back,
+so the run keeps one output file, which also serves to resume it.
+
+Coordinator and workers talk through multiprocessing.managers,
+authenticated by a shared key. Project paths must be valid on every
+worker, e.g. on a shared file system.
+
+Projects handed to a worker are leases, renewed while the worker lives.
+Projects of workers, that stopped, are handed to other workers.
+"""
+
+import os
+import queue
+import socket
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+from recoda.output import ProjectResult
+
+# How often a project may be handed out before it is given up,
+# e.g. because it crashes every worker measuring it.
+MAX_ATTEMPTS = 3
+
+
+class _CoordinatorManager(BaseManager):
+    """ Serves the assignments of a coordinator.
+
+    Registering changes the class, so every coordinator registers
+    its assignments with a subclass of its own.
+    """
+
+class _WorkerManager(BaseManager):
+    """ Connects to the assignments of a coordinator. """
+
+_WorkerManager.register('assignments')
+
+
+class _Assignments():
+    """ The projects of a run and the workers measuring them.
+
+    Lives in the coordinator, workers call its methods through proxies.
+    """
+
+    def __init__(self, lease_seconds: float):
+        """
+        :ivar _tasks:           Iterator of the task tuples of the run,
+                                with the identifier at the second place.
+                                None until the run starts.
+        :ivar _leases:          Task, worker and end of the lease for every
+                                project handed out, keyed by its identifier.
+        :ivar _attempts:        How often projects were handed out, keyed by identifier.
+        :ivar _expired:         Tasks to hand out again, because their lease expired.
+
+        :param lease_seconds:   How long a project stays with a worker without renewal.
+        """
+        self.results = queue.Queue()
+        self._tasks = None
+        self._lease_seconds = lease_seconds
+        self._leases = {}
+        self._attempts = {}
+        self._expired = []
+        self._lock = threading.Lock()
+        self._discovery_lock = threading.Lock()
+        self._discovery_finished = False
+
+    def get_task(self, worker: str) -> tuple:
+        """ Hand the next project to a worker.
+
+        :returns: The task tuple, None if there is nothing to do right now.
+        """
+        with self._lock:
+            self._expire_leases()
+            if self._expired:
+                return self._lease(self._expired.pop(0), worker)
+        # Discovering the next project may take a while, e.g. for cloning,
+        # so other workers can deliver their rows meanwhile.
+        with self._discovery_lock:
+            if self._tasks is None or self._discovery_finished:
+                return None
+            _task = next(self._tasks, None)
+            if _task is None:
+                self._discovery_finished = True
+                return None
+        with self._lock:
+            return self._lease(_task, worker)
+
+    def set_tasks(self, tasks) -> None:
+        """ Start handing out the tasks of a run. """
+        with self._discovery_lock:
+            self._tasks = iter(tasks)
+
+    def lease_seconds(self) -> float:
+        """ How long a project stays with a worker without renewal. """
+        return self._lease_seconds
+
+    def renew(self, worker: str) -> None:
+        """ Extend the leases of all projects of a worker. """
+        _until = time.time() + self._lease_seconds
+        with self._lock:
+            for _identifier, (_task, _worker, _) in self._leases.items():
+                if _worker == worker:
+                    self._leases[_identifier] = (_task, _worker, _until)
+
+    def release(self, worker: str) -> None:
+        """ Hand out the projects of a worker again right away, e.g. because its runner failed. """
+        with self._lock:
+            for _identifier, (_task, _worker, _) in list(self._leases.items()):
+                if _worker == worker:
+                    self._leases[_identifier] = (_task, _worker, 0)
+            self._expire_leases()
+
+    def put_result(self, result: tuple) -> None:
+        """ Take the result of a measured project, a tuple starting with its identifier.
+
+        Results of projects, that were already delivered by another worker, are dropped.
+        Projects, that raised an error, are delivered as results with the error,
+        so they are not handed out again.
+        """
+        _identifier = result[0]
+        with self._lock:
+            if self._leases.pop(_identifier, None) is None:
+                return
+            self._expired = [_task for _task in self._expired if _task[1] != _identifier]
+            # Queued while locked, so the run can not look finished before.
+            self.results.put(result)
+
+    def finished(self) -> bool:
+        """ Tell if all projects are handed out and measured. """
+        with self._lock:
+            self._expire_leases()
+            return self._discovery_finished and not self._leases and not self._expired
+
+    def _lease(self, task: tuple, worker: str) -> tuple:
+        """ Record, that a worker measures a task. """
+        _identifier = task[1]
+        self._attempts[_identifier] = self._attempts.get(_identifier, 0) + 1
+        self._leases[_identifier] = (task, worker, time.time() + self._lease_seconds)
+        return task
+
+    def _expire_leases(self) -> None:
+        """ Hand out projects again, whose workers stopped renewing. """
+        _now = time.time()
+        for _identifier, (_task, _worker, _until) in list(self._leases.items()):
+            if _until >= _now:
+                continue
+            del self._leases[_identifier]
+            if self._attempts[_identifier] < MAX_ATTEMPTS:
+                self._expired.append(_task)
+            else:
+                # Delivered like projects raising an error, so the run records it as failed.
+                self.results.put(ProjectResult(
+                    _identifier,
+                    [],
+                    error='Given up after {} attempts, the lease of worker {} expired.'.format(
+                        MAX_ATTEMPTS, _worker
+                    )
+                ))
+
+
+class Coordinator():
+    """ Hand the projects of a run to workers and gather their rows. """
+
+    def __init__(self, address: tuple, authkey: bytes, lease_seconds: float = 600):
+        """ Initialise the coordinator.
+
+        :param address:         Host and port to listen on. Port 0 picks a free port.
+        :param authkey:         Key, workers need to connect.
+        :param lease_seconds:   How long a project stays with a worker without renewal.
+        """
+        self._address = address
+        self._authkey = authkey
+        self._lease_seconds = lease_seconds
+        self._assignments = None
+        self._server = None
+        self._serving = None
+
+    @property
+    def address(self) -> tuple:
+        """ The address, the coordinator listens on, once it is started. """
+        if self._server is None:
+            return self._address
+        return self._server.address
+
+    def start(self) -> None:
+        """ Start to accept workers in a background thread. """
+        self._assignments = _Assignments(self._lease_seconds)
+        _assignments = self._assignments
+
+        class _Manager(_CoordinatorManager):
+            """ Serves the assignments of this coordinator. """
+
+        _Manager.register('assignments', callable=lambda: _assignments)
+        self._server = _Manager(
+            address=self._address,
+            authkey=self._authkey
+        ).get_server()
+        self._serving = threading.Thread(target=_serve, args=(self._server,), daemon=True)
+        self._serving.start()
+
+    def stop(self) -> None:
+        """ Stop accepting workers and wait for the server to end. """
+        self._server.stop_event.set()
+        self._server.listener.close()
+        self._serving.join()
+
+    def run(self, tasks, _processes: int = None):
+        """ Generator handing out the tasks and outputting the rows of measured projects.
+
+        Can be used in place of running the tasks in a local process pool.
+
+        :param tasks:       Iterator of the task tuples to hand out.
+        :param _processes:  Not used, the workers decide on their processes.
+        :returns:           The result of every project.
+        """
+        if self._server is None:
+            self.start()
+        self._assignments.set_tasks(tasks)
+        print('Waiting for workers on {}:{}'.format(*self.address))
+        try:
+            while True:
+                try:
+                    yield self._assignments.results.get(timeout=1)
+                except queue.Empty:
+                    if self._assignments.finished() and self._assignments.results.empty():
+                        return
+        finally:
+            self.stop()
+
+
+def run_worker(
+        address: tuple,
+        authkey: bytes,
+        runner,
+        processes: int,
+        poll_seconds: float = 5
+) -> int:
+    """ Measure projects of a coordinator until all are measured.
+
+    :param address:         Host and port of the coordinator.
+    :param authkey:         Key of the coordinator.
+    :param runner:          Function running an iterator of tasks with a number
+                            of processes and yielding a result for every project,
+                            a tuple starting with its identifier, like recoda's process pool.
+                            Projects raising an error are expected as results, too.
+    :param processes:       Number of processes measuring projects.
+    :param poll_seconds:    How long to wait, before asking again, when all
+                            remaining projects are handed to other workers.
+    :returns:               The number of projects measured.
+    """
+    _manager = _WorkerManager(address=address, authkey=authkey)
+    _manager.connect()
+    _assignments = _manager.assignments()
+    _worker = '{}:{}'.format(socket.gethostname(), os.getpid())
+
+    _renewing = threading.Thread(
+        target=_renew_leases,
+        args=(_assignments, _worker, _assignments.lease_seconds() / 3),
+        daemon=True
+    )
+    _renewing.start()
+
+    _measured = 0
+    try:
+        for _result in runner(_remote_tasks(_assignments, _worker, poll_seconds), processes):
+            _assignments.put_result(_result)
+            _measured = _measured + 1
+    except Exception:
+        # Errors of single projects are results, so the runner itself failed.
+        # Other workers get its projects without waiting for the leases to expire.
+        _assignments.release(_worker)
+        raise
+    return _measured
+
+def _serve(server) -> None:
+    """ Serve the assignments until the server is stopped. """
+    try:
+        server.serve_forever()
+    except SystemExit:
+        # serve_forever ends with sys.exit, meant for a server in a process of its own.
+        pass
+
+def _remote_tasks(assignments, worker: str, poll_seconds: float):
+    """ Generator of the tasks handed to a worker, ends when the coordinator is done. """
+    try:
+        while True:
+            _task = assignments.get_task(worker)
+            if _task is not None:
+                yield _task
+            elif assignments.finished():
+                return
+            else:
+                time.sleep(poll_seconds)
+    except (EOFError, ConnectionError):
+        # The coordinator stops, once all rows are delivered.
+        return
+
+def _renew_leases(assignments, worker: str, interval: float):
+    """ Renew the leases of a worker, until it ends or the coordinator is gone. """
+    try:
+        while True:
+            time.sleep(interval)
+            assignments.renew(worker)
+    except (EOFError, ConnectionError):
+        return
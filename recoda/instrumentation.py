@@ -0,0 +1,140 @@
+""" The instrumentation module records what measuring every metric costs.
+
+For every project, or revision, and metric the wall time, the CPU time
+of the measuring process and the growth of its peak resident set size
+are recorded. The records are written to a sidecar file of the run,
+which recoda report summarises by metric and by project size.
+
+Metrics share intermediate results of a project, like parsed files.
+Their cost is recorded for the first metric asking for them.
+"""
+
+import math
+import sys
+import time
+
+import pandas
+
+from recoda.output import Category, read_chunks
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak memory is not recorded there.
+    resource = None
+
+# Columns of the timing records, following id and, for histories, revision.
+TIMING_TYPES = {
+    'metric': Category(),
+    'loc': int,
+    'wall_seconds': float,
+    'cpu_seconds': float,
+    'peak_rss_growth_kib': int,
+}
+
+
+def timed_call(function, project_path: str) -> tuple:
+    """ Measure a metric of a project and what it costs.
+
+    :param function:        The measure function of the metric.
+    :param project_path:    Path to the project.
+    :returns:               The value of the metric and a record of its cost.
+    """
+    _peak_before = _peak_rss_kib()
+    _cpu_start = time.process_time()
+    _wall_start = time.perf_counter()
+    _value = function(project_path)
+    _record = {
+        'wall_seconds': time.perf_counter() - _wall_start,
+        'cpu_seconds': time.process_time() - _cpu_start,
+        'peak_rss_growth_kib': None,
+    }
+    if _peak_before is not None:
+        _record['peak_rss_growth_kib'] = _peak_rss_kib() - _peak_before
+    return _value, _record
+
+def size_class(loc) -> str:
+    """ The order of magnitude of a project's lines of code, e.g. 100-999. """
+    if loc is None or pandas.isna(loc):
+        return 'unknown'
+    _digits = len(str(max(int(loc), 0)))
+    return '{}-{}'.format(0 if _digits == 1 else 10 ** (_digits - 1), 10 ** _digits - 1)
+
+def summarise(timing_files: list, chunk_rows: int = 100000) -> tuple:
+    """ Summarise the costs of the metrics of one or more runs.
+
+    The files are read chunk by chunk, so only the sums are kept in memory.
+
+    :param timing_files:    Paths to timing files in any result format.
+    :param chunk_rows:      Number of records read at once.
+    :returns:               Two DataFrames, the costs by metric,
+                            most expensive first, and by size of the projects.
+    """
+    _sums = None
+    for _timing_file in timing_files:
+        for _chunk in read_chunks(_timing_file, chunk_rows=chunk_rows):
+            _chunk = _chunk.assign(
+                size=[size_class(_loc) for _loc in _chunk['loc']],
+                metric=_chunk['metric'].astype(str),
+                calls=1
+            )
+            _chunk_sums = _chunk.groupby(['metric', 'size']).agg(
+                calls=('calls', 'sum'),
+                wall_seconds=('wall_seconds', 'sum'),
+                cpu_seconds=('cpu_seconds', 'sum'),
+                max_wall_seconds=('wall_seconds', 'max'),
+                max_peak_rss_growth_kib=('peak_rss_growth_kib', 'max'),
+            )
+            if _sums is None:
+                _sums = _chunk_sums
+            else:
+                _sums = pandas.concat([_sums, _chunk_sums]).groupby(level=['metric', 'size']).agg({
+                    'calls': 'sum',
+                    'wall_seconds': 'sum',
+                    'cpu_seconds': 'sum',
+                    'max_wall_seconds': 'max',
+                    'max_peak_rss_growth_kib': 'max',
+                })
+    if _sums is None:
+        raise ValueError('The timing files hold no records.')
+
+    _by_metric = _sums.groupby(level='metric').agg({
+        'calls': 'sum',
+        'wall_seconds': 'sum',
+        'cpu_seconds': 'sum',
+        'max_wall_seconds': 'max',
+        'max_peak_rss_growth_kib': 'max',
+    })
+    _by_metric['share_of_wall'] = _by_metric['wall_seconds'] / _by_metric['wall_seconds'].sum()
+    _by_metric['mean_wall_seconds'] = _by_metric['wall_seconds'] / _by_metric['calls']
+    _by_metric = _by_metric.sort_values('wall_seconds', ascending=False)
+
+    # Every project is measured once by every metric, so the
+    # metric with the most calls tells the number of projects.
+    _by_size = _sums.groupby(level='size').agg({
+        'calls': 'max',
+        'wall_seconds': 'sum',
+        'cpu_seconds': 'sum',
+    }).rename(columns={'calls': 'projects'})
+    _by_size['wall_seconds_per_project'] = _by_size['wall_seconds'] / _by_size['projects']
+    _by_size['most_expensive_metric'] = (
+        _sums['wall_seconds'].unstack('metric').idxmax(axis=1).reindex(_by_size.index)
+    )
+    _by_size = _by_size.sort_index(key=lambda _sizes: [_size_order(_size) for _size in _sizes])
+    return _by_metric, _by_size
+
+def _size_order(size: str) -> float:
+    """ Sort key of size classes, unknown sizes last. """
+    if size == 'unknown':
+        return math.inf
+    return int(size.split('-')[0])
+
+def _peak_rss_kib():
+    """ The peak resident set size of this process so far in KiB, None if unknown. """
+    if resource is None:
+        return None
+    _peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # Given in bytes instead of KiB.
+        return _peak // 1024
+    return _peak
@@ -0,0 +1,664 @@
+""" Functions for the result files written by recoda.
+
+Measurements are written as csv files with one row per project,
+or per revision when histories are measured.
+Parquet files keep the type of every column. Runs write them as
+finished part files next to the result file, e.g. results.part-00001.parquet
+for results.parquet, so a killed run keeps the rows of its finished parts.
+The result file and its part files are read together. They need pyarrow.
+SQLite databases hold the rows in a table keyed by id, so rows of
+projects measured again are replaced and looking up ids uses an index.
+
+In memory, chunks of rows use compact nullable column types,
+see typed_frame, which the typed formats keep.
+"""
+
+import gzip
+import math
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from typing import NamedTuple, Optional
+
+import numpy
+import pandas
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    # Only needed for parquet files.
+    pyarrow = None
+
+OUTPUT_FORMATS = ('csv', 'parquet', 'sqlite')
+
+# Table of the rows in SQLite result files.
+RESULTS_TABLE = 'results'
+
+# Rows buffered for a parquet part file of a run.
+PARQUET_ROWS_PER_FILE = 10000
+
+
+class Category(NamedTuple):
+    """ Type of text columns with few distinct values, like license names.
+
+    Such columns are categorical in memory and dictionary encoded in parquet files.
+
+    :ivar values:   The allowed values, e.g. status codes. None allows any text.
+    """
+    values: Optional[tuple] = None
+
+    def __call__(self, value) -> str:
+        """ Convert a value to the text of the category. """
+        _value = str(value)
+        if self.values is not None and _value not in self.values:
+            raise ValueError('{} is not one of {}.'.format(_value, ', '.join(self.values)))
+        return _value
+
+class ProjectResult(NamedTuple):
+    """ What measuring a project gives.
+
+    :ivar identifier:   Identifier of the project.
+    :ivar rows:         One row for the project or one per revision of its history.
+    :ivar files:        Records of the facts about single files,
+                        None if they were not gathered.
+    :ivar timings:      Records of the cost of every metric,
+                        None if they were not recorded.
+    :ivar profile:      Profile samples of the metrics, None if they were not profiled.
+    :ivar telemetry:    Worker, busy seconds and number of files of the project.
+    :ivar error:        Traceback of the error measuring the project, None if it was measured.
+    """
+    identifier: str
+    rows: list
+    files: Optional[list] = None
+    timings: Optional[list] = None
+    profile: Optional[dict] = None
+    telemetry: Optional[dict] = None
+    error: Optional[str] = None
+
+# Columns of row_key are text, even if they look like numbers, e.g. tags like 0.10.
+_KEY_DTYPES = {_column: str for _column in ('id', 'revision', 'file', 'metric')}
+
+def row_key(columns) -> list:
+    """ The columns identifying a row of a result file.
+
+    :param columns: The columns of the result file.
+    :returns:       id and, for histories, revision.
+                    For file facts also the file, for timings the metric.
+    """
+    return [_column for _column in ('id', 'revision', 'file', 'metric') if _column in columns]
+
+def typed_frame(rows: list, column_types: dict) -> pandas.DataFrame:
+    """ Build a chunk of rows with compact, nullable column types.
+
+    Booleans, integers and floats get the nullable pandas types,
+    numpy.float32 columns single precision floats, Category columns
+    categorical types and text columns stay objects.
+
+    :param rows:            Rows as dictionaries or sequences in the order of the columns.
+    :param column_types:    The type of every column, in the order of the columns.
+    :returns:               The chunk.
+    """
+    _dataframe = pandas.DataFrame(rows, columns=list(column_types))
+    for _column, _type in column_types.items():
+        _values = [_typed_value(_value, _type) for _value in _dataframe[_column].tolist()]
+        if isinstance(_type, Category):
+            _dtype = pandas.CategoricalDtype(_type.values) if _type.values else 'category'
+        else:
+            _dtype = _PANDAS_DTYPES.get(_type, object)
+        _dataframe[_column] = pandas.array(_values, dtype=_dtype)
+    return _dataframe
+
+def format_of(path: str) -> str:
+    """ Tell the format of a result file from its name.
+
+    :param path:    Path to the result file.
+    :returns:       One of OUTPUT_FORMATS, csv for unknown suffixes.
+    """
+    _suffix = os.path.splitext(path)[1].lower()
+    if _suffix == '.parquet':
+        return 'parquet'
+    if _suffix in ('.db', '.sqlite', '.sqlite3'):
+        return 'sqlite'
+    return 'csv'
+
+def read_chunks(path: str, input_format: str = None, chunk_rows: int = 100000):
+    """ Read a result file chunk by chunk.
+
+    :param path:            Path to the result file.
+    :param input_format:    One of OUTPUT_FORMATS, by default told from the file name.
+    :param chunk_rows:      Maximal number of rows in a chunk.
+    :returns:               Generator of DataFrames.
+    """
+    input_format = input_format or format_of(path)
+    if input_format == 'parquet':
+        for _path in parquet_files(path):
+            _file = _require_pyarrow().parquet.ParquetFile(_path)
+            for _batch in _file.iter_batches(batch_size=chunk_rows):
+                yield _batch.to_pandas()
+    elif input_format == 'sqlite':
+        with sqlite3.connect(path) as _connection:
+            _cursor = _connection.execute('SELECT * FROM {}'.format(RESULTS_TABLE))
+            _columns = [_description[0] for _description in _cursor.description]
+            _rows = _cursor.fetchmany(chunk_rows)
+            while _rows:
+                yield pandas.DataFrame(_rows, columns=_columns)
+                _rows = _cursor.fetchmany(chunk_rows)
+    else:
+        for _chunk in pandas.read_csv(path, index_col=0, chunksize=chunk_rows, dtype=_KEY_DTYPES):
+            yield _chunk
+
+def merge_files(
+        input_files: list,
+        output_file: str,
+        output_format: str = None,
+        column_types: dict = None,
+        newest_by: str = None,
+        chunk_rows: int = 100000
+) -> int:
+    """ Combine result files, e.g. of the shards of a run, into one.
+
+    Rows measured more than once, e.g. when a shard was run again,
+    are only kept from the file given last, or with the highest
+    value in the column newest_by.
+    The rows are streamed through a temporary SQLite database next to
+    the output file, keyed like the rows, so the memory needed only
+    depends on chunk_rows, not on the size of the files.
+
+    :param input_files:     Paths to the result files to combine, in any of OUTPUT_FORMATS.
+    :param output_file:     Path to the combined file, it is overwritten.
+    :param output_format:   One of OUTPUT_FORMATS, by default told from the file name.
+    :param column_types:    Python types of known columns, e.g. to write booleans
+                            of csv files as such. Other columns are written as read.
+    :param newest_by:       Column deciding, which of two rows of a project to keep,
+                            e.g. date for histories. Later files win ties.
+    :param chunk_rows:      Number of rows read and written at once.
+    :returns:               The number of rows written.
+    """
+    output_format = output_format or format_of(output_file)
+    column_types = column_types or {}
+    _staging_file, _staging_path = tempfile.mkstemp(
+        suffix='.sqlite',
+        dir=os.path.dirname(os.path.abspath(output_file))
+    )
+    os.close(_staging_file)
+    try:
+        _staging = _MergeStaging(_staging_path, newest_by)
+        for _input_file in input_files:
+            for _chunk in read_chunks(_input_file, chunk_rows=chunk_rows):
+                _staging.add(_chunk)
+
+        # Inputs are read completely, so the output may be one of them.
+        _outputs = [output_file, output_file + '.partial']
+        if output_format == 'parquet':
+            _outputs.extend(parquet_files(output_file))
+        for _path in _outputs:
+            if os.path.isfile(_path):
+                os.remove(_path)
+        _columns = _staging.columns()
+        _writer = open_writer(
+            output_file,
+            output_format,
+            {_column: column_types.get(_column, str) for _column in _columns},
+            rows_per_file=None
+        )
+        _written = 0
+        try:
+            for _chunk in _staging.chunks(chunk_rows):
+                for _column in _columns:
+                    if _column in column_types:
+                        _chunk[_column] = [
+                            _typed_value(_value, column_types[_column])
+                            for _value in _chunk[_column]
+                        ]
+                _chunk.index = range(_written, _written + len(_chunk))
+                _writer.write(_chunk)
+                _written = _written + len(_chunk)
+        finally:
+            _writer.close()
+            _staging.close()
+        return _written
+    finally:
+        os.remove(_staging_path)
+
+def merge_csv_files(input_files: list, output_file: str) -> int:
+    """ Combine csv result files into a csv file, keeping rows of the file given last.
+
+    :param input_files: Paths to the csv files to combine.
+    :param output_file: Path to the combined csv file, it is overwritten.
+    :returns:           The number of rows written.
+    """
+    return merge_files(input_files, output_file, output_format='csv')
+
+def open_writer(
+        path: str,
+        output_format: str,
+        column_types: dict,
+        rows_per_file: int = PARQUET_ROWS_PER_FILE
+):
+    """ Open a result file for the chunks of a run.
+
+    :param path:            Path to the result file. Rows of an existing file are kept.
+    :param output_format:   One of OUTPUT_FORMATS.
+    :param column_types:    The python type of every column, in the order of the columns.
+    :param rows_per_file:   Rows of a parquet part file, see ParquetWriter.
+    :returns:               Writer with a write method for chunks and a close method.
+    """
+    if output_format == 'csv':
+        return CsvWriter(path)
+    if output_format == 'parquet':
+        return ParquetWriter(path, column_types, rows_per_file)
+    if output_format == 'sqlite':
+        return SqliteWriter(path, column_types)
+    raise ValueError('Output format not supported.')
+
+def read_measured_ids(path: str, output_format: str) -> list:
+    """ The ids of the projects in a result file, e.g. to resume a run.
+
+    :param path:            Path to the result file.
+    :param output_format:   One of OUTPUT_FORMATS.
+    :returns:               The ids, empty if the file does not exist.
+                            For SQLite files a container looking them up
+                            in the file, instead of reading all of them.
+    """
+    if output_format == 'parquet':
+        return [
+            _id
+            for _path in parquet_files(path)
+            for _id in _require_pyarrow().parquet.read_table(_path, columns=['id'])
+            .column('id').to_pylist()
+        ]
+    if not os.path.isfile(path):
+        return []
+    if output_format == 'sqlite':
+        return MeasuredIds(path)
+    return pandas.read_csv(path, usecols=['id'], dtype=_KEY_DTYPES)['id'].tolist()
+
+def parquet_files(path: str) -> list:
+    """ The finished files of a parquet result, see ParquetWriter.
+
+    :param path:    Path to the result file.
+    :returns:       The result file, if it exists, and its part files in the order they were written.
+    """
+    _files = [path] if os.path.isfile(path) else []
+    return _files + [_part_path for _, _part_path in _parquet_parts(path)]
+
+
+class CsvWriter():
+    """ Append chunks to a csv file, starting with a header if the file is new.
+
+    Files ending with .gz are compressed, every chunk in its own gzip member.
+    Chunks are only appended to files with the same columns, e.g. not
+    to files of older versions with other metrics.
+    """
+
+    def __init__(self, path: str):
+        """
+        :ivar _checked: If the header of the file was compared with the columns of a chunk.
+
+        :param path:    Path to the csv file.
+        """
+        self._path = path
+        self._open = gzip.open if path.endswith('.gz') else open
+        self._checked = False
+
+    def write(self, dataframe: pandas.DataFrame) -> None:
+        """ Append the rows of a chunk. """
+        _new = not os.path.isfile(self._path) or os.path.getsize(self._path) == 0
+        if not _new and not self._checked:
+            _columns = pandas.read_csv(self._path, index_col=0, nrows=0).columns.tolist()
+            if _columns != [str(_column) for _column in dataframe.columns]:
+                raise ValueError(
+                    '{} has other columns than the rows written to it. '
+                    'Write to a new file and combine both with recoda merge.'.format(self._path)
+                )
+        self._checked = True
+        with self._open(self._path, 'at') as _file:
+            dataframe.to_csv(_file, header=_new)
+
+    def close(self) -> None:
+        """ Nothing is held open between chunks. """
+
+
+class ParquetWriter():
+    """ Write chunks as typed parquet files.
+
+    With rows_per_file, rows are buffered and written as a finished part file
+    next to the result file, e.g. results.part-00001.parquet for results.parquet,
+    whenever that many rows are buffered and when the writer is closed.
+    A killed run only loses the buffered rows, and resumed runs add part files
+    without rewriting the files of earlier runs.
+    Without rows_per_file, all rows are written to a partial file next to
+    the result file, which replaces it when the writer is closed, e.g. for merged files.
+    """
+
+    # Column types of parquet files for the python types of columns.
+    # Values of other types are written as their text.
+    _ARROW_TYPES = {
+        bool: 'bool_',
+        int: 'int64',
+        float: 'float64',
+        numpy.float32: 'float32',
+        str: 'string',
+    }
+
+    def __init__(self, path: str, column_types: dict, rows_per_file: int = PARQUET_ROWS_PER_FILE):
+        """
+        :ivar _tables:  Buffered chunks as arrow tables.
+        :ivar _part:    Number of the latest part file.
+
+        :param path:            Path to the result file.
+        :param column_types:    The python type of every column, in the order of the columns.
+        :param rows_per_file:   Rows buffered for a part file, None to write a single file.
+        """
+        _pyarrow = _require_pyarrow()
+        self._path = path
+        self._partial_path = path + '.partial'
+        self._rows_per_file = rows_per_file
+        self._column_types = {
+            _column: _type if _type in self._ARROW_TYPES or isinstance(_type, Category) else str
+            for _column, _type in column_types.items()
+        }
+        self._schema = _pyarrow.schema([
+            (_column, self._arrow_type(_type))
+            for _column, _type in self._column_types.items()
+        ])
+        self._tables = []
+        self._part = max((_number for _number, _ in _parquet_parts(path)), default=0)
+        self._writer = None
+        if rows_per_file is None:
+            self._writer = _pyarrow.parquet.ParquetWriter(self._partial_path, self._schema)
+
+    def write(self, dataframe: pandas.DataFrame) -> None:
+        """ Buffer the rows of a chunk, or write them as one row group of a single file. """
+        if dataframe.empty:
+            return
+        _columns = {
+            _column: [_typed_value(_value, _type) for _value in dataframe[_column].tolist()]
+            for _column, _type in self._column_types.items()
+        }
+        _table = pyarrow.Table.from_pydict(_columns, schema=self._schema)
+        if self._writer is not None:
+            self._writer.write_table(_table)
+            return
+        self._tables.append(_table)
+        if sum(_table.num_rows for _table in self._tables) >= self._rows_per_file:
+            self._write_part()
+
+    def close(self) -> None:
+        """ Write the buffered rows, or put the single file in place of the result file. """
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self._partial_path, self._path)
+        elif self._tables:
+            self._write_part()
+
+    def _write_part(self) -> None:
+        """ Write the buffered rows as the next part file, which appears only when finished. """
+        self._part = self._part + 1
+        _part_path = _parquet_part_path(self._path, self._part)
+        pyarrow.parquet.write_table(pyarrow.concat_tables(self._tables), _part_path + '.partial')
+        os.replace(_part_path + '.partial', _part_path)
+        self._tables = []
+
+    def _arrow_type(self, column_type):
+        """ The parquet type of a column, dictionary encoded text for categories. """
+        if isinstance(column_type, Category):
+            return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        return getattr(pyarrow, self._ARROW_TYPES[column_type])()
+
+
+class SqliteWriter():
+    """ Write chunks into the results table of an SQLite database.
+
+    Every chunk is written in one transaction. Rows with the id,
+    and for histories the revision, of an existing row replace it.
+    """
+
+    # Column types of SQLite tables for the python types of columns.
+    _SQL_TYPES = {
+        bool: 'INTEGER',
+        int: 'INTEGER',
+        float: 'REAL',
+        numpy.float32: 'REAL',
+        str: 'TEXT',
+    }
+
+    def __init__(self, path: str, column_types: dict):
+        """ Create the results table, if it does not exist yet.
+
+        :param path:            Path to the database.
+        :param column_types:    The python type of every column, in the order of the columns.
+        """
+        self._column_types = {
+            _column: _type if _type in self._SQL_TYPES else str
+            for _column, _type in column_types.items()
+        }
+        self._connection = sqlite3.connect(path)
+        # Other processes, e.g. checking progress, can read during writes.
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        _columns = ', '.join(
+            '"{}" {}'.format(_column, self._SQL_TYPES[_type])
+            for _column, _type in self._column_types.items()
+        )
+        _key = ', '.join('"{}"'.format(_column) for _column in row_key(self._column_types))
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS {} ({}, PRIMARY KEY ({}))'.format(
+                    RESULTS_TABLE, _columns, _key
+                )
+            )
+        self._insert = 'INSERT OR REPLACE INTO {} ({}) VALUES ({})'.format(
+            RESULTS_TABLE,
+            ', '.join('"{}"'.format(_column) for _column in self._column_types),
+            ', '.join('?' for _ in self._column_types)
+        )
+
+    def write(self, dataframe: pandas.DataFrame) -> None:
+        """ Insert or replace the rows of a chunk. """
+        _rows = [
+            tuple(
+                _typed_value(_row[_column], _type)
+                for _column, _type in self._column_types.items()
+            )
+            for _row in dataframe.to_dict('records')
+        ]
+        with self._connection:
+            self._connection.executemany(self._insert, _rows)
+
+    def close(self) -> None:
+        """ Close the database. """
+        self._connection.close()
+
+
+class MeasuredIds():
+    """ Look up, if projects are in the results table of an SQLite database.
+
+    Lookups use the index of the table, so resuming a run
+    does not read the ids of all measured projects.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._local = threading.local()
+
+    def __contains__(self, identifier: str) -> bool:
+        return self._connect().execute(
+            'SELECT 1 FROM {} WHERE id = ? LIMIT 1'.format(RESULTS_TABLE),
+            (identifier,)
+        ).fetchone() is not None
+
+    def __iter__(self):
+        _ids = self._connect().execute('SELECT DISTINCT id FROM {}'.format(RESULTS_TABLE))
+        return (_id for (_id,) in _ids)
+
+    def _connect(self) -> sqlite3.Connection:
+        """ The connection of the current thread to the database. """
+        if getattr(self._local, 'connection', None) is None:
+            self._local.connection = sqlite3.connect(self._path)
+        return self._local.connection
+
+
+class _MergeStaging():
+    """ Temporary SQLite table of the rows of merged files, keyed like the rows. """
+
+    _TABLE = 'staged'
+
+    def __init__(self, path: str, newest_by: str = None):
+        """
+        :param path:        Path to the temporary database.
+        :param newest_by:   Column deciding, which of two rows to keep.
+                            By default the row added last is kept.
+        """
+        self._connection = sqlite3.connect(path)
+        # The database is thrown away after merging.
+        self._connection.execute('PRAGMA journal_mode=OFF')
+        self._connection.execute('PRAGMA synchronous=OFF')
+        self._newest_by = newest_by
+        self._columns = []
+        self._key = None
+
+    def add(self, chunk: pandas.DataFrame) -> None:
+        """ Add the rows of a chunk, replacing rows with the same key. """
+        _columns = [str(_column) for _column in chunk.columns]
+        self._extend_table(_columns)
+        _names = ', '.join(_quoted(_column) for _column in _columns)
+        _values = ', '.join('?' for _ in _columns)
+        if self._newest_by is None:
+            _statement = 'INSERT OR REPLACE INTO {} ({}) VALUES ({})'.format(
+                self._TABLE, _names, _values
+            )
+        else:
+            # Columns missing in the chunk are set to NULL, like a replaced row.
+            _statement = (
+                'INSERT INTO {table} ({names}) VALUES ({values}) '
+                'ON CONFLICT ({key}) DO UPDATE SET {updates} '
+                'WHERE excluded.{newest} >= {table}.{newest} OR {table}.{newest} IS NULL'
+            ).format(
+                table=self._TABLE,
+                names=_names,
+                values=_values,
+                key=', '.join(_quoted(_column) for _column in self._key),
+                updates=', '.join(
+                    '{0} = excluded.{0}'.format(_quoted(_column)) for _column in self._columns
+                ),
+                newest=_quoted(self._newest_by)
+            )
+        with self._connection:
+            self._connection.executemany(
+                _statement,
+                (tuple(_plain_value(_value) for _value in _row)
+                 for _row in chunk.itertuples(index=False, name=None))
+            )
+
+    def columns(self) -> list:
+        """ All columns of the added rows, in the order they appeared. """
+        return list(self._columns)
+
+    def chunks(self, chunk_rows: int):
+        """ Generator of the kept rows as DataFrames, in the order they were added. """
+        _cursor = self._connection.execute('SELECT {} FROM {} ORDER BY rowid'.format(
+            ', '.join(_quoted(_column) for _column in self._columns), self._TABLE
+        ))
+        _rows = _cursor.fetchmany(chunk_rows)
+        while _rows:
+            yield pandas.DataFrame(_rows, columns=self._columns)
+            _rows = _cursor.fetchmany(chunk_rows)
+
+    def close(self) -> None:
+        """ Close the database. """
+        self._connection.close()
+
+    def _extend_table(self, columns: list) -> None:
+        """ Create the table with the first columns and add columns of later files. """
+        if self._key is None:
+            self._key = row_key(columns)
+            if not self._key:
+                raise ValueError('Result files need an id column to be merged.')
+            if self._newest_by is not None and self._newest_by not in columns:
+                raise ValueError('Column {} is not in the result files.'.format(self._newest_by))
+            self._columns = list(columns)
+            self._connection.execute('CREATE TABLE {} ({}, PRIMARY KEY ({}))'.format(
+                self._TABLE,
+                ', '.join(_quoted(_column) for _column in columns),
+                ', '.join(_quoted(_column) for _column in self._key)
+            ))
+            return
+        if row_key(columns) != self._key:
+            raise ValueError('Result files with different keys can not be merged.')
+        for _column in columns:
+            if _column not in self._columns:
+                self._connection.execute('ALTER TABLE {} ADD COLUMN {}'.format(
+                    self._TABLE, _quoted(_column)
+                ))
+                self._columns.append(_column)
+
+
+def _parquet_part_path(path: str, number: int) -> str:
+    """ Path to a part file of a parquet result, e.g. results.part-00001.parquet. """
+    _stem, _suffix = os.path.splitext(path)
+    return '{}.part-{:05}{}'.format(_stem, number, _suffix)
+
+def _parquet_parts(path: str) -> list:
+    """ Numbers and paths of the part files of a parquet result, by number. """
+    _stem, _suffix = os.path.splitext(path)
+    _directory = os.path.dirname(path) or '.'
+    _pattern = re.compile(
+        re.escape(os.path.basename(_stem)) + r'\.part-(\d+)' + re.escape(_suffix) + '$'
+    )
+    if not os.path.isdir(_directory):
+        return []
+    _parts = []
+    for _name in os.listdir(_directory):
+        _match = _pattern.match(_name)
+        if _match:
+            _parts.append((int(_match.group(1)), os.path.join(os.path.dirname(path), _name)))
+    return sorted(_parts)
+
+def _quoted(column: str) -> str:
+    """ Quote a column name for SQL statements. """
+    return '"{}"'.format(column.replace('"', '""'))
+
+def _plain_value(value):
+    """ Convert a value read with pandas to a python value SQLite can store. """
+    if isinstance(value, numpy.floating):
+        value = float(str(value))
+    if value is None or value is pandas.NA or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return _plain_value(value.item())
+    return value
+
+def _typed_value(value, value_type):
+    """ Convert a measured value to the python type of its column, keeping missing values.
+
+    Single precision floats become python floats with their shortest digits,
+    e.g. 0.1 instead of 0.10000000149011612.
+    """
+    if isinstance(value, numpy.floating):
+        value = float(str(value))
+    if value is None or value is pandas.NA or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if value_type is bool and isinstance(value, str):
+        # Booleans read from csv files without a type.
+        return value == 'True'
+    if value_type is numpy.float32:
+        return float(value)
+    return value_type(value)
+
+# Nullable pandas types of the python types of columns, other columns hold objects.
+_PANDAS_DTYPES = {
+    bool: 'boolean',
+    int: 'Int64',
+    float: 'Float64',
+    numpy.float32: 'Float32',
+}
+
+def _require_pyarrow():
+    """ The pyarrow module, if it is installed. """
+    if pyarrow is None:
+        raise ImportError('Parquet files need pyarrow, install it with: pip install pyarrow')
+    return pyarrow
@@ -0,0 +1,178 @@
+""" The profiling module profiles the metrics inside the processes measuring projects.
+
+A profiler of the main process sees nothing of the pool workers,
+so every worker profiles the metric calls of its projects with cProfile
+and, if asked, traces their allocations with tracemalloc.
+Samples are tagged by metric: every metric is called through a function
+named after it, e.g. <metric loc>:1(measure) in pstats, whose callees
+are the functions of that metric. The profiled time and traced peak
+memory of every project and metric are sent along with the rows.
+
+The main process merges the samples into one pstats file, readable with
+pstats or tools like snakeviz, and writes a text report of the most
+expensive projects and metrics and of the lines allocating the most.
+"""
+
+import cProfile
+import heapq
+import pstats
+import tracemalloc
+
+# Number of allocation sites kept per metric call and in the report,
+# and of the most expensive projects reported per metric.
+TOP_ENTRIES = 20
+
+_TAGGED_FUNCTIONS = {}
+
+
+class ProjectProfile():
+    """ Profile the metric calls of one project, inside the process measuring it. """
+
+    def __init__(self, memory: bool = False):
+        """
+        :ivar _stats:       Merged cProfile samples of all metric calls.
+        :ivar _tags:        Metric, profiled seconds and traced peak KiB of every call.
+        :ivar _allocations: Size in KiB and count of the allocations still alive
+                            after the calls, keyed by file and line.
+
+        :param memory:      Trace allocations with tracemalloc, which slows measuring down.
+        """
+        self._memory = memory
+        self._stats = None
+        self._tags = []
+        self._allocations = {}
+
+    def call(self, metric: str, function, project_path: str):
+        """ Call the measure function of a metric and profile it.
+
+        :returns: The value of the metric.
+        """
+        if self._memory:
+            tracemalloc.start()
+        _profile = cProfile.Profile()
+        _profile.enable()
+        try:
+            _value = _tagged_function(metric)(function, project_path)
+        finally:
+            _profile.disable()
+        _peak_kib = None
+        if self._memory:
+            _peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+            self._add_allocations(tracemalloc.take_snapshot())
+            tracemalloc.stop()
+
+        _stats = pstats.Stats(_profile)
+        self._tags.append((metric, _stats.total_tt, _peak_kib))
+        if self._stats is None:
+            self._stats = _stats
+        else:
+            self._stats.add(_stats)
+        return _value
+
+    def result(self) -> dict:
+        """ The samples of the project, to send to the main process. """
+        return {
+            'stats': {} if self._stats is None else self._stats.stats,
+            'tags': self._tags,
+            'allocations': self._allocations,
+        }
+
+    def _add_allocations(self, snapshot: tracemalloc.Snapshot) -> None:
+        """ Add the largest allocation sites of a metric call. """
+        for _statistic in snapshot.statistics('lineno')[:TOP_ENTRIES]:
+            _frame = _statistic.traceback[0]
+            _site = '{}:{}'.format(_frame.filename, _frame.lineno)
+            _size, _count = self._allocations.get(_site, (0, 0))
+            self._allocations[_site] = (_size + _statistic.size / 1024, _count + _statistic.count)
+
+
+class ProfileCollector():
+    """ Merge the samples of all projects in the main process. """
+
+    def __init__(self, path: str, memory: bool = False):
+        """
+        :ivar _expensive:   Heaps of the most expensive projects, keyed by metric.
+
+        :param path:    Path to the merged pstats file. The report is
+                        written next to it, with .txt appended.
+        :param memory:  Allocations are traced in the workers.
+        """
+        self.path = path
+        self.memory = memory
+        self._stats = None
+        self._expensive = {}
+        self._peaks = {}
+        self._allocations = {}
+
+    def add(self, identifier: str, samples: dict) -> None:
+        """ Merge the samples of a project. """
+        if samples['stats']:
+            _stats = pstats.Stats(_StatsHolder(samples['stats']))
+            if self._stats is None:
+                self._stats = _stats
+            else:
+                self._stats.add(_stats)
+        for _metric, _seconds, _peak_kib in samples['tags']:
+            _heap = self._expensive.setdefault(_metric, [])
+            _entry = (_seconds, identifier)
+            if len(_heap) < TOP_ENTRIES:
+                heapq.heappush(_heap, _entry)
+            else:
+                heapq.heappushpop(_heap, _entry)
+            if _peak_kib is not None:
+                self._peaks[_metric] = max(self._peaks.get(_metric, 0), _peak_kib)
+        for _site, (_size, _count) in samples['allocations'].items():
+            _total_size, _total_count = self._allocations.get(_site, (0, 0))
+            self._allocations[_site] = (_total_size + _size, _total_count + _count)
+
+    def close(self) -> None:
+        """ Write the pstats file and the report. """
+        if self._stats is not None:
+            self._stats.dump_stats(self.path)
+        with open(self.path + '.txt', 'w') as _report:
+            _report.write(self.report())
+
+    def report(self) -> str:
+        """ The most expensive projects per metric and the largest allocation sites. """
+        _lines = ['Profiled seconds of the most expensive projects by metric:']
+        _totals = sorted(
+            self._expensive.items(),
+            key=lambda _item: -sum(_seconds for _seconds, _ in _item[1])
+        )
+        for _metric, _heap in _totals:
+            _lines.append('')
+            _lines.append(_metric)
+            for _seconds, _identifier in sorted(_heap, reverse=True):
+                _lines.append('  {:>10.3f}  {}'.format(_seconds, _identifier))
+        if self.memory:
+            _lines.extend(['', 'Largest traced peak memory of a project by metric, KiB:'])
+            for _metric, _peak_kib in sorted(self._peaks.items(), key=lambda _item: -_item[1]):
+                _lines.append('  {:>12.1f}  {}'.format(_peak_kib, _metric))
+            _lines.extend(['', 'Lines allocating the most memory still alive after a metric, KiB and count:'])
+            _sites = sorted(self._allocations.items(), key=lambda _item: -_item[1][0])
+            for _site, (_size, _count) in _sites[:TOP_ENTRIES]:
+                _lines.append('  {:>12.1f}  {:>10}  {}'.format(_size, _count, _site))
+        return '\n'.join(_lines) + '\n'
+
+
+class _StatsHolder():
+    """ Hands a stats dictionary of another process to pstats.Stats. """
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        """ The stats are complete already. """
+
+
+def _tagged_function(metric: str):
+    """ A function calling a measure function, whose profile entry is named after the metric. """
+    if metric not in _TAGGED_FUNCTIONS:
+        _namespace = {}
+        exec(compile(
+            'def measure(function, project_path):\n    return function(project_path)\n',
+            '<metric {}>'.format(metric),
+            'exec'
+        ), _namespace)
+        _TAGGED_FUNCTIONS[metric] = _namespace['measure']
+    return _TAGGED_FUNCTIONS[metric]
@@ -0,0 +1,259 @@
+""" The progress module reports the throughput of a run while it goes.
+
+Instead of a line per project, a run prints a line every few seconds
+with the projects and files measured per second, an estimate of the
+time left, how busy the workers are and which projects take long.
+
+Every project result carries the worker, that measured it, the seconds
+it was busy with the project and the number of files of the project.
+The busy time of a worker against the time of the run tells if it
+idles, e.g. waiting for projects to be discovered or for results to
+be written. Projects are stragglers, when they are in flight many times
+longer than a typical project. In flight means handed to the workers,
+so for a full pool the time waiting for a free process is included.
+
+A machine-readable status file can be refreshed along with the lines,
+to watch long runs, e.g. on a cluster, without reading their logs.
+Reports do not wait for results, so they go on when all workers are stuck.
+"""
+
+import datetime
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+# Number of stragglers reported, the longest in flight first.
+TOP_STRAGGLERS = 5
+
+
+class Progress():
+    """ Follow the projects of a run and report its throughput. """
+
+    def __init__(
+            self,
+            interval: float = 10.0,
+            status_path: str = None,
+            straggler_factor: float = 5.0,
+            straggler_seconds: float = 60.0,
+            stream=None,
+            clock=time.monotonic
+        ):
+        """
+        :ivar _in_flight:   Monotonic time every project was handed to the workers at,
+                            keyed by identifier.
+        :ivar _workers:     Projects measured and busy seconds, keyed by worker.
+        :ivar _durations:   Busy seconds of the latest projects, for a typical duration.
+        :ivar _lock:        Guards the counts, which are updated from the threads
+                            handing over projects and the thread receiving results.
+        :ivar _stopping:    Tells the thread reporting every interval to stop.
+
+        :param interval:            Seconds between two reports. With 0,
+                                    every arriving result is reported.
+        :param status_path:         Path to a JSON status file, refreshed with every report.
+        :param straggler_factor:    How many times longer than the median project
+                                    a project is in flight before it is a straggler.
+        :param straggler_seconds:   Seconds a project is at least in flight before
+                                    it is a straggler.
+        :param stream:              Where the reports are printed to, stdout by default.
+        :param clock:               Monotonic clock in seconds.
+        """
+        self.interval = interval
+        self.status_path = status_path
+        self.straggler_factor = straggler_factor
+        self.straggler_seconds = straggler_seconds
+        self._stream = stream
+        self._clock = clock
+        self._discovery = None
+        self._started_at = None
+        self._reported_at = None
+        self._skipped = 0
+        self._projects = 0
+        self._failed = 0
+        self._files = 0
+        self._in_flight = {}
+        self._workers = {}
+        self._durations = []
+        self._lock = threading.RLock()
+        self._stopping = threading.Event()
+        self._reporting = None
+
+    def start(self, discovery=None) -> None:
+        """ Start the clock of the run and the reports every interval.
+
+        :param discovery:   Counts the discovered projects in discovered
+                            and tells with finished() if all are discovered.
+        """
+        self._discovery = discovery
+        self._started_at = self._clock()
+        self._reported_at = self._started_at
+        if self.interval > 0:
+            self._stopping.clear()
+            self._reporting = threading.Thread(target=self._report_regularly, daemon=True)
+            self._reporting.start()
+
+    def stop(self) -> None:
+        """ Stop the reports every interval, at the end of the run. """
+        self._stopping.set()
+        if self._reporting is not None:
+            self._reporting.join()
+            self._reporting = None
+
+    def skipped(self) -> None:
+        """ A discovered project is not measured, e.g. measured before or of another shard. """
+        with self._lock:
+            self._skipped = self._skipped + 1
+
+    def handed_over(self, identifier: str) -> None:
+        """ A project is handed to the workers. """
+        with self._lock:
+            self._in_flight[identifier] = self._clock()
+
+    def measured(self, result) -> None:
+        """ A ProjectResult arrived, measured or failed, report if the interval passed. """
+        with self._lock:
+            self._in_flight.pop(result.identifier, None)
+            self._projects = self._projects + 1
+            if result.error is not None:
+                self._failed = self._failed + 1
+            _telemetry = result.telemetry or {}
+            self._files = self._files + _telemetry.get('files', 0)
+            if 'worker' in _telemetry:
+                _projects, _busy = self._workers.get(_telemetry['worker'], (0, 0.0))
+                self._workers[_telemetry['worker']] = (_projects + 1, _busy + _telemetry['seconds'])
+                self._durations.append(_telemetry['seconds'])
+                # The typical duration follows the latest projects.
+                if len(self._durations) > 1000:
+                    del self._durations[:500]
+            if self._clock() - self._reported_at >= self.interval:
+                self.report()
+
+    def status(self) -> dict:
+        """ The state of the run, as written to the status file. """
+        with self._lock:
+            return self._status()
+
+    def _status(self) -> dict:
+        """ The state of the run, while holding the lock. """
+        _now = self._clock()
+        _elapsed = _now - self._started_at
+        _total, _discovery_finished = self._total()
+        _remaining = None if _total is None else max(_total - self._projects, 0)
+        _projects_per_second = self._projects / _elapsed if _elapsed > 0 else None
+        _eta_seconds = None
+        if _remaining is not None and _projects_per_second:
+            _eta_seconds = _remaining / _projects_per_second
+        return {
+            'updated': datetime.datetime.now().isoformat(timespec='seconds'),
+            'elapsed_seconds': _elapsed,
+            'projects_measured': self._projects,
+            'projects_failed': self._failed,
+            'projects_skipped': self._skipped,
+            'projects_total': _total,
+            'discovery_finished': _discovery_finished,
+            'files_measured': self._files,
+            'projects_per_second': _projects_per_second,
+            'files_per_second': self._files / _elapsed if _elapsed > 0 else None,
+            'eta_seconds': _eta_seconds,
+            'in_flight': len(self._in_flight),
+            'workers': {
+                _worker: {
+                    'projects': _projects,
+                    'busy_seconds': _busy,
+                    'busy_fraction': _busy / _elapsed if _elapsed > 0 else None,
+                }
+                for _worker, (_projects, _busy) in sorted(self._workers.items())
+            },
+            'stragglers': [
+                {'id': _identifier, 'seconds': _seconds}
+                for _identifier, _seconds in self._stragglers(_now)
+            ],
+        }
+
+    def report(self) -> dict:
+        """ Print a line about the run and refresh the status file.
+
+        :returns: The status reported.
+        """
+        # Reports of the receiving and the reporting thread do not interleave.
+        with self._lock:
+            self._reported_at = self._clock()
+            _status = self._status()
+            print(format_status(_status), file=self._stream or sys.stdout, flush=True)
+            if self.status_path is not None:
+                write_status(self.status_path, _status)
+            return _status
+
+    def _report_regularly(self) -> None:
+        """ Report whenever the interval passed without a report, until stopped. """
+        while not self._stopping.wait(self._until_report()):
+            with self._lock:
+                if self._clock() - self._reported_at >= self.interval:
+                    self.report()
+
+    def _until_report(self) -> float:
+        """ Seconds until the interval since the latest report passed. """
+        with self._lock:
+            return max(self.interval - (self._clock() - self._reported_at), 0.0)
+
+    def _total(self) -> tuple:
+        """ The number of projects to measure, if known, and if discovery finished. """
+        if self._discovery is None:
+            return None, False
+        _finished = self._discovery.finished()
+        return self._discovery.discovered - self._skipped, _finished
+
+    def _stragglers(self, now: float) -> list:
+        """ Projects in flight much longer than the median project, the longest first. """
+        _threshold = self.straggler_seconds
+        if self._durations:
+            _threshold = max(_threshold, self.straggler_factor * statistics.median(self._durations))
+        _ages = sorted(
+            ((_identifier, now - _handed_over) for _identifier, _handed_over in self._in_flight.items()),
+            key=lambda _item: -_item[1]
+        )
+        return [_item for _item in _ages if _item[1] >= _threshold][:TOP_STRAGGLERS]
+
+
+def format_status(status: dict) -> str:
+    """ A line about the state of a run, for people watching it. """
+    _total = '?'
+    if status['projects_total'] is not None:
+        _total = str(status['projects_total']) + ('' if status['discovery_finished'] else '+')
+    _parts = [
+        '{} from {} projects'.format(status['projects_measured'], _total),
+        '{:.2f} projects/s'.format(status['projects_per_second'] or 0),
+        '{:.1f} files/s'.format(status['files_per_second'] or 0),
+    ]
+    if status['projects_failed']:
+        _parts.insert(1, '{} failed'.format(status['projects_failed']))
+    if status['eta_seconds'] is not None:
+        _eta = _duration(status['eta_seconds'])
+        _parts.append('ETA ' + (_eta if status['discovery_finished'] else 'at least ' + _eta))
+    if status['workers']:
+        _busy = [_worker['busy_fraction'] or 0 for _worker in status['workers'].values()]
+        _parts.append('{} workers {:.0%} busy, least {:.0%}'.format(
+            len(_busy), sum(_busy) / len(_busy), min(_busy)
+        ))
+    if status['stragglers']:
+        _parts.append('stragglers ' + ', '.join(
+            '{} {}'.format(_straggler['id'], _duration(_straggler['seconds']))
+            for _straggler in status['stragglers']
+        ))
+    return ' | '.join(_parts)
+
+def write_status(path: str, status: dict) -> None:
+    """ Replace the status file at once, so readers never see half of it. """
+    _temporary = path + '.tmp'
+    with open(_temporary, 'w') as _status_file:
+        json.dump(status, _status_file, indent=2)
+    os.replace(_temporary, path)
+
+
+def _duration(seconds: float) -> str:
+    """ Seconds as hours, minutes and seconds, e.g. 1:02:03. """
+    _minutes, _seconds = divmod(int(round(seconds)), 60)
+    _hours, _minutes = divmod(_minutes, 60)
+    return '{}:{:02}:{:02}'.format(_hours, _minutes, _seconds)
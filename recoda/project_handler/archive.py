@@ -0,0 +1,87 @@
+""" The archive module offers discovery and handling of projects packed into archives.
+
+Every tarball or zip file below a base directory is one project.
+Archives are never extracted. Their members are read by
+recoda.analyse.sources.ArchiveSource, when the project is measured.
+"""
+
+import os
+
+from recoda.analyse.sources import ARCHIVE_SUFFIXES
+
+
+class Handler():
+    """ Keep a list of archives and offer them as projects. """
+
+    def __init__(self, base_folder: str, max_depth: int = 1):
+        """ Initialise the archive handler.
+
+        Like the git handler, the base folder is only searched
+        while get_project_directories is iterated.
+
+        :ivar _projects:    Paths of all archives found so far.
+        :ivar _discovery:   Generator discovering the remaining archives,
+                            None once all are found.
+
+        :param base_folder: The folder containing the archives.
+        :param max_depth:   How many folder levels below base_folder
+                            are searched for archives.
+                            1 only searches the base_folder itself.
+        """
+        self._base_folder = base_folder
+        self._max_depth = max_depth
+
+        self._projects = []
+        self._discovery = discover_archives(self._base_folder, self._max_depth)
+
+    def get_project_directories(self) -> str:
+        """ Generator to output the paths of the archives.
+
+        Projects are yielded as soon as they are discovered.
+
+        :returns: Generator to iterate over archive paths.
+        """
+        for _project in list(self._projects):
+            yield _project
+        while self._discovery is not None:
+            try:
+                _project = next(self._discovery)
+            except StopIteration:
+                self._discovery = None
+                return
+            self._projects.append(_project)
+            yield _project
+
+    def discovery_finished(self) -> bool:
+        """ Tell if all archives in the base folder are known. """
+        return self._discovery is None
+
+    @staticmethod
+    def get_identifier(project: str) -> str:
+        """ Archives are identified by their location. """
+        return project
+
+def discover_archives(base_folder: str, max_depth: int = 1):
+    """ Find archive files below a folder.
+
+    :param base_folder: The folder to search in.
+    :param max_depth:   How many folder levels are searched.
+                        1 only searches the files directly in base_folder.
+    :returns:           Generator of absolute paths to the archives.
+    """
+    _folders = [(os.path.abspath(base_folder), 1)]
+    while _folders:
+        _folder, _depth = _folders.pop()
+        try:
+            _entries = sorted(os.scandir(_folder), key=lambda _entry: _entry.name)
+        except OSError:
+            continue
+        _sub_folders = []
+        for _entry in _entries:
+            if _entry.name.startswith('.'):
+                continue
+            if _entry.is_file() and _entry.name.lower().endswith(ARCHIVE_SUFFIXES):
+                yield _entry.path
+            elif _entry.is_dir(follow_symlinks=False) and _depth < max_depth:
+                _sub_folders.append((_entry.path, _depth + 1))
+        _folders.extend(reversed(_sub_folders))
@@ -0,0 +1,84 @@
+""" The directory module treats plain folders as projects.
+
+No version control is needed. Every folder at the searched level
+below the base directory is one project, which makes this handler
+suitable for corpora of unpacked sources.
+"""
+
+import os
+
+
+class Handler():
+    """ Keep a list of project folders. """
+
+    def __init__(self, base_folder: str, max_depth: int = 1):
+        """ Initialise the directory handler.
+
+        Like the git handler, the base folder is only searched
+        while get_project_directories is iterated.
+
+        :ivar _projects:    Paths of all project folders found so far.
+        :ivar _discovery:   Generator discovering the remaining folders,
+                            None once all are found.
+
+        :param base_folder: The folder containing the projects.
+        :param max_depth:   The folder level below base_folder, at which projects are.
+                            1 makes every folder in base_folder a project,
+                            2 every folder in those, e.g. for owner/project layouts.
+        """
+        self._base_folder = base_folder
+        self._max_depth = max_depth
+
+        self._projects = []
+        self._discovery = discover_directories(self._base_folder, self._max_depth)
+
+    def get_project_directories(self) -> str:
+        """ Generator to output project directories.
+
+        Projects are yielded as soon as they are discovered.
+
+        :returns: Generator to iterate over project directories.
+        """
+        for _project in list(self._projects):
+            yield _project
+        while self._discovery is not None:
+            try:
+                _project = next(self._discovery)
+            except StopIteration:
+                self._discovery = None
+                return
+            self._projects.append(_project)
+            yield _project
+
+    def discovery_finished(self) -> bool:
+        """ Tell if all project folders are known. """
+        return self._discovery is None
+
+    @staticmethod
+    def get_identifier(project: str) -> str:
+        """ Folders are identified by their location. """
+        return project
+
+def discover_directories(base_folder: str, max_depth: int = 1):
+    """ Find the folders at a level below a folder, leaving out hidden ones.
+
+    :param base_folder: The folder to search in.
+    :param max_depth:   The level of the folders to return.
+    :returns:           Generator of absolute paths to the folders.
+    """
+    _folders = [(os.path.abspath(base_folder), 0)]
+    while _folders:
+        _folder, _depth = _folders.pop()
+        try:
+            _entries = sorted(os.scandir(_folder), key=lambda _entry: _entry.name)
+        except OSError:
+            continue
+        _sub_folders = []
+        for _entry in _entries:
+            if _entry.name.startswith('.') or not _entry.is_dir(follow_symlinks=False):
+                continue
+            if _depth + 1 == max_depth:
+                yield _entry.path
+            else:
+                _sub_folders.append((_entry.path, _depth + 1))
+        _folders.extend(reversed(_sub_folders))
@@ -6,92 +6,288 @@ Interaction with the repositories, is limited to the functionality needed to ana
 research software projects contained inside.
 """
 
-from copy import deepcopy
 import os
-import glob
+import re
+import subprocess
+from typing import NamedTuple
 
 import git
 
+from recoda.analyse.sources import is_bare_repository
+
+# Sections like [remote "origin"] and keys like "url = ..." of git config files.
+_CONFIG_SECTION_REGEX = re.compile(r'^\[\s*([\w.-]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+_CONFIG_URL_REGEX = re.compile(r'^url\s*=\s*(.*?)\s*(?:[#;].*)?$', re.IGNORECASE)
+
 class Handler():
     """ Keep a list of git repositories and offer functions to analyse them."""
 
-    def __init__(self, base_folder: str):
+    def __init__(self, base_folder: str, max_depth: int = 1):
         """ Initialise repository_handler.
 
-        :ivar _repository_list:     A list filled with git.Repo objects.
-                                    Created from the git repositories found
-                                    in the base_folder.
-        :ivar _repository_dict:     A dictionary with the git.Repo objects
-                                    in _repository_list as values and the path
-                                    to the directory of the repo as corresponding key.
+        No repository is opened here and the base folder is only
+        searched while get_project_directories is iterated,
+        so projects can be worked on while the rest is still discovered.
+        The handler only keeps the location of every repository and its
+        git directory. Identifiers are read from the git config on first request.
+
+        :ivar _project_dict:        A dictionary with the path to the directory
+                                    of every repository found so far in the base_folder
+                                    as key and the path to its git directory as value.
+        :ivar _discovery:           Generator discovering the remaining repositories,
+                                    None once all are found.
+        :ivar _identifiers:         Identifiers already created, keyed
+                                    by the path to the repository directory.
 
         :param base_folder:         The root folder supposed to contain all
                                     git repositories to work with.
+        :param max_depth:           How many folder levels below base_folder
+                                    are searched for repositories.
+                                    1 only searches the folders directly in it.
         """
 
         self._base_folder = base_folder
+        self._max_depth = max_depth
 
-        self._project_dict = self._create_project_dict()
+        self._project_dict = {}
+        self._discovery = discover_repositories(self._base_folder, self._max_depth)
+        self._identifiers = {}
 
     def get_project_directories(self) -> str:
         """ Generator to output project directories.
 
+        Projects are yielded as soon as they are discovered.
+
         :returns: Generator to iterate over project directories.
         """
-        for _project in self._project_dict:
+        # Copy the keys, discovery may go on while we yield them.
+        for _project in list(self._project_dict):
             yield _project
+        while self._discovery is not None:
+            _project = self._discover_next()
+            if _project is not None:
+                yield _project
+
+    def discovery_finished(self) -> bool:
+        """ Tell if all projects in the base folder are known. """
+        return self._discovery is None
 
     def get_project_objects(self) -> git.repo.base.Repo:
         """ Generator to output project Repo objects.
 
+        Repositories are opened read-only, when they are reached.
+        The handler does not keep the objects.
+
         :returns: Generator to iterate over project Repo objects.
         """
-        for _project in self._project_dict:
-            yield self._project_dict[_project]['project']
+        for _project in self.get_project_directories():
+            yield git.Repo(_project)
+
+    def get_identifier(self, project) -> str:
+        """ Return an identifier for a repository.
 
-    def get_identifier(self, project: git.repo.base.Repo) -> str:
-        """ Return an identifier for a repository. """
-        return self._project_dict[project.working_dir]['id']
+        :param project: A git.Repo object or the path to the directory of a repository.
+        :returns:       The url of the origin remote or the repositories location,
+                        if it has no origin.
+        """
+        if isinstance(project, git.repo.base.Repo):
+            project = project.working_dir
+        while project not in self._project_dict and self._discovery is not None:
+            self._discover_next()
+        if project not in self._identifiers:
+            self._identifiers[project] = self._create_identifier(
+                project,
+                self._project_dict[project]
+            )
+        return self._identifiers[project]
 
     def get_project_dict(self) -> dict:
-        """ Return the instance variable containing all repositories and their paths.
+        """ Return all repositories and their paths.
+
+        This opens every repository, so it should be avoided for large collections.
 
         :returns: A dict with paths as keys.
-                  Values are the git.Repo objects
-                  of the repositories located at the path.
+                  Values are dictionaries with the git.Repo object
+                  of the repository located at the path and its identifier.
         """
-        return deepcopy(self._project_dict)
+        return {
+            _project: {
+                'project': git.Repo(_project),
+                'id': self.get_identifier(_project)
+            }
+            for _project in self.get_project_directories()
+        }
+
+    def get_git_dir(self, project_directory: str) -> str:
+        """ Return the path to the git directory of a discovered repository. """
+        return self._project_dict[project_directory]
 
     @staticmethod
-    def _create_identifier(_repo: git.repo.base.Repo) -> str:
+    def _create_identifier(project_directory: str, git_dir: str) -> str:
         """ builds an identifier string for a repo. """
-        if hasattr(_repo.remotes, 'origin'):
-            return _repo.remotes.origin.url
-        return _repo.working_dir
+        _origin_url = read_origin_url(git_dir)
+        if _origin_url:
+            return _origin_url
+        return project_directory
 
-    def _create_project_dict(self) -> dict:
-        """ Return a dictionary of all git repositories in a directory subtree.
+    def _discover_next(self) -> str:
+        """ Discover the next repository.
 
-        :returns:           Dictionary with the project location as keys,
-                            and dictionary as value. The nested
-                            Dictionary contains the project as
-                            git.repo.base.Repo object and an id.
+        :returns: The path to the repository or None if all repositories are known.
         """
+        try:
+            _project, _git_dir = next(self._discovery)
+        except StopIteration:
+            self._discovery = None
+            return None
+        self._project_dict[_project] = _git_dir
+        return _project
 
-        _dot_git_folder = glob.glob(
-            '{base}/{file_glob}'.format(
-                base=self._base_folder,
-                file_glob='*/.git'
-            ),
-            recursive=False
-        )
-        _git_folders = [os.path.dirname(path) for path in _dot_git_folder]
-        _repositories = [git.Repo.init(folder) for folder in _git_folders]
-
-        _projects = {}
-        for _repo in _repositories:
-            _projects[_repo.working_dir] = {
-                'project': _repo,
-                'id': self._create_identifier(_repo)
-            }
-        return _projects
+class Revision(NamedTuple):
+    """ A point in the history of a repository, that can be measured.
+
+    :ivar name:     The commit id or the name of the tag.
+    :ivar commit:   The id of the commit.
+    :ivar date:     Commit or tag date in strict ISO 8601 format.
+    """
+    name: str
+    commit: str
+    date: str
+
+HISTORY_MODES = ('commits', 'tags')
+
+def list_history(git_dir: str, mode: str = 'commits') -> list:
+    """ List the revisions of a repository from oldest to newest.
+
+    :param git_dir: Path to the git directory of the repository.
+    :param mode:    'commits' for every commit on the first parent line of HEAD,
+                    'tags' for every tagged commit.
+    :returns:       A list of Revision tuples.
+    """
+    if mode == 'commits':
+        _command = ['log', '--first-parent', '--reverse', '--format=%H%x00%H%x00%cI', 'HEAD']
+    elif mode == 'tags':
+        # Annotated tags are peeled to their commit.
+        _command = [
+            'for-each-ref', '--sort=creatordate',
+            '--format=%(refname:short)%00%(objectname)%00%(*objectname)%00%(creatordate:iso-strict)',
+            'refs/tags'
+        ]
+    else:
+        raise ValueError('History mode not supported.')
+
+    try:
+        _output = subprocess.run(
+            ['git', '--git-dir', git_dir] + _command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True
+        ).stdout.decode('utf-8', 'replace')
+    except subprocess.CalledProcessError:
+        # Repositories without commits have no history.
+        return []
+
+    _revisions = []
+    for _line in _output.splitlines():
+        _fields = _line.split('\0')
+        if mode == 'tags':
+            _name, _object, _peeled, _date = _fields
+            _revisions.append(Revision(_name, _peeled or _object, _date))
+        else:
+            _revisions.append(Revision(*_fields))
+    return _revisions
+
+def read_origin_url(git_dir: str) -> str:
+    """ Read the url of the origin remote from the config of a repository.
+
+    Linked working trees share the config of the repository they belong to.
+
+    :param git_dir: Path to the git directory of the repository.
+    :returns:       The configured url or None, if there is no origin.
+    """
+    _common_dir_file = os.path.join(git_dir, 'commondir')
+    if os.path.isfile(_common_dir_file):
+        with open(_common_dir_file, 'r') as _file:
+            git_dir = os.path.normpath(os.path.join(git_dir, _file.read().strip()))
+
+    try:
+        _config = open(os.path.join(git_dir, 'config'), 'r', errors='replace')
+    except OSError:
+        return None
+
+    _url = None
+    _in_origin = False
+    with _config:
+        for _line in _config:
+            _line = _line.strip()
+            if not _line or _line[0] in '#;':
+                continue
+            _section = _CONFIG_SECTION_REGEX.match(_line)
+            if _section:
+                _in_origin = (
+                    _section.group(1).lower() == 'remote' and
+                    _section.group(2) == 'origin'
+                )
+                _line = _line[_section.end():].strip()
+                if not _line:
+                    continue
+            if not _in_origin:
+                continue
+            _value = _CONFIG_URL_REGEX.match(_line)
+            if _value:
+                # Like git, the last value wins.
+                _url = _value.group(1).strip().strip('"')
+    return _url
+
+def discover_repositories(base_folder: str, max_depth: int = 1):
+    """ Find git repositories below a folder without opening them.
+
+    Working trees with a .git folder or a .git file pointing to
+    their git directory and bare repositories are recognized.
+    Folders inside a found repository are not searched any further.
+
+    :param base_folder: The folder to search in. It is not a repository itself.
+    :param max_depth:   How many folder levels below base_folder are searched.
+    :returns:           Generator of tuples with the absolute path of the repository
+                        directory and the path of its git directory.
+    """
+    _folders = [(os.path.abspath(base_folder), 0)]
+    while _folders:
+        _folder, _depth = _folders.pop()
+        try:
+            _entries = sorted(os.scandir(_folder), key=lambda _entry: _entry.name)
+        except OSError:
+            continue
+        # Sub folders are searched in order, after the folders of this level.
+        _sub_folders = []
+        for _entry in _entries:
+            if not _entry.is_dir(follow_symlinks=False):
+                continue
+            _git_dir = _find_git_dir(_entry.path)
+            if _git_dir:
+                yield _entry.path, _git_dir
+            elif _depth + 1 < max_depth:
+                _sub_folders.append((_entry.path, _depth + 1))
+        _folders.extend(reversed(_sub_folders))
+
+def _find_git_dir(folder: str) -> str:
+    """ Return the git directory of a repository folder or None if it is none. """
+    _dot_git = os.path.join(folder, '.git')
+    if os.path.isdir(_dot_git):
+        return _dot_git
+    if os.path.isfile(_dot_git):
+        # Worktrees and submodules point to their git directory.
+        try:
+            with open(_dot_git, 'r') as _file:
+                _content = _file.read().strip()
+        except (OSError, UnicodeDecodeError):
+            return None
+        if _content.startswith('gitdir:'):
+            return os.path.normpath(
+                os.path.join(folder, _content[len('gitdir:'):].strip())
+            )
+        return None
+    # Bare repositories are their own git directory.
+    if is_bare_repository(folder):
+        return folder
+    return None
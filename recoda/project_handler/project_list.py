@@ -0,0 +1,78 @@
+""" The project_list module reads the projects to measure from a list.
+
+Curated corpora are often given as a list of locations.
+Reading them from a file or stdin skips the discovery scan,
+so measuring starts with the first line.
+
+Every line holds the path to a project, optionally followed by a tab
+and the identifier to use for it. Empty lines and lines starting
+with # are ignored. Projects can be directories, git working trees,
+bare repositories or archives, as recognized by recoda.analyse.sources.
+"""
+
+import os
+import sys
+
+
+class Handler():
+    """ Hand out the projects of a list while it is read. """
+
+    def __init__(self, list_file: str):
+        """ Initialise the list handler.
+
+        :ivar _identifiers: Identifiers of the projects read so far,
+                            keyed by the absolute path of the project.
+        :ivar _lines:       The lines not read yet, None once all are read.
+
+        :param list_file:   Path to the list or - to read it from stdin.
+        """
+        self._list_file = list_file
+        self._identifiers = {}
+        self._lines = read_project_list(list_file)
+
+    def get_project_directories(self) -> str:
+        """ Generator to output the paths of the listed projects.
+
+        :returns: Generator to iterate over project paths.
+        """
+        for _project in list(self._identifiers):
+            yield _project
+        while self._lines is not None:
+            try:
+                _project, _identifier = next(self._lines)
+            except StopIteration:
+                self._lines = None
+                return
+            self._identifiers[_project] = _identifier
+            yield _project
+
+    def discovery_finished(self) -> bool:
+        """ Tell if the whole list is read. """
+        return self._lines is None
+
+    def get_identifier(self, project: str) -> str:
+        """ The identifier given in the list, the path of the project otherwise. """
+        return self._identifiers.get(project, project)
+
+def read_project_list(list_file: str):
+    """ Read the projects of a list line by line.
+
+    :param list_file:   Path to the list or - to read it from stdin.
+    :returns:           Generator of tuples with the absolute path
+                        of a project and its identifier.
+    """
+    if list_file == '-':
+        _file = sys.stdin
+    else:
+        _file = open(list_file, 'r')
+    try:
+        for _line in _file:
+            _line = _line.rstrip('\r\n')
+            if not _line.strip() or _line.lstrip().startswith('#'):
+                continue
+            _path, _, _identifier = _line.partition('\t')
+            _path = os.path.abspath(_path.strip())
+            yield _path, _identifier.strip() or _path
+    finally:
+        if _file is not sys.stdin:
+            _file.close()
@@ -0,0 +1,369 @@
+""" The work_queue module shares the projects of a run between several processes.
+
+The queue is an SQLite database, e.g. on a shared file system.
+Every participating recoda process claims the next project from it,
+so faster processes simply measure more projects.
+Claims are leases, that expire. A process renews the leases of
+the projects it is measuring, so if it dies, its projects are
+handed to other processes once their leases ran out.
+
+One process fills the queue from a regular project handler,
+while the others already start to claim projects. Filling is
+a lease, too, so if the filling process dies, another process
+with a project handler fills the queue again.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+# How often a project may be claimed before it counts as failed,
+# e.g. because it crashes every process measuring it.
+MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    identifier TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS projects_state ON projects (state, lease_expires);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    worker TEXT,
+    lease_expires REAL
+);
+CREATE TABLE IF NOT EXISTS flags (
+    name TEXT PRIMARY KEY
+);
+"""
+
+
+class WorkQueue():
+    """ Access to the queue database for one process.
+
+    Projects are pending, claimed, done or failed.
+    Every method uses its own short transaction, so several
+    processes and threads can use the same database.
+    """
+
+    def __init__(self, database_path: str, lease_seconds: float = 600, worker: str = None):
+        """
+        :param database_path:   Path to the SQLite database, it is created if needed.
+        :param lease_seconds:   How long claims are valid without renewal.
+        :param worker:          Name of this process in the queue.
+                                Host name and process id by default.
+        """
+        self.database_path = database_path
+        self.lease_seconds = lease_seconds
+        self.worker = worker or '{}:{}'.format(socket.gethostname(), os.getpid())
+        self._local = threading.local()
+        with self._transaction() as _connection:
+            _connection.executescript(_SCHEMA)
+
+    def add(self, projects) -> int:
+        """ Add projects, that are not in the queue yet.
+
+        Projects already in the queue, e.g. added by a process,
+        that filled the queue before, are left as they are.
+        Distinct projects sharing an identifier, like two clones
+        of the same repository, can not be told apart in the results,
+        so they are refused with a ValueError and nothing is added.
+
+        :param projects:    Iterable of tuples with the path and identifier of a project.
+        :returns:           The number of projects added.
+        """
+        _projects = list(projects)
+        with self._transaction() as _connection:
+            _added = _connection.executemany(
+                "INSERT OR IGNORE INTO projects (path, identifier) VALUES (?, ?)",
+                _projects
+            ).rowcount
+            if _added < len(_projects):
+                for _path, _identifier in _projects:
+                    _queued_path = _connection.execute(
+                        "SELECT path FROM projects WHERE identifier = ?",
+                        (_identifier,)
+                    ).fetchone()[0]
+                    if _queued_path != _path:
+                        raise ValueError('{} and {} share the identifier {}.'.format(
+                            _queued_path, _path, _identifier
+                        ))
+            return _added
+
+    def claim(self) -> tuple:
+        """ Claim the next pending project or one with an expired lease.
+
+        :returns: Tuple of path and identifier, None if nothing can be claimed right now.
+        """
+        _now = time.time()
+        with self._transaction() as _connection:
+            _connection.execute(
+                "UPDATE projects SET state = 'failed' "
+                "WHERE state = 'claimed' AND lease_expires < ? AND attempts >= ?",
+                (_now, MAX_ATTEMPTS)
+            )
+            _project = _connection.execute(
+                "SELECT path, identifier FROM projects "
+                "WHERE state = 'pending' OR (state = 'claimed' AND lease_expires < ?) "
+                "ORDER BY rowid LIMIT 1",
+                (_now,)
+            ).fetchone()
+            if _project is None:
+                return None
+            _connection.execute(
+                "UPDATE projects SET state = 'claimed', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE identifier = ?",
+                (self.worker, _now + self.lease_seconds, _project[1])
+            )
+        return _project
+
+    def renew(self, identifiers) -> None:
+        """ Extend the leases this process holds on projects. """
+        with self._transaction() as _connection:
+            _connection.executemany(
+                "UPDATE projects SET lease_expires = ? "
+                "WHERE identifier = ? AND worker = ? AND state = 'claimed'",
+                [(time.time() + self.lease_seconds, _identifier, self.worker)
+                 for _identifier in identifiers]
+            )
+
+    def complete(self, identifiers) -> None:
+        """ Mark projects as measured. """
+        with self._transaction() as _connection:
+            _connection.executemany(
+                "UPDATE projects SET state = 'done', lease_expires = NULL WHERE identifier = ?",
+                [(_identifier,) for _identifier in identifiers]
+            )
+
+    def fail(self, identifiers) -> None:
+        """ Mark projects as failed, e.g. because measuring them raised an error. """
+        with self._transaction() as _connection:
+            _connection.executemany(
+                "UPDATE projects SET state = 'failed', lease_expires = NULL WHERE identifier = ?",
+                [(_identifier,) for _identifier in identifiers]
+            )
+
+    def claim_filling(self) -> bool:
+        """ Try to become the process, that fills the queue.
+
+        :returns: True if the queue is not filled and no other process fills it.
+        """
+        _now = time.time()
+        with self._transaction() as _connection:
+            # Writing first starts the transaction, so no other
+            # process can take the lease between reading and writing it.
+            _connection.execute(
+                "DELETE FROM leases WHERE name = 'filling' AND lease_expires < ?",
+                (_now,)
+            )
+            if self._is_filled(_connection):
+                return False
+            _filler = _connection.execute(
+                "SELECT worker FROM leases WHERE name = 'filling'"
+            ).fetchone()
+            if _filler is not None and _filler[0] != self.worker:
+                return False
+            _connection.execute(
+                "INSERT OR REPLACE INTO leases (name, worker, lease_expires) "
+                "VALUES ('filling', ?, ?)",
+                (self.worker, _now + self.lease_seconds)
+            )
+        return True
+
+    def mark_filled(self) -> None:
+        """ Record, that all projects are in the queue. """
+        with self._transaction() as _connection:
+            _connection.execute("INSERT OR IGNORE INTO flags (name) VALUES ('filled')")
+            _connection.execute("DELETE FROM leases WHERE name = 'filling'")
+
+    def filling(self) -> bool:
+        """ Tell if the queue is filled or a process holds the lease to fill it. """
+        with self._transaction() as _connection:
+            return self._is_filled(_connection) or bool(_connection.execute(
+                "SELECT 1 FROM leases WHERE name = 'filling' AND lease_expires >= ?",
+                (time.time(),)
+            ).fetchone())
+
+    def finished(self) -> bool:
+        """ Tell if the queue is filled and no project waits or is being measured. """
+        with self._transaction() as _connection:
+            if not self._is_filled(_connection):
+                return False
+            return not _connection.execute(
+                "SELECT 1 FROM projects WHERE state IN ('pending', 'claimed') LIMIT 1"
+            ).fetchone()
+
+    def counts(self) -> dict:
+        """ Number of projects in every state. """
+        with self._transaction() as _connection:
+            return dict(_connection.execute(
+                "SELECT state, COUNT(*) FROM projects GROUP BY state"
+            ).fetchall())
+
+    @staticmethod
+    def _is_filled(connection: sqlite3.Connection) -> bool:
+        """ Check the filled flag inside a transaction. """
+        return bool(connection.execute(
+            "SELECT 1 FROM flags WHERE name = 'filled'"
+        ).fetchone())
+
+    def _transaction(self):
+        """ The connection of the current thread, used as context for one transaction. """
+        if getattr(self._local, 'connection', None) is None:
+            # Transactions are started immediately, so concurrent
+            # claims wait for each other instead of failing on commit.
+            self._local.connection = sqlite3.connect(
+                self.database_path,
+                timeout=60,
+                isolation_level='IMMEDIATE'
+            )
+        return self._local.connection
+
+
+class Handler():
+    """ Hand out the projects claimed from a work queue. """
+
+    def __init__(
+            self,
+            queue: WorkQueue,
+            project_handler=None,
+            poll_seconds: float = 5,
+            fill_timeout: float = None
+    ):
+        """ Initialise the queue handler.
+
+        :ivar _claimed:         Identifiers of the projects claimed by this process,
+                                keyed by their path.
+        :ivar _measuring:       Identifiers, whose leases are renewed.
+        :ivar _filler:          Thread filling the queue, None if this process does not fill it.
+
+        :param queue:           The work queue shared by all processes.
+        :param project_handler: Handler discovering the projects to fill the queue with.
+                                Without it, this process only claims projects.
+        :param poll_seconds:    How long to wait, before trying again, when
+                                all remaining projects are claimed by others.
+        :param fill_timeout:    Seconds a process without a project handler waits
+                                for a queue, that is neither filled nor being filled,
+                                e.g. because the filling process died.
+                                The lease time of the queue by default.
+        """
+        self._queue = queue
+        self._project_handler = project_handler
+        self._poll_seconds = poll_seconds
+        self._fill_timeout = queue.lease_seconds if fill_timeout is None else fill_timeout
+        self._filler = None
+        self._claimed = {}
+        self._measuring = set()
+        self._lock = threading.Lock()
+        self._finished = False
+        self._fill_error = None
+
+        _heartbeat = threading.Thread(target=self._renew_leases, daemon=True)
+        _heartbeat.start()
+
+    def get_project_directories(self) -> str:
+        """ Generator to claim projects and output their paths.
+
+        Ends when every project in the queue is measured,
+        waiting for projects other processes claimed,
+        since their leases might expire. Errors filling
+        the queue are raised here.
+
+        :returns: Generator to iterate over project paths.
+        """
+        self._take_over_filling()
+        _unfilled_since = None
+        while True:
+            if self._fill_error is not None:
+                raise self._fill_error
+            _project = self._queue.claim()
+            if _project is None:
+                if self._queue.finished():
+                    self._finished = True
+                    return
+                # The process filling the queue may have died.
+                if self._project_handler is not None:
+                    self._take_over_filling()
+                elif self._queue.filling():
+                    _unfilled_since = None
+                elif _unfilled_since is None:
+                    _unfilled_since = time.monotonic()
+                elif time.monotonic() - _unfilled_since > self._fill_timeout:
+                    raise RuntimeError(
+                        'The queue is not filled and no process fills it. '
+                        'Start a run with -b or --projects-from to fill it.'
+                    )
+                time.sleep(self._poll_seconds)
+                continue
+            _path, _identifier = _project
+            with self._lock:
+                self._claimed[_path] = _identifier
+                self._measuring.add(_identifier)
+            yield _path
+
+    def discovery_finished(self) -> bool:
+        """ Tell if all projects of the queue are handed out. """
+        return self._finished
+
+    def get_identifier(self, project: str) -> str:
+        """ The identifier the project was queued with. """
+        return self._claimed[project]
+
+    def mark_measured(self, identifiers) -> None:
+        """ Release the leases of measured projects and mark them as done. """
+        with self._lock:
+            self._measuring.difference_update(identifiers)
+        self._queue.complete(identifiers)
+
+    def mark_failed(self, identifiers) -> None:
+        """ Release the leases of projects, that could not be measured, and mark them as failed. """
+        with self._lock:
+            self._measuring.difference_update(identifiers)
+        self._queue.fail(identifiers)
+
+    def _take_over_filling(self) -> None:
+        """ Start filling the queue, if it is not filled and no other process fills it. """
+        if self._project_handler is None:
+            return
+        if self._filler is not None and self._filler.is_alive():
+            return
+        if self._queue.claim_filling():
+            self._filler = threading.Thread(target=self._fill, daemon=True)
+            self._filler.start()
+
+    def _fill(self):
+        """ Add all projects of the project handler in batches.
+
+        Errors are handed to the thread claiming projects, to raise them there.
+        """
+        try:
+            _batch = []
+            for _project in self._project_handler.get_project_directories():
+                _batch.append((_project, self._project_handler.get_identifier(_project)))
+                if len(_batch) == 1000:
+                    self._queue.add(_batch)
+                    # Keep the filling lease alive.
+                    self._queue.claim_filling()
+                    _batch = []
+            self._queue.add(_batch)
+            self._queue.mark_filled()
+        except Exception as _error:
+            self._fill_error = _error
+
+    def _renew_leases(self):
+        """ Renew the leases of the projects being measured, until the process ends. """
+        while True:
+            time.sleep(self._queue.lease_seconds / 3)
+            with self._lock:
+                _identifiers = list(self._measuring)
+            if _identifiers:
+                self._queue.renew(_identifiers)
+            if self._filler is not None and self._filler.is_alive():
+                # Keep the filling lease alive during slow discovery.
+                self._queue.claim_filling()
@@ -0,0 +1,94 @@
+""" Test the helper functions for python specific measures. """
+
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+
+from recoda.analyse.python.helpers import (
+    get_distribution_names,
+    get_external_imports,
+    get_import_index,
+    normalise_requirement
+)
+
+
+class TestImportIndex(unittest.TestCase):
+    """ Test the import index built from the parsed python files. """
+
+    def setUp(self):
+        """ Create a mock project with a local package. """
+        self._test_sandbox = tempfile.mkdtemp()
+        os.makedirs(self._test_sandbox+'/localpackage')
+        with open(self._test_sandbox+'/localpackage/__init__.py', 'w') as _file:
+            _file.write('from . import sibling\n')
+        with open(self._test_sandbox+'/script.py', 'w') as _file:
+            _file.write('import os\n')
+            _file.write('import numpy as np\n')
+            _file.write('from zope import testing\n')
+            _file.write('from localpackage import helper\n')
+            _file.write('def function():\n')
+            _file.write('    import pandas.io\n')
+
+    def test_import_index(self):
+        """ Do we get all absolute imports, including nested ones? """
+        _index = get_import_index(self._test_sandbox)
+
+        for _module in ['os', 'numpy', 'zope', 'zope.testing', 'pandas.io']:
+            self.assertIn(_module, _index.modules)
+        self.assertIn('pandas', _index.top_level)
+        self.assertIn('localpackage', _index.local)
+        self.assertEqual(0, _index.parse_errors)
+
+    def test_external_imports(self):
+        """ Are local and standard library imports excluded? """
+        self.assertEqual(
+            {'numpy', 'pandas', 'zope'},
+            get_external_imports(self._test_sandbox)
+        )
+
+    def test_parse_errors(self):
+        """ Are unparsable files counted? """
+        with open(self._test_sandbox+'/python2.py', 'w') as _file:
+            _file.write('print "python 2"\n')
+
+        self.assertEqual(1, get_import_index(self._test_sandbox).parse_errors)
+
+    def test_ignored_folders(self):
+        """ Are imports in bundled environments left out, like pipreqs does? """
+        os.makedirs(self._test_sandbox+'/venv/lib')
+        with open(self._test_sandbox+'/venv/lib/site.py', 'w') as _file:
+            _file.write('import requests\n')
+        with open(self._test_sandbox+'/venv/lib/python2.py', 'w') as _file:
+            _file.write('print "python 2"\n')
+
+        _index = get_import_index(self._test_sandbox)
+        self.assertNotIn('requests', _index.modules)
+        self.assertEqual(0, _index.parse_errors)
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        rmtree(self._test_sandbox, ignore_errors=True)
+
+
+class TestRequirementNames(unittest.TestCase):
+    """ Test the resolution and normalisation of requirement names. """
+
+    def test_normalise_requirement(self):
+        """ Are versions, extras and markers removed and names normalised? """
+        for _requirement in [
+                'GitPython',
+                'gitpython==2.0.4',
+                'GitPython [extra] >= 2.0',
+                'gitpython; python_version < "3"'
+        ]:
+            self.assertEqual('gitpython', normalise_requirement(_requirement))
+        self.assertEqual('zope-testing', normalise_requirement('zope.testing~=1.0'))
+        self.assertEqual('', normalise_requirement('# comment'))
+
+    def test_distribution_names(self):
+        """ Are imports mapped to their distributions? """
+        self.assertEqual(
+            {'pyyaml', 'beautifulsoup4', 'numpy'},
+            get_distribution_names(['yaml', 'bs4', 'numpy'])
+        )
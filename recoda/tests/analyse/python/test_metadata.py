@@ -0,0 +1,189 @@
+""" Test the reading of packaging metadata. """
+
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+
+from recoda.analyse.python.metadata import (
+    get_declarative_metadata,
+    read_setup_script
+)
+
+
+class TestSetupScript(unittest.TestCase):
+    """ Test the static analysis of setup.py files. """
+
+    def setUp(self):
+        """ Create a sandbox for setup scripts. """
+        self._test_sandbox = tempfile.mkdtemp()
+        self._setup_path = os.path.join(self._test_sandbox, 'setup.py')
+
+    def _read(self, content: str):
+        """ Write a setup.py and analyse it. """
+        with open(self._setup_path, 'w') as _file:
+            _file.write(content)
+        return read_setup_script(self._setup_path)
+
+    def test_literal_requirements(self):
+        """ Do we get requirements from literal lists and names bound to them? """
+        _script = self._read(
+            "import setuptools\n"
+            "REQUIREMENTS = ['numpy>=1.0', 'pandas']\n"
+            "setuptools.setup(\n"
+            "    name='mock',\n"
+            "    install_requires=REQUIREMENTS + ['scipy'],\n"
+            "    tests_require=('pytest',),\n"
+            ")\n"
+        )
+        self.assertTrue(_script.parsed)
+        self.assertTrue(_script.setup_call)
+        self.assertEqual(('numpy>=1.0', 'pandas', 'scipy'), _script.install_requires)
+        self.assertEqual(('pytest',), _script.tests_require)
+        self.assertFalse(_script.requirements_error)
+
+    def test_runtime_requirements(self):
+        """ Are requirements, that are only known at runtime, flagged? """
+        _script = self._read(
+            "from setuptools import setup\n"
+            "setup(install_requires=open('requirements.txt').read().split())\n"
+        )
+        self.assertTrue(_script.setup_call)
+        self.assertTrue(_script.requirements_error)
+
+    def test_malformed_literal(self):
+        """ Are literals, that cannot be evaluated, flagged instead of raising? """
+        _script = self._read(
+            "from setuptools import setup\n"
+            "setup(install_requires={['numpy']})\n"
+        )
+        self.assertTrue(_script.setup_call)
+        self.assertTrue(_script.requirements_error)
+
+    def test_no_setup_call(self):
+        """ Is a file without setup call recognized? """
+        _script = self._read("import os\n")
+        self.assertTrue(_script.parsed)
+        self.assertFalse(_script.setup_call)
+        self.assertTrue(_script.requirements_error)
+
+    def test_unparsable_setup(self):
+        """ Do we still get literal requirements from python 2 scripts? """
+        _script = self._read(
+            "from distutils.core import setup\n"
+            "print 'python 2'\n"
+            "setup(name='mock', install_requires=['numpy'])\n"
+        )
+        self.assertFalse(_script.parsed)
+        self.assertTrue(_script.setup_call)
+        self.assertEqual(('numpy',), _script.install_requires)
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        rmtree(self._test_sandbox, ignore_errors=True)
+
+
+class TestDeclarativeMetadata(unittest.TestCase):
+    """ Test the reading of declarative packaging and environment files. """
+
+    def setUp(self):
+        """ Create a sandbox for the metadata files. """
+        self._test_sandbox = tempfile.mkdtemp()
+
+    def _read(self, file_name: str, content: str):
+        """ Write a single metadata file and read the projects metadata. """
+        with open(os.path.join(self._test_sandbox, file_name), 'w') as _file:
+            _file.write(content)
+        _metadata = get_declarative_metadata(self._test_sandbox)
+        self.assertEqual(1, len(_metadata))
+        return _metadata[0]
+
+    def test_setup_cfg(self):
+        """ Do we read the setuptools configuration? """
+        _metadata = self._read(
+            'setup.cfg',
+            "[metadata]\n"
+            "name = mock\n"
+            "[options]\n"
+            "install_requires =\n"
+            "    numpy>=1.0\n"
+            "    pandas\n"
+        )
+        self.assertTrue(_metadata.package)
+        self.assertEqual(('numpy>=1.0', 'pandas'), _metadata.requirements)
+
+    def test_setup_cfg_markers(self):
+        """ Are environment markers removed from comma separated requirements? """
+        _metadata = self._read(
+            'setup.cfg',
+            "[options]\n"
+            "install_requires = numpy>=1.0,<2, mock; python_version<\"3\"\n"
+        )
+        self.assertEqual(('numpy>=1.0,<2', 'mock'), _metadata.requirements)
+
+    def test_pyproject_toml(self):
+        """ Do we read PEP 621 and poetry metadata? """
+        _metadata = self._read(
+            'pyproject.toml',
+            "[project]\n"
+            "name = 'mock'\n"
+            "dependencies = ['numpy']\n"
+            "[project.optional-dependencies]\n"
+            "test = ['pytest']\n"
+        )
+        self.assertTrue(_metadata.package)
+        self.assertEqual(('numpy', 'pytest'), _metadata.requirements)
+
+        _metadata = self._read(
+            'pyproject.toml',
+            "[tool.poetry]\n"
+            "name = 'mock'\n"
+            "[tool.poetry.dependencies]\n"
+            "python = '^3.6'\n"
+            "numpy = '*'\n"
+        )
+        self.assertTrue(_metadata.package)
+        self.assertEqual(('numpy',), _metadata.requirements)
+
+        # Only a build system configuration declares nothing.
+        _metadata = self._read(
+            'pyproject.toml',
+            "[build-system]\n"
+            "requires = ['setuptools']\n"
+        )
+        self.assertFalse(_metadata.package)
+        self.assertIsNone(_metadata.requirements)
+
+    def test_environment_files(self):
+        """ Do we read pipenv and conda environments? """
+        _metadata = self._read(
+            'Pipfile',
+            "[packages]\n"
+            "numpy = '*'\n"
+            "[dev-packages]\n"
+            "pytest = '*'\n"
+        )
+        self.assertFalse(_metadata.package)
+        self.assertEqual(('numpy', 'pytest'), _metadata.requirements)
+
+        os.remove(os.path.join(self._test_sandbox, 'Pipfile'))
+        _metadata = self._read(
+            'environment.yml',
+            "name: mock\n"
+            "dependencies:\n"
+            "  - python=3.6\n"
+            "  - conda-forge::numpy=1.15\n"
+            "  - pip:\n"
+            "    - textstat\n"
+        )
+        self.assertEqual(('numpy=1.15', 'textstat'), _metadata.requirements)
+
+    def test_malformed_file(self):
+        """ Are malformed files left out? """
+        with open(os.path.join(self._test_sandbox, 'pyproject.toml'), 'w') as _file:
+            _file.write("[project\n")
+        self.assertEqual((), get_declarative_metadata(self._test_sandbox))
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        rmtree(self._test_sandbox, ignore_errors=True)
@@ -355,7 +355,21 @@ class TestInstallability(unittest.TestCase):
 
         self.assertTrue(packageability(self.test_sandbox))
 
+    def test_declarative_packaging(self):
+        """ Are declarative packaging files used instead of setup scripts? """
+        with open(self.test_sandbox+'/pyproject.toml', 'w') as pyproject_file:
+            pyproject_file.write("[project]\n")
+            pyproject_file.write("name = 'recoda'\n")
+            pyproject_file.write("dependencies = {}\n".format(
+                [item for item in self.import_list]
+            ))
+        # Requirements, that a setup script computes at runtime, do not matter anymore.
+        with open(self.test_sandbox+'/setup.py', 'w') as setup_file:
+            setup_file.write('from setuptools import setup\n')
+            setup_file.write('setup(install_requires=open("deps").readlines())\n')
 
+        self.assertTrue(packageability(self.test_sandbox))
+        self.assertEqual(1, requirements_declared(self.test_sandbox))
 
     def tearDown(self):
         """ Clean up the sandbox. """
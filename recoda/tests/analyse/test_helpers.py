@@ -1,11 +1,19 @@
 """ Test the helper functions of the recoda.analyse package. """
 
 import os
+import random
 import shutil
 import tempfile
 import unittest
+from unittest.mock import patch
 
+import recoda.analyse.helpers
 from recoda.analyse.helpers import (
+    cached,
+    count_non_blank_lines,
+    count_project_file_lines,
+    file_fact,
+    project_scope,
     search_filename
 )
 
@@ -87,5 +95,86 @@ class TestSearchFilename(unittest.TestCase):
         """ Remove the mock base folder. """
         shutil.rmtree(self._base_folder)
 
+class TestProjectScope(unittest.TestCase):
+    """ Test the sharing of intermediate results between metrics. """
 
+    def test_project_scope(self):
+        """ Are results only shared inside the scope of a project? """
+        _calls = []
 
+        def _factory():
+            _calls.append(1)
+            return len(_calls)
+
+        self.assertEqual(1, cached('/project', 'key', _factory))
+        self.assertEqual(2, cached('/project', 'key', _factory))
+
+        with project_scope('/project'):
+            self.assertEqual(3, cached('/project', 'key', _factory))
+            self.assertEqual(3, cached('/project', 'key', _factory))
+            # Other projects are not affected.
+            self.assertEqual(4, cached('/other', 'key', _factory))
+
+        self.assertEqual(5, cached('/project', 'key', _factory))
+
+    def test_file_facts(self):
+        """ Are only the listed results of single files recorded? """
+        _project = tempfile.mkdtemp()
+        try:
+            _file = os.path.join(_project, 'module.py')
+            with open(_file, 'w') as _module:
+                _module.write('x = 1\n\n# comment\n')
+            _facts = {}
+            with project_scope(_project, file_facts=_facts):
+                count_project_file_lines(_project, _file)
+                file_fact(_project, _file, 'style_offences', lambda: (3, 1))
+                file_fact(_project, _file, 'error_density', lambda: False)
+                file_fact(_project, _file, 'python_module', lambda: 'tree')
+            self.assertEqual(
+                {'module.py': {
+                    'non_blank_lines': 2,
+                    'physical_lines': 3,
+                    'style_offences': 1,
+                    'error_density': None
+                }},
+                _facts
+            )
+        finally:
+            shutil.rmtree(_project)
+
+class TestCountNonBlankLines(unittest.TestCase):
+    """ Test the byte level line classification. """
+
+    def setUp(self):
+        """ Create a file with a known number of non blank lines. """
+        _, self._file_path = tempfile.mkstemp()
+        _lines = [b'', b'  ', b'\t\x0c', b'code', b'  # comment ', b'x']
+        _line_breaks = [b'\n', b'\r\n', b'\r']
+        _random = random.Random(0)
+        _content = b''
+        self._non_blank_lines = 0
+        for _ in range(2000):
+            _line = _random.choice(_lines)
+            if _line.strip():
+                self._non_blank_lines = self._non_blank_lines + 1
+            _content = _content + _line + _random.choice(_line_breaks)
+        # A last line without line break.
+        _content = _content + b'end'
+        self._non_blank_lines = self._non_blank_lines + 1
+        with open(self._file_path, 'wb') as _file:
+            _file.write(_content)
+
+    def test_small_file(self):
+        """ Do we count correctly when reading the file in one go? """
+        self.assertEqual(self._non_blank_lines, count_non_blank_lines(self._file_path))
+
+    def test_large_file(self):
+        """ Do we count correctly with numpy over blocks of a memory map? """
+        # Small blocks make lines cross block boundaries.
+        with patch.object(recoda.analyse.helpers, '_LARGE_FILE_SIZE', 0), \
+                patch.object(recoda.analyse.helpers, '_BLOCK_SIZE', 7):
+            self.assertEqual(self._non_blank_lines, count_non_blank_lines(self._file_path))
+
+    def tearDown(self):
+        """ Remove the test file. """
+        os.remove(self._file_path)
@@ -0,0 +1,280 @@
+""" Test reading project files from their sources. """
+
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+
+import recoda.analyse.python.metrics
+from recoda.analyse import sources
+from recoda.analyse.helpers import get_file_index, project_scope
+from recoda.analyse.sources import (
+    ArchiveSource,
+    DirectorySource,
+    GitTreeSource,
+    open_source
+)
+
+_MOCK_FILES = {
+    'README.md': "# Mock\n\nA mock project, that is measured from a bare repository.\n",
+    'setup.py': "from setuptools import setup\nsetup(name='mock', install_requires=['numpy'])\n",
+    'mock/__init__.py': "",
+    'mock/script.py': (
+        "\"\"\" A mock module. \"\"\"\n"
+        "import numpy\n"
+        "import unittest\n"
+        "\n"
+        "# A comment\n"
+        "def function():\n"
+        "    return numpy.zeros(1)\n"
+    ),
+    'mock/data\nwith newline.txt': "odd names are listed as well\n",
+    '.hidden/secret.py': "import pandas\n",
+}
+
+# license_type is left out, since it calls an external tool.
+_COMPARED_METRICS = (
+    'loc',
+    'packageability',
+    'requirements_declared',
+    'docker_setup',
+    'project_readme_size',
+    'project_doc_size',
+    'average_comment_density',
+    'standard_compliance',
+    'testlibrary_usage',
+    'error_density',
+)
+
+def _git(*arguments: str, cwd: str = None) -> bytes:
+    """ Run a git command quietly. """
+    return subprocess.run(
+        ['git', '-c', 'user.name=mock', '-c', 'user.email=mock@mock'] + list(arguments),
+        cwd=cwd,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    ).stdout
+
+def _write_mock_project(folder: str):
+    """ Write the mock files into a folder. """
+    for _path, _content in _MOCK_FILES.items():
+        _full_path = os.path.join(folder, _path)
+        os.makedirs(os.path.dirname(_full_path), exist_ok=True)
+        with open(_full_path, 'w') as _file:
+            _file.write(_content)
+
+def _assert_same_project(test_case: unittest.TestCase, expected_path: str, measured_path: str):
+    """ Compare the metrics of two locations of the same project. """
+    for _metric in _COMPARED_METRICS:
+        _function = getattr(recoda.analyse.python.metrics, _metric)
+        with project_scope(expected_path):
+            _expected = _function(expected_path)
+        with project_scope(measured_path):
+            _measured = _function(measured_path)
+        test_case.assertEqual(_expected, _measured, _metric)
+
+class TestDirectorySource(unittest.TestCase):
+    """ Test measuring a project checked out into a directory. """
+
+    def setUp(self):
+        """ Create the same project twice, once with a broken symbolic link. """
+        self._test_sandbox = tempfile.mkdtemp()
+        self._project = os.path.join(self._test_sandbox, 'mock')
+        self._linked_project = os.path.join(self._test_sandbox, 'linked', 'mock')
+        _write_mock_project(self._project)
+        _write_mock_project(self._linked_project)
+        os.symlink('/nonexistent', os.path.join(self._linked_project, 'mock', 'b.py'))
+
+    def test_broken_symlink(self):
+        """ Are broken symbolic links left out instead of failing the metrics? """
+        self.assertNotIn(
+            os.path.join('mock', 'b.py'),
+            DirectorySource(self._linked_project).list_files()
+        )
+        _assert_same_project(self, self._project, self._linked_project)
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self._test_sandbox, ignore_errors=True)
+
+class TestGitTreeSource(unittest.TestCase):
+    """ Test measuring a bare repository straight from its object database. """
+
+    def setUp(self):
+        """ Create a working tree with a commit and a bare clone of it. """
+        self._test_sandbox = tempfile.mkdtemp()
+        self._working_tree = os.path.join(self._test_sandbox, 'mock')
+        self._bare_repository = os.path.join(self._test_sandbox, 'mock.git')
+        _write_mock_project(self._working_tree)
+        _git('init', '-q', cwd=self._working_tree)
+        _git('add', '-A', cwd=self._working_tree)
+        _git('commit', '-q', '-m', 'mock', cwd=self._working_tree)
+        _git('clone', '-q', '--bare', self._working_tree, self._bare_repository)
+
+    def test_open_source(self):
+        """ Are bare repositories read from git and everything else from disk? """
+        self.assertIsInstance(open_source(self._working_tree), DirectorySource)
+        _source = open_source(self._bare_repository)
+        self.assertIsInstance(_source, GitTreeSource)
+        _source.close()
+
+    def test_files(self):
+        """ Do both sources list and read the same files? """
+        _directory = DirectorySource(self._working_tree)
+        _tree = GitTreeSource(self._bare_repository)
+        try:
+            self.assertEqual(sorted(_directory.list_files()), sorted(_tree.list_files()))
+            for _path in _tree.list_files():
+                self.assertEqual(_directory.read_bytes(_path), _tree.read_bytes(_path))
+                self.assertEqual(_directory.size(_path), _tree.size(_path))
+            self.assertIsNone(_tree.local_path('setup.py'))
+        finally:
+            _tree.close()
+
+    def test_empty_repository(self):
+        """ Does a repository without commits have no files? """
+        _empty = os.path.join(self._test_sandbox, 'empty.git')
+        _git('init', '-q', '--bare', _empty)
+        self.assertEqual((), GitTreeSource(_empty).list_files())
+
+    def test_metrics(self):
+        """ Do the metrics of a bare repository match those of its working tree? """
+        _assert_same_project(self, self._working_tree, self._bare_repository)
+
+    def test_outside_scope(self):
+        """ Are bare repositories only read inside a project scope? """
+        with self.assertRaises(ValueError):
+            get_file_index(self._bare_repository)
+        with project_scope(self._bare_repository):
+            self.assertIn('setup.py', get_file_index(self._bare_repository))
+
+    def test_at_revision(self):
+        """ Does a tree derived by a diff match the listed tree and keep facts of unchanged files? """
+        _first = _git('rev-parse', 'HEAD', cwd=self._working_tree).decode().strip()
+        os.remove(os.path.join(self._working_tree, 'setup.py'))
+        with open(os.path.join(self._working_tree, 'mock', 'script.py'), 'a') as _file:
+            _file.write("# changed\n")
+        with open(os.path.join(self._working_tree, 'new.py'), 'w') as _file:
+            _file.write("import os\n")
+        _git('add', '-A', cwd=self._working_tree)
+        _git('commit', '-q', '-m', 'change', cwd=self._working_tree)
+        _git('push', '-q', self._bare_repository, 'HEAD:master', '--force', cwd=self._working_tree)
+        _second = _git('rev-parse', 'HEAD', cwd=self._working_tree).decode().strip()
+
+        _source = GitTreeSource(self._bare_repository, _first)
+        _unchanged = _source.object_id('README.md')
+        _changed = _source.object_id(os.path.join('mock', 'script.py'))
+        _source.facts[(_unchanged, 'mock')] = 'kept'
+        _source.facts[(_changed, 'mock')] = 'dropped'
+
+        _derived = _source.at_revision(_second)
+        _listed = GitTreeSource(self._bare_repository, _second)
+        try:
+            self.assertEqual(sorted(_listed.list_files()), sorted(_derived.list_files()))
+            for _path in _listed.list_files():
+                self.assertEqual(_listed.read_bytes(_path), _derived.read_bytes(_path))
+                self.assertEqual(_listed.size(_path), _derived.size(_path))
+            self.assertEqual({(_unchanged, 'mock'): 'kept'}, _derived.facts)
+        finally:
+            _derived.close()
+            _listed.close()
+
+    def test_at_revision_without_diff(self):
+        """ Is the tree listed in full, when git cannot diff the revisions? """
+        _missing = GitTreeSource(self._bare_repository, '0' * 40)
+        _derived = _missing.at_revision('HEAD')
+        _listed = GitTreeSource(self._bare_repository)
+        try:
+            self.assertEqual(sorted(_listed.list_files()), sorted(_derived.list_files()))
+        finally:
+            _derived.close()
+            _listed.close()
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self._test_sandbox, ignore_errors=True)
+
+
+class TestArchiveSource(unittest.TestCase):
+    """ Test measuring projects packed into archives. """
+
+    def setUp(self):
+        """ Pack the mock project into tarballs with a top level folder and a flat zip file. """
+        self._test_sandbox = tempfile.mkdtemp()
+        self._project = os.path.join(self._test_sandbox, 'mock-1.0')
+        _write_mock_project(self._project)
+        self._tarball = os.path.join(self._test_sandbox, 'mock-1.0.tar.gz')
+        with tarfile.open(self._tarball, 'w:gz') as _tar_file:
+            _tar_file.add(self._project, arcname='mock-1.0')
+        self._xz_tarball = os.path.join(self._test_sandbox, 'mock-1.0.tar.xz')
+        with tarfile.open(self._xz_tarball, 'w:xz') as _tar_file:
+            _tar_file.add(self._project, arcname='mock-1.0')
+        self._plain_tarball = os.path.join(self._test_sandbox, 'mock-1.0.tar')
+        with tarfile.open(self._plain_tarball, 'w') as _tar_file:
+            _tar_file.add(self._project, arcname='mock-1.0')
+        self._zip_file = os.path.join(self._test_sandbox, 'mock.zip')
+        with zipfile.ZipFile(self._zip_file, 'w') as _zip_file:
+            for _path in _MOCK_FILES:
+                _zip_file.write(os.path.join(self._project, _path), _path)
+
+    def test_files(self):
+        """ Do archives list and read the same files as the directory, without temporary files? """
+        _directory = DirectorySource(self._project)
+        for _archive in (self._tarball, self._xz_tarball, self._plain_tarball, self._zip_file):
+            _source = open_source(_archive)
+            self.assertIsInstance(_source, ArchiveSource)
+            try:
+                with patch.object(sources.tempfile, 'TemporaryFile', side_effect=AssertionError):
+                    _files = _source.list_files()
+                self.assertEqual(sorted(_directory.list_files()), sorted(_files))
+                for _path in _files:
+                    self.assertEqual(_directory.read_bytes(_path), _source.read_bytes(_path))
+                    self.assertEqual(_directory.size(_path), _source.size(_path))
+            finally:
+                _source.close()
+
+    def test_large_members(self):
+        """ Are large members of compressed tarballs read from temporary files? """
+        _directory = DirectorySource(self._project)
+        with patch.object(sources, 'MAX_MEMBER_MEMORY', 10):
+            _source = open_source(self._xz_tarball)
+            try:
+                for _path in _source.list_files():
+                    self.assertEqual(_directory.read_bytes(_path), _source.read_bytes(_path))
+            finally:
+                _source.close()
+
+    def test_metrics(self):
+        """ Do the metrics of archives match those of the directory? """
+        for _archive in (self._tarball, self._zip_file):
+            _assert_same_project(self, self._project, _archive)
+
+    def test_truncated(self):
+        """ Do truncated archives fail, instead of being measured as if complete? """
+        with tarfile.open(self._plain_tarball) as _tar_file:
+            # Plain tarballs are padded, so they are cut inside the data of the last member.
+            _end_of_data = max(_info.offset_data + _info.size for _info in _tar_file.getmembers())
+        # Without its checksum, a compressed tarball holds all members, but is incomplete.
+        for _archive, _length in ((self._tarball, os.path.getsize(self._tarball) // 2),
+                                  (self._tarball, os.path.getsize(self._tarball) - 4),
+                                  (self._plain_tarball, _end_of_data - 1)):
+            with open(_archive, 'rb') as _file:
+                _content = _file.read(_length)
+            _truncated = os.path.join(self._test_sandbox, 'truncated-' + os.path.basename(_archive))
+            with open(_truncated, 'wb') as _file:
+                _file.write(_content)
+            _source = open_source(_truncated)
+            try:
+                with self.assertRaises((tarfile.ReadError, EOFError)):
+                    _source.list_files()
+            finally:
+                _source.close()
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self._test_sandbox, ignore_errors=True)
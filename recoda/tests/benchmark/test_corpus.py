@@ -0,0 +1,56 @@
+""" Unit-test module for generating synthetic corpora. """
+
+import ast
+import filecmp
+import os
+import shutil
+import tempfile
+import unittest
+
+from recoda.benchmark.corpus import CorpusSpec, generate_corpus
+
+
+class TestGenerateCorpus(unittest.TestCase):
+    """ Test that corpora are reproducible and look like research code. """
+
+    def setUp(self):
+        """ Create a sandbox. """
+        self._test_sandbox = tempfile.mkdtemp()
+        self._spec = CorpusSpec(projects=3, files_per_project=(2, 5), lines_per_file=(20, 80))
+
+    def _tree(self, path: str) -> list:
+        """ All files of a folder, relative to it. """
+        return sorted(
+            os.path.relpath(os.path.join(_root, _file), path)
+            for _root, _, _files in os.walk(path)
+            for _file in _files
+        )
+
+    def test_seeded(self):
+        """ Do the same seeds give the same corpus and larger corpora start with it? """
+        _first = os.path.join(self._test_sandbox, 'first')
+        _second = os.path.join(self._test_sandbox, 'second')
+        generate_corpus(_first, self._spec, seed=7)
+        generate_corpus(_second, self._spec._replace(projects=4), seed=7)
+
+        _files = self._tree(_first)
+        _match, _mismatch, _errors = filecmp.cmpfiles(_first, _second, _files, shallow=False)
+        self.assertEqual(_files, _match)
+        self.assertEqual(4, len(os.listdir(_second)))
+
+    def test_projects(self):
+        """ Do projects have a README and valid python modules? """
+        _projects = generate_corpus(self._test_sandbox, self._spec, seed=1)
+        self.assertEqual(3, len(_projects))
+        for _project in _projects:
+            _files = self._tree(_project)
+            self.assertIn('README.md', _files)
+            _modules = [_file for _file in _files if _file.endswith('.py')]
+            self.assertTrue(_modules)
+            for _module in _modules:
+                with open(os.path.join(_project, _module)) as _source:
+                    ast.parse(_source.read())
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self._test_sandbox, ignore_errors=True)
@@ -0,0 +1,39 @@
+""" Unit-test module for the scaling benchmark. """
+
+import unittest
+
+from recoda.benchmark import scaling
+
+
+def _row(projects: int, processes: int, wall_seconds: float) -> dict:
+    """ A row of a scaling table. """
+    return {'projects': projects, 'processes': processes, 'wall_seconds': wall_seconds}
+
+
+class TestScalingResults(unittest.TestCase):
+    """ Test the tables and regressions of scaling benchmarks. """
+
+    def setUp(self):
+        """ Results of a benchmark with one and two processes. """
+        self._baseline = {
+            'strong': [_row(10, 1, 10.0), _row(10, 2, 6.0)],
+            'weak': [_row(5, 1, 5.0), _row(10, 2, 6.0)],
+        }
+
+    def test_tables(self):
+        """ Are runs indexed by projects and processes? """
+        _strong, _weak = scaling.tables(self._baseline)
+        self.assertEqual(6.0, _strong.loc[(10, 2), 'wall_seconds'])
+        self.assertEqual([(5, 1), (10, 2)], _weak.index.tolist())
+
+    def test_compare(self):
+        """ Are runs slower than the tolerance flagged and new runs left out? """
+        _current = {
+            'strong': [_row(10, 1, 10.5), _row(10, 2, 8.0), _row(10, 4, 4.0)],
+            'weak': [_row(5, 1, 4.0), _row(10, 2, 6.0)],
+        }
+        _comparison = scaling.compare(self._baseline, _current, tolerance=0.1)
+        self.assertEqual(
+            [('strong 10x1', False), ('strong 10x2', True), ('weak 5x1', False), ('weak 10x2', False)],
+            [(_item[0], _item[4]) for _item in _comparison]
+        )
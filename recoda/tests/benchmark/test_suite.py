@@ -0,0 +1,42 @@
+""" Unit-test module for storing and comparing benchmark results. """
+
+import shutil
+import tempfile
+import unittest
+
+from recoda.benchmark import suite
+
+
+class TestSuiteResults(unittest.TestCase):
+    """ Test finding regressions between stored runs. """
+
+    def setUp(self):
+        """ Create a sandbox and the results of a run. """
+        self._test_sandbox = tempfile.mkdtemp()
+        self._baseline = {
+            'created': '2020-01-01T00:00:00',
+            'recoda_revision': None,
+            'metrics': {'loc': {'wall_seconds': 1.0}, 'license_type': {'wall_seconds': 2.0}},
+            'pipeline': {'wall_seconds': 10.0},
+        }
+
+    def test_compare(self):
+        """ Are only benchmarks slower than the tolerance regressions? """
+        _current = {
+            'metrics': {'loc': {'wall_seconds': 1.05}, 'license_type': {'wall_seconds': 3.0}},
+            'pipeline': {'wall_seconds': 9.0},
+        }
+        _comparison = suite.compare(self._baseline, _current, tolerance=0.1)
+        self.assertEqual(['loc', 'license_type', 'pipeline'], [_item[0] for _item in _comparison])
+        self.assertEqual([False, True, False], [_item[4] for _item in _comparison])
+        self.assertAlmostEqual(1.5, _comparison[1][3])
+
+    def test_store(self):
+        """ Are stored results loaded unchanged? """
+        _path = suite.store(self._baseline, self._test_sandbox)
+        self.assertTrue(_path.endswith('_unknown.json'))
+        self.assertEqual(self._baseline, suite.load(_path))
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self._test_sandbox, ignore_errors=True)
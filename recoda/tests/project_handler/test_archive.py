@@ -0,0 +1,41 @@
+""" Unit-test module for the archive project handler. """
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from recoda.project_handler import archive
+
+
+class TestArchiveHandler(unittest.TestCase):
+    """ Test the discovery of archives. """
+
+    def setUp(self):
+        """ Create archive files next to other files and in a sub folder. """
+        self.base_folder = tempfile.mkdtemp()
+        self.archives = [
+            os.path.join(self.base_folder, 'project.tar.gz'),
+            os.path.join(self.base_folder, 'project.ZIP'),
+        ]
+        self.nested = os.path.join(self.base_folder, 'dump', 'nested.tgz')
+        os.makedirs(os.path.dirname(self.nested))
+        for _path in self.archives + [self.nested, os.path.join(self.base_folder, 'notes.txt')]:
+            open(_path, 'w').close()
+
+    def test_discovery(self):
+        """ Are only archives up to the maximal depth found? """
+        _handler = archive.Handler(self.base_folder)
+        self.assertEqual(sorted(self.archives), sorted(_handler.get_project_directories()))
+        self.assertTrue(_handler.discovery_finished())
+
+        _handler = archive.Handler(self.base_folder, max_depth=2)
+        self.assertEqual(
+            sorted(self.archives + [self.nested]),
+            sorted(_handler.get_project_directories())
+        )
+        self.assertEqual(self.nested, _handler.get_identifier(self.nested))
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self.base_folder, ignore_errors=True)
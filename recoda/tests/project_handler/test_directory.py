@@ -0,0 +1,80 @@
+""" Unit-test module for the directory and project list handlers. """
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from recoda.project_handler import directory, project_list
+
+
+class TestDirectoryHandler(unittest.TestCase):
+    """ Test treating plain folders as projects. """
+
+    def setUp(self):
+        """ Create folders in an owner/project layout. """
+        self.base_folder = tempfile.mkdtemp()
+        self.owners = [os.path.join(self.base_folder, _owner) for _owner in ('alice', 'bob')]
+        self.projects = [
+            os.path.join(self.owners[0], 'first'),
+            os.path.join(self.owners[0], 'second'),
+            os.path.join(self.owners[1], 'third'),
+        ]
+        for _project in self.projects + [os.path.join(self.base_folder, '.hidden', 'project')]:
+            os.makedirs(_project)
+        open(os.path.join(self.base_folder, 'file.txt'), 'w').close()
+
+    def test_depth(self):
+        """ Are the folders at the given level the projects? """
+        self.assertEqual(self.owners, list(directory.Handler(self.base_folder).get_project_directories()))
+        _handler = directory.Handler(self.base_folder, max_depth=2)
+        self.assertEqual(self.projects, list(_handler.get_project_directories()))
+        self.assertTrue(_handler.discovery_finished())
+        self.assertEqual(self.projects[0], _handler.get_identifier(self.projects[0]))
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self.base_folder, ignore_errors=True)
+
+
+class TestProjectListHandler(unittest.TestCase):
+    """ Test reading projects from a list. """
+
+    def setUp(self):
+        """ Write a list with comments, empty lines and identifiers. """
+        self.folder = tempfile.mkdtemp()
+        self.list_file = os.path.join(self.folder, 'projects.txt')
+        self.content = (
+            "# curated corpus\n"
+            "/data/first\n"
+            "\n"
+            "/data/second\towner/second\n"
+        )
+        with open(self.list_file, 'w') as _file:
+            _file.write(self.content)
+
+    def _check(self, handler: project_list.Handler):
+        """ Are the listed projects handed out with their identifiers? """
+        _projects = handler.get_project_directories()
+        self.assertEqual('/data/first', next(_projects))
+        self.assertFalse(handler.discovery_finished())
+        self.assertEqual(['/data/second'], list(_projects))
+        self.assertTrue(handler.discovery_finished())
+        self.assertEqual('/data/first', handler.get_identifier('/data/first'))
+        self.assertEqual('owner/second', handler.get_identifier('/data/second'))
+
+    def test_file(self):
+        """ Can the list be read from a file? """
+        self._check(project_list.Handler(self.list_file))
+
+    def test_stdin(self):
+        """ Can the list be read from stdin? """
+        with patch.object(sys, 'stdin', io.StringIO(self.content)):
+            self._check(project_list.Handler('-'))
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self.folder, ignore_errors=True)
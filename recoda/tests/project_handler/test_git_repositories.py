@@ -2,9 +2,12 @@
 
 """
 
+import os
 import tempfile
 import unittest
 
+from git import Repo
+
 from recoda.project_handler import git
 from recoda.tests.helpers import (
     remove_test_repositories,
@@ -84,3 +87,128 @@ class TestRepositoryHandler(unittest.TestCase):
         remove_test_repositories(self.repo_base_folder)
 
 
+class TestDiscoverRepositories(unittest.TestCase):
+    """ Test the discovery of repositories without opening them. """
+
+    def setUp(self):
+        """ Create working trees, a bare repository and a linked working tree. """
+        self.base_folder = tempfile.mkdtemp()
+        self.top_level = os.path.join(self.base_folder, 'top_level')
+        self.nested = os.path.join(self.base_folder, 'group', 'nested')
+        self.bare = os.path.join(self.base_folder, 'group', 'bare.git')
+        self.linked = os.path.join(self.base_folder, 'group', 'linked')
+
+        Repo.init(self.top_level).create_remote('origin', EXISTING_REMOTE_REPO)
+        Repo.init(self.nested)
+        Repo.init(self.bare, bare=True)
+        os.makedirs(self.linked)
+        with open(os.path.join(self.linked, '.git'), 'w') as _file:
+            _file.write('gitdir: ../bare.git\n')
+
+    def test_depth(self):
+        """ Are only folders up to the maximal depth searched? """
+        self.assertEqual(
+            [self.top_level],
+            [_path for _path, _ in git.discover_repositories(self.base_folder)]
+        )
+        self.assertEqual(
+            {self.top_level, self.nested, self.bare, self.linked},
+            {_path for _path, _ in git.discover_repositories(self.base_folder, 2)}
+        )
+
+    def test_git_directories(self):
+        """ Do we find the git directory of every kind of repository? """
+        _git_dirs = dict(git.discover_repositories(self.base_folder, 2))
+        self.assertEqual(os.path.join(self.nested, '.git'), _git_dirs[self.nested])
+        self.assertEqual(self.bare, _git_dirs[self.bare])
+        self.assertEqual(self.bare, _git_dirs[self.linked])
+
+    def test_handler(self):
+        """ Are repositories opened on demand and identified by their location? """
+        _handler = git.Handler(base_folder=self.base_folder, max_depth=2)
+        self.assertEqual(4, len(list(_handler.get_project_directories())))
+        for _repo in _handler.get_project_objects():
+            if _repo.working_dir == self.top_level:
+                self.assertEqual(EXISTING_REMOTE_REPO, _handler.get_identifier(_repo))
+            elif _repo.bare:
+                self.assertEqual(self.bare, _handler.get_identifier(_repo))
+            else:
+                self.assertIn(_handler.get_identifier(_repo), [self.nested, self.linked])
+
+    def test_streaming_discovery(self):
+        """ Are projects handed out while the rest is still discovered? """
+        _handler = git.Handler(base_folder=self.base_folder, max_depth=2)
+        _directories = _handler.get_project_directories()
+
+        next(_directories)
+        self.assertFalse(_handler.discovery_finished())
+        self.assertEqual(3, len(list(_directories)))
+        self.assertTrue(_handler.discovery_finished())
+        # Known projects are handed out again without searching.
+        self.assertEqual(4, len(list(_handler.get_project_directories())))
+
+    def test_read_origin_url(self):
+        """ Do we read the origin url from the config, like git does? """
+        self.assertEqual(
+            EXISTING_REMOTE_REPO,
+            git.read_origin_url(os.path.join(self.top_level, '.git'))
+        )
+        self.assertIsNone(git.read_origin_url(os.path.join(self.nested, '.git')))
+
+        with open(os.path.join(self.bare, 'config'), 'a') as _file:
+            _file.write('[remote "upstream"]\n\turl = upstream\n')
+            _file.write('[Remote "origin"] # comment\n')
+            _file.write('\turl = first\n\tURL = "second" ; comment\n')
+        self.assertEqual('second', git.read_origin_url(self.bare))
+
+    def tearDown(self):
+        """ Remove the created test git repositories. """
+        remove_test_repositories(self.base_folder)
+
+
+
+class TestHistory(unittest.TestCase):
+    """ Test listing the revisions of a repository. """
+
+    def setUp(self):
+        """ Create a repository with three commits and a tag on the second. """
+        self.repository_folder = tempfile.mkdtemp()
+        self._repo = Repo.init(self.repository_folder)
+        _writer = self._repo.config_writer()
+        _writer.set_value('user', 'name', 'mock')
+        _writer.set_value('user', 'email', 'mock@mock')
+        _writer.release()
+        self.commits = []
+        for _number in range(3):
+            with open(os.path.join(self.repository_folder, 'file.txt'), 'w') as _file:
+                _file.write(str(_number))
+            self._repo.index.add(['file.txt'])
+            self.commits.append(self._repo.index.commit('commit {}'.format(_number)).hexsha)
+            if _number == 1:
+                self._repo.create_tag('v1', message='annotated')
+
+    def test_commits(self):
+        """ Are commits listed from oldest to newest? """
+        _history = git.list_history(self._repo.git_dir)
+        self.assertEqual(self.commits, [_revision.commit for _revision in _history])
+        self.assertEqual(self.commits, [_revision.name for _revision in _history])
+
+    def test_tags(self):
+        """ Are annotated tags peeled to their commit? """
+        self.assertEqual(
+            [('v1', self.commits[1])],
+            [(_revision.name, _revision.commit)
+             for _revision in git.list_history(self._repo.git_dir, 'tags')]
+        )
+
+    def test_empty_repository(self):
+        """ Has a repository without commits no history? """
+        _empty = tempfile.mkdtemp()
+        try:
+            self.assertEqual([], git.list_history(Repo.init(_empty).git_dir))
+        finally:
+            remove_test_repositories(_empty)
+
+    def tearDown(self):
+        """ Remove the created test git repository. """
+        remove_test_repositories(self.repository_folder)
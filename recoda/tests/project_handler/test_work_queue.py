@@ -0,0 +1,159 @@
+""" Unit-test module for the work queue shared between processes. """
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from recoda.project_handler import project_list
+from recoda.project_handler import work_queue
+
+
+class TestWorkQueue(unittest.TestCase):
+    """ Test claiming projects from the queue database. """
+
+    def setUp(self):
+        """ Create a queue with two projects. """
+        self.sandbox = tempfile.mkdtemp()
+        self.database = os.path.join(self.sandbox, 'queue.sqlite')
+        self.queue = work_queue.WorkQueue(self.database, worker='first')
+        self.projects = [('/projects/a', 'a'), ('/projects/b', 'b')]
+        self.queue.add(self.projects)
+
+    def test_claim(self):
+        """ Are projects handed out once and done after completing them? """
+        _other = work_queue.WorkQueue(self.database, worker='second')
+        self.assertEqual(self.projects[0], self.queue.claim())
+        self.assertEqual(self.projects[1], _other.claim())
+        self.assertIsNone(self.queue.claim())
+
+        self.assertFalse(self.queue.finished())
+        self.queue.mark_filled()
+        self.queue.complete(['a', 'b'])
+        self.assertTrue(_other.finished())
+        self.assertEqual({'done': 2}, self.queue.counts())
+
+    def test_expired_lease(self):
+        """ Are projects of a process, that stopped renewing, handed to others? """
+        _short = work_queue.WorkQueue(self.database, lease_seconds=0.01, worker='short')
+        self.assertEqual(self.projects[0], _short.claim())
+        time.sleep(0.05)
+        self.assertEqual(self.projects[0], self.queue.claim())
+
+        _renewing = work_queue.WorkQueue(self.database, lease_seconds=1, worker='renewing')
+        self.assertEqual(self.projects[1], _renewing.claim())
+        time.sleep(0.5)
+        _renewing.renew(['b'])
+        time.sleep(0.7)
+        self.assertIsNone(_short.claim())
+
+    def test_failed(self):
+        """ Are projects given up after they were claimed too often? """
+        self.queue.complete(['b'])
+        _short = work_queue.WorkQueue(self.database, lease_seconds=0.01, worker='short')
+        for _ in range(work_queue.MAX_ATTEMPTS):
+            self.assertEqual(self.projects[0], _short.claim())
+            time.sleep(0.05)
+        self.assertIsNone(_short.claim())
+        self.assertEqual({'done': 1, 'failed': 1}, self.queue.counts())
+
+    def test_duplicate_identifier(self):
+        """ Are projects added again ignored, but distinct projects sharing an identifier refused? """
+        self.assertEqual(0, self.queue.add(self.projects))
+        with self.assertRaises(ValueError):
+            self.queue.add([('/projects/c', 'c'), ('/clones/a', 'a')])
+        self.assertEqual({'pending': 2}, self.queue.counts())
+
+    def test_fail(self):
+        """ Are projects, that raised an error, not handed out again? """
+        self.assertEqual(self.projects[0], self.queue.claim())
+        self.queue.fail(['a'])
+        self.assertEqual(self.projects[1], self.queue.claim())
+        self.assertIsNone(self.queue.claim())
+        self.assertEqual({'claimed': 1, 'failed': 1}, self.queue.counts())
+
+    def test_filling(self):
+        """ Does only one process fill the queue? """
+        _other = work_queue.WorkQueue(self.database, worker='second')
+        self.assertTrue(self.queue.claim_filling())
+        self.assertFalse(_other.claim_filling())
+        self.queue.mark_filled()
+        self.assertFalse(self.queue.claim_filling())
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self.sandbox, ignore_errors=True)
+
+
+class TestWorkQueueHandler(unittest.TestCase):
+    """ Test handing out queued projects like other project handlers. """
+
+    def setUp(self):
+        """ Create a project list to fill the queue from. """
+        self.sandbox = tempfile.mkdtemp()
+        self.database = os.path.join(self.sandbox, 'queue.sqlite')
+        self.list_file = os.path.join(self.sandbox, 'projects.txt')
+        self.projects = [os.path.join(self.sandbox, _name) for _name in ('a', 'b', 'c')]
+        with open(self.list_file, 'w') as _file:
+            for _project in self.projects:
+                _file.write(_project + '\t' + os.path.basename(_project) + '\n')
+
+    def test_handler(self):
+        """ Are all listed projects handed out between two handlers? """
+        _filling = work_queue.Handler(
+            work_queue.WorkQueue(self.database, worker='first'),
+            project_handler=project_list.Handler(self.list_file),
+            poll_seconds=0.01
+        )
+        _claiming = work_queue.Handler(
+            work_queue.WorkQueue(self.database, worker='second'),
+            poll_seconds=0.01
+        )
+        _first_projects = _filling.get_project_directories()
+        _second_projects = _claiming.get_project_directories()
+
+        _claimed = [next(_first_projects), next(_second_projects)]
+        self.assertEqual(['a', 'b'], [_filling.get_identifier(_claimed[0]),
+                                      _claiming.get_identifier(_claimed[1])])
+        _claimed.append(next(_first_projects))
+        self.assertEqual(self.projects, _claimed)
+
+        _filling.mark_measured(['a', 'c'])
+        _claiming.mark_measured(['b'])
+        self.assertEqual([], list(_first_projects))
+        self.assertEqual([], list(_second_projects))
+        self.assertTrue(_claiming.discovery_finished())
+
+    def test_filler_died(self):
+        """ Is a queue, whose filling process died, filled by another one, or given up without one? """
+        _dead = work_queue.WorkQueue(self.database, lease_seconds=0.3, worker='dead')
+        self.assertTrue(_dead.claim_filling())
+        _dead.add([(self.projects[0], 'a')])
+
+        # The filling lease is still valid, so the second process only claims.
+        _filling = work_queue.Handler(
+            work_queue.WorkQueue(self.database, worker='second'),
+            project_handler=project_list.Handler(self.list_file),
+            poll_seconds=0.01
+        )
+        _filling_projects = _filling.get_project_directories()
+        self.assertEqual(self.projects[0], next(_filling_projects))
+
+        _waiting = work_queue.Handler(
+            work_queue.WorkQueue(self.database, worker='waiting'),
+            poll_seconds=0.01,
+            fill_timeout=0.05
+        )
+        with self.assertRaises(RuntimeError):
+            next(_waiting.get_project_directories())
+
+        # Once the lease expired, the second process fills the queue itself.
+        self.assertEqual(self.projects[1:], [next(_filling_projects), next(_filling_projects)])
+        _filling.mark_measured(['a', 'b', 'c'])
+        self.assertEqual([], list(_filling_projects))
+        self.assertTrue(_filling.discovery_finished())
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self.sandbox, ignore_errors=True)
@@ -0,0 +1,107 @@
+""" Unit-test module for measuring with a coordinator and workers. """
+
+import threading
+import time
+import unittest
+
+from recoda import fleet
+
+
+def _runner(tasks, _processes):
+    """ Measure tasks in the current process, with the identifier as only value. """
+    for _task in tasks:
+        yield _task[1], [{'id': _task[1], 'path': _task[0]}]
+
+
+class TestCoordinator(unittest.TestCase):
+    """ Test handing tasks to workers over localhost. """
+
+    def test_workers(self):
+        """ Is every project measured exactly once by the workers? """
+        _tasks = [('/projects/' + _name, _name, {}, None) for _name in 'abcdefgh']
+        _coordinator = fleet.Coordinator(('127.0.0.1', 0), b'test')
+        _coordinator.start()
+
+        _measured = []
+        _workers = [
+            threading.Thread(
+                target=lambda: _measured.append(fleet.run_worker(
+                    _coordinator.address, b'test', _runner, 1, poll_seconds=0.01
+                ))
+            )
+            for _ in range(2)
+        ]
+        for _worker in _workers:
+            _worker.start()
+        _results = list(_coordinator.run(_tasks))
+        for _worker in _workers:
+            _worker.join(timeout=30)
+
+        self.assertEqual(
+            sorted((_task[1], [{'id': _task[1], 'path': _task[0]}]) for _task in _tasks),
+            sorted(_results)
+        )
+        self.assertEqual(len(_tasks), sum(_measured))
+
+    def test_two_coordinators(self):
+        """ Does every coordinator in a process serve its own assignments? """
+        _coordinators = [
+            fleet.Coordinator(('127.0.0.1', 0), b'test', lease_seconds=_seconds)
+            for _seconds in (10, 20)
+        ]
+        for _coordinator in _coordinators:
+            _coordinator.start()
+        try:
+            for _coordinator, _seconds in zip(_coordinators, (10, 20)):
+                _manager = fleet._WorkerManager(address=_coordinator.address, authkey=b'test')
+                _manager.connect()
+                self.assertEqual(_seconds, _manager.assignments().lease_seconds())
+        finally:
+            for _coordinator in _coordinators:
+                _coordinator.stop()
+
+
+class TestAssignments(unittest.TestCase):
+    """ Test the leases of tasks handed to workers. """
+
+    def test_expired_lease(self):
+        """ Are projects of stopped workers handed out again and delivered once? """
+        _assignments = fleet._Assignments(lease_seconds=0.01)
+        _task = ('/projects/a', 'a', {}, None)
+        _assignments.set_tasks([_task])
+
+        self.assertEqual(_task, _assignments.get_task('first'))
+        self.assertIsNone(_assignments.get_task('second'))
+        time.sleep(0.05)
+        self.assertEqual(_task, _assignments.get_task('second'))
+
+        _assignments.put_result(('a', ['first row']))
+        _assignments.put_result(('a', ['second row']))
+        self.assertTrue(_assignments.finished())
+        self.assertEqual(('a', ['first row']), _assignments.results.get_nowait())
+        self.assertTrue(_assignments.results.empty())
+
+    def test_release(self):
+        """ Are projects of a failed worker handed out again without waiting for the lease? """
+        _assignments = fleet._Assignments(lease_seconds=600)
+        _task = ('/projects/a', 'a', {}, None)
+        _assignments.set_tasks([_task])
+
+        self.assertEqual(_task, _assignments.get_task('first'))
+        _assignments.release('first')
+        self.assertEqual(_task, _assignments.get_task('second'))
+        self.assertFalse(_assignments.finished())
+
+    def test_given_up(self):
+        """ Are projects given up after they were handed out too often? """
+        _assignments = fleet._Assignments(lease_seconds=0.01)
+        _assignments.set_tasks([('/projects/a', 'a', {}, None)])
+        for _ in range(fleet.MAX_ATTEMPTS):
+            self.assertIsNotNone(_assignments.get_task('worker'))
+            time.sleep(0.05)
+        self.assertIsNone(_assignments.get_task('worker'))
+        self.assertTrue(_assignments.finished())
+        # The run records the project as failed.
+        _result = _assignments.results.get_nowait()
+        self.assertEqual(('a', []), (_result.identifier, _result.rows))
+        self.assertIn('Given up', _result.error)
@@ -0,0 +1,60 @@
+""" Unit-test module for recording and summarising the cost of metrics. """
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas
+
+from recoda import instrumentation
+
+
+class TestInstrumentation(unittest.TestCase):
+    """ Test timing metrics and the report of their costs. """
+
+    def setUp(self):
+        """ Write timings of three projects, measured by two metrics. """
+        self._test_sandbox = tempfile.mkdtemp()
+        self._timing_file = os.path.join(self._test_sandbox, 'timings.csv')
+        pandas.DataFrame(
+            [
+                ('a', 'loc', 5, 0.1, 0.1, 0),
+                ('a', 'style', 5, 1.0, 0.9, 100),
+                ('b', 'loc', 50, 0.2, 0.2, 0),
+                ('b', 'style', 50, 3.0, 2.5, 300),
+                ('c', 'loc', None, 0.1, 0.1, 0),
+                ('c', 'style', None, 0.5, 0.5, 0),
+            ],
+            columns=['id', 'metric', 'loc', 'wall_seconds', 'cpu_seconds', 'peak_rss_growth_kib']
+        ).to_csv(self._timing_file)
+
+    def test_timed_call(self):
+        """ Are the value of the metric and a record of its cost given back? """
+        _value, _record = instrumentation.timed_call(len, 'project')
+        self.assertEqual(7, _value)
+        self.assertGreaterEqual(_record['wall_seconds'], 0)
+        self.assertGreaterEqual(_record['cpu_seconds'], 0)
+
+    def test_size_class(self):
+        """ Are projects classed by the order of magnitude of their lines? """
+        self.assertEqual('0-9', instrumentation.size_class(0))
+        self.assertEqual('100-999', instrumentation.size_class(512))
+        self.assertEqual('unknown', instrumentation.size_class(None))
+
+    def test_summarise(self):
+        """ Are the costs summed over chunks, by metric and by size? """
+        _by_metric, _by_size = instrumentation.summarise([self._timing_file], chunk_rows=4)
+        self.assertEqual(['style', 'loc'], _by_metric.index.tolist())
+        self.assertEqual([3, 3], _by_metric['calls'].tolist())
+        self.assertAlmostEqual(4.5, _by_metric.loc['style', 'wall_seconds'])
+        self.assertEqual(300, _by_metric.loc['style', 'max_peak_rss_growth_kib'])
+
+        self.assertEqual(['0-9', '10-99', 'unknown'], _by_size.index.tolist())
+        self.assertEqual([1, 1, 1], _by_size['projects'].tolist())
+        self.assertAlmostEqual(3.2, _by_size.loc['10-99', 'wall_seconds_per_project'])
+        self.assertEqual('style', _by_size.loc['10-99', 'most_expensive_metric'])
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self._test_sandbox, ignore_errors=True)
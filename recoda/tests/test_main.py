@@ -1,5 +1,8 @@
 """ Test the main module of ReCodA. """
 
+import io
+import json
+import os
 import sys
 import tempfile
 import unittest
@@ -8,7 +11,7 @@ from unittest.mock import patch
 import pandas
 
 import recoda.__main__ as main
-from recoda.project_handler import git
+from recoda.project_handler import git, project_list
 from recoda.tests.helpers import (
     create_test_repositories,
     remove_test_repositories
@@ -97,6 +100,66 @@ class TestArgumentParser(unittest.TestCase):
             with self.assertRaises(SystemExit):
                 _argparser = main.parse_arguments()
 
+    def test_projects_from(self):
+        """ Can projects be read from a list instead of a base directory, but not both? """
+        _arguments = [self.name, '--projects-from', '-', self.language['short'], self.langauge_param]
+        with patch.object(sys, 'argv', _arguments):
+            _argparser = main.parse_arguments()
+            self.assertEqual('-', _argparser.projects_from)
+            self.assertIsNone(_argparser.base_dir)
+
+        _arguments.extend([self.base_dir['short'], self.fake_path_param])
+        with patch.object(sys, 'argv', _arguments):
+            with self.assertRaises(SystemExit):
+                main.parse_arguments()
+
+    def test_shard(self):
+        """ Are shards parsed and checked? """
+        _arguments_base = [
+            self.name,
+            self.base_dir['short'],
+            self.fake_path_param,
+            self.language['short'],
+            self.langauge_param
+        ]
+        with patch.object(sys, 'argv', _arguments_base + ['--shard', '1/4']):
+            self.assertEqual((1, 4), main.parse_arguments().shard)
+        for _shard in ['4/4', '1', 'a/b', '0/0']:
+            with patch.object(sys, 'argv', _arguments_base + ['--shard', _shard]):
+                with self.assertRaises(SystemExit):
+                    main.parse_arguments()
+
+    def test_depth(self):
+        """ Are depths below 1, that find no projects, refused? """
+        _arguments_base = [
+            self.name,
+            self.base_dir['short'],
+            self.fake_path_param,
+            self.language['short'],
+            self.langauge_param
+        ]
+        with patch.object(sys, 'argv', _arguments_base + ['--depth', '2']):
+            self.assertEqual(2, main.parse_arguments().depth)
+        for _depth in ['0', '-1', 'a']:
+            with patch.object(sys, 'argv', _arguments_base + ['--depth', _depth]):
+                with self.assertRaises(SystemExit):
+                    main.parse_arguments()
+
+class TestSharding(unittest.TestCase):
+    """ Make sure shards split projects deterministically and completely. """
+
+    def test_partition(self):
+        """ Is every project in exactly one shard? """
+        _identifiers = ['https://example.org/project-{}.git'.format(_number) for _number in range(200)]
+        _shards = [
+            {_identifier for _identifier in _identifiers if main.in_shard(_identifier, (_index, 3))}
+            for _index in range(3)
+        ]
+        self.assertEqual(len(_identifiers), sum(len(_shard) for _shard in _shards))
+        self.assertEqual(set(_identifiers), set.union(*_shards))
+        # The assignment does not change between runs.
+        self.assertTrue(main.in_shard('https://example.org/project-0.git', (1, 3)))
+
 class TestMeasureProjects(unittest.TestCase):
     """ We make sure the measure_projects function returns an expected pandas dataframe. """
 
@@ -127,5 +190,138 @@ class TestMeasureProjects(unittest.TestCase):
                 _id_list
             )
 
+    def test_file_facts(self):
+        """ Are the facts about single files handed to the file facts writer? """
+        _frames = []
+
+        class _Writer():
+            write = _frames.append
+
+        with open(os.path.join(self.projects[0].working_dir, 'module.py'), 'w') as _module:
+            _module.write('x = 1\n')
+
+        _test_object = main.MeasureProjects(
+            project_measure_handler=self.handler,
+            language='python',
+            file_facts_writer=_Writer()
+        )
+        _ids = pandas.concat([frame for frame in _test_object.measure()])['id'].tolist()
+        _files = pandas.concat(_frames)
+        self.assertEqual(list(main.MeasureProjects.file_fact_types()), list(_files.columns))
+        self.assertTrue(set(_files['id']) <= set(_ids))
+        self.assertIn('module.py', _files['file'].tolist())
+
+    def test_failed_project(self):
+        """ Does a project raising an error give a failed result instead of ending the run? """
+        _result = main._measure_task((
+            self.projects[0].working_dir,
+            'failing',
+            {'id': str, 'loc': lambda _project_path: 1 / 0},
+            None,
+            {}
+        ))
+        self.assertEqual('failing', _result.identifier)
+        self.assertEqual([], _result.rows)
+        self.assertIn('ZeroDivisionError', _result.error)
+
+    def test_chunks_end_with_projects(self):
+        """ Are the rows of a project, like the revisions of a history, never split between chunks? """
+        def _runner(_tasks, _processes):
+            for _task in _tasks:
+                yield main.ProjectResult(_task[1], [{'id': _task[1]} for _ in range(3)])
+
+        _test_object = main.MeasureProjects(
+            project_measure_handler=self.handler,
+            language='python',
+            multiprocessing_chunk_size=2,
+            runner=_runner,
+            progress=main.recoda.progress.Progress(stream=io.StringIO())
+        )
+        _chunks = [_chunk['id'].tolist() for _chunk in _test_object.measure() if not _chunk.empty]
+        for _index, _chunk in enumerate(_chunks):
+            for _identifier in _chunk:
+                self.assertEqual(3, _chunk.count(_identifier))
+                for _other_chunk in _chunks[_index + 1:]:
+                    self.assertNotIn(_identifier, _other_chunk)
+        self.assertEqual(3 * len(self.projects), sum(len(_chunk) for _chunk in _chunks))
+
+    def test_progress(self):
+        """ Is every measured project and its files reported in the status file? """
+        _status_path = os.path.join(self.base_folder, 'status.json')
+        _test_object = main.MeasureProjects(
+            project_measure_handler=self.handler,
+            language='python',
+            progress=main.recoda.progress.Progress(
+                interval=0,
+                status_path=_status_path,
+                stream=io.StringIO()
+            )
+        )
+        for _ in _test_object.measure():
+            pass
+        with open(_status_path) as _status_file:
+            _status = json.load(_status_file)
+        self.assertEqual(len(self.projects), _status['projects_measured'])
+        self.assertEqual(len(self.projects), _status['projects_total'])
+        self.assertGreater(_status['files_measured'], 0)
+        self.assertEqual(
+            len(self.projects),
+            sum(_worker['projects'] for _worker in _status['workers'].values())
+        )
+
+    def test_typed_chunk(self):
+        """ Are chunks compactly typed and errors of requirements turned into a status? """
+        _test_object = main.MeasureProjects(project_measure_handler=self.handler, language='python')
+        _chunk = _test_object._typed_chunk([
+            {'id': 'a', 'requirements_declared': 0.5, 'license_type': 'MIT', 'packageability': False},
+            {'id': 'b', 'requirements_declared': 'Error', 'packageability': 0},
+            {'id': 'c', 'requirements_declared': None},
+        ])
+        self.assertEqual('Float32', str(_chunk['requirements_declared'].dtype))
+        self.assertEqual('boolean', str(_chunk['packageability'].dtype))
+        self.assertEqual('category', str(_chunk['license_type'].dtype))
+        self.assertEqual(
+            ['measured', 'error', None],
+            [None if pandas.isna(_status) else _status
+             for _status in _chunk['requirements_declared_status']]
+        )
+        self.assertTrue(pandas.isna(_chunk['requirements_declared'][1]))
+        self.assertFalse(_chunk['packageability'][1])
+
+    def test_packageability_status(self):
+        """ Do projects without setup files stay apart from setup files without setup()? """
+        _test_object = main.MeasureProjects(project_measure_handler=self.handler, language='python')
+        _columns = list(_test_object.column_types())
+        self.assertEqual(_columns.index('packageability') + 1, _columns.index('packageability_status'))
+        _chunk = _test_object._typed_chunk([
+            {'id': 'a', 'packageability': 0},
+            {'id': 'b', 'packageability': False},
+            {'id': 'c', 'packageability': True},
+            {'id': 'd', 'packageability': None},
+        ])
+        self.assertEqual(
+            [('no_setup_files', False), ('measured', False), ('measured', True), (None, None)],
+            [(None if pandas.isna(_status) else _status, None if pandas.isna(_value) else _value)
+             for _status, _value in zip(_chunk['packageability_status'], _chunk['packageability'])]
+        )
+
+    def test_identifiers_from_list(self):
+        """ Are the identifiers of a project list used as ids? """
+        _list_file = os.path.join(self.base_folder, 'projects.txt')
+        with open(_list_file, 'w') as _file:
+            for _number, _project in enumerate(self.projects):
+                _file.write('{}\tproject-{}\n'.format(_project.working_dir, _number))
+
+        _test_object = main.MeasureProjects(
+            project_measure_handler=project_list.Handler(_list_file),
+            language='python',
+            projects_to_skip=['project-0']
+        )
+        _test_output = pandas.concat([frame for frame in _test_object.measure()])
+        self.assertEqual(
+            sorted('project-{}'.format(_number) for _number in range(1, len(self.projects))),
+            sorted(_test_output['id'].tolist())
+        )
+
     def tearDown(self):
         remove_test_repositories(self.base_folder)
@@ -0,0 +1,208 @@
+""" Test the handling of result files. """
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import numpy
+import pandas
+
+from recoda import output
+from recoda.output import merge_csv_files
+
+
+class TestMergeCsvFiles(unittest.TestCase):
+    """ Test combining the output files of shards. """
+
+    def setUp(self):
+        """ Write the output of two shards and a repeated run of the first. """
+        self._test_sandbox = tempfile.mkdtemp()
+        self._files = []
+        for _name, _rows in [
+                ('shard_0.csv', [('a', 1), ('b', 2)]),
+                ('shard_1.csv', [('c', 3)]),
+                ('shard_0_again.csv', [('b', 20)]),
+        ]:
+            _path = os.path.join(self._test_sandbox, _name)
+            pandas.DataFrame(_rows, columns=['id', 'loc']).to_csv(path_or_buf=_path)
+            self._files.append(_path)
+        self._output = os.path.join(self._test_sandbox, 'merged.csv')
+
+    def test_merge(self):
+        """ Are all rows combined and repeated projects taken from the last file? """
+        self.assertEqual(3, merge_csv_files(self._files, self._output))
+        _merged = pandas.read_csv(self._output, index_col=0)
+        self.assertEqual(
+            {'a': 1, 'b': 20, 'c': 3},
+            dict(zip(_merged['id'], _merged['loc']))
+        )
+
+    def test_numeric_looking_keys(self):
+        """ Are ids and revisions, that look like numbers, kept as their text? """
+        _history = os.path.join(self._test_sandbox, 'history.csv')
+        pandas.DataFrame(
+            [('1.10', '0.1', 1), ('1.10', '0.10', 2), ('1.10', '0.2', 3)],
+            columns=['id', 'revision', 'loc']
+        ).to_csv(path_or_buf=_history)
+        self.assertEqual(['1.10', '1.10', '1.10'], output.read_measured_ids(_history, 'csv'))
+        self.assertEqual(3, merge_csv_files([_history], self._output))
+        _merged = pandas.read_csv(self._output, index_col=0, dtype=str)
+        self.assertEqual(['0.1', '0.10', '0.2'], _merged['revision'].tolist())
+        self.assertEqual({'1.10'}, set(_merged['id']))
+
+    def test_mixed_formats(self):
+        """ Are csv and sqlite files combined in chunks, keeping booleans? """
+        _database = os.path.join(self._test_sandbox, 'shard_2.sqlite')
+        _writer = output.open_writer(_database, 'sqlite', {'id': str, 'loc': int, 'flag': bool})
+        _writer.write(pandas.DataFrame([('a', 10, True), ('d', 4, False)],
+                                       columns=['id', 'loc', 'flag']))
+        _writer.close()
+
+        _rows = output.merge_files(
+            self._files + [_database],
+            self._output,
+            column_types={'id': str, 'loc': int, 'flag': bool},
+            chunk_rows=1
+        )
+        self.assertEqual(4, _rows)
+        _merged = pandas.read_csv(self._output, index_col=0).sort_values('id')
+        self.assertEqual(['a', 'b', 'c', 'd'], _merged['id'].tolist())
+        self.assertEqual([10, 20, 3, 4], _merged['loc'].tolist())
+        self.assertEqual([True, None, None, False],
+                         [None if pandas.isna(_flag) else _flag for _flag in _merged['flag']])
+
+    def test_newest_by(self):
+        """ Are repeated projects taken from the row with the highest value? """
+        _output = os.path.join(self._test_sandbox, 'merged.sqlite')
+        _rows = output.merge_files(list(reversed(self._files)), _output, newest_by='loc')
+        self.assertEqual(3, _rows)
+        with sqlite3.connect(_output) as _connection:
+            self.assertEqual(
+                [('a', '1'), ('b', '20'), ('c', '3')],
+                _connection.execute('SELECT id, loc FROM results ORDER BY id').fetchall()
+            )
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self._test_sandbox, ignore_errors=True)
+
+
+class TestWriters(unittest.TestCase):
+    """ Test writing the chunks of a run and resuming it. """
+
+    def setUp(self):
+        """ Create a sandbox and two chunks of typed values. """
+        self._test_sandbox = tempfile.mkdtemp()
+        self._column_types = {'id': str, 'loc': int, 'packageability': bool, 'density': float}
+        self._chunks = [
+            pandas.DataFrame(
+                [('a', 10, True, 0.5), ('b', 0, None, None)],
+                columns=list(self._column_types)
+            ),
+            pandas.DataFrame([('c', 3, False, 1.0)], columns=list(self._column_types)),
+        ]
+
+    def _write(self, output_format: str, chunks: list) -> str:
+        """ Write chunks with a new writer and return the path of the file. """
+        _path = os.path.join(self._test_sandbox, 'results.' + output_format)
+        _writer = output.open_writer(_path, output_format, self._column_types)
+        for _chunk in chunks:
+            _writer.write(_chunk)
+        _writer.close()
+        return _path
+
+    def test_csv(self):
+        """ Are chunks appended after a single header? """
+        _path = self._write('csv', self._chunks[:1])
+        self._write('csv', self._chunks[1:])
+        self.assertEqual(['a', 'b', 'c'], output.read_measured_ids(_path, 'csv'))
+
+    def test_csv_other_columns(self):
+        """ Are rows with other columns refused instead of appended under the old header? """
+        _path = self._write('csv', self._chunks[:1])
+        _writer = output.open_writer(_path, 'csv', self._column_types)
+        with self.assertRaises(ValueError):
+            _writer.write(self._chunks[1].assign(density_status='measured'))
+        self.assertEqual(['a', 'b'], output.read_measured_ids(_path, 'csv'))
+
+    @unittest.skipIf(output.pyarrow is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        """ Are types and missing values kept and resumed runs written to new part files? """
+        _path = self._write('parquet', self._chunks[:1])
+        self._write('parquet', self._chunks[1:])
+        self.assertEqual(['a', 'b', 'c'], output.read_measured_ids(_path, 'parquet'))
+        self.assertEqual(
+            [os.path.join(self._test_sandbox, 'results.part-0000{}.parquet'.format(_number))
+             for _number in (1, 2)],
+            output.parquet_files(_path)
+        )
+
+        _table = output.pyarrow.concat_tables(
+            output.pyarrow.parquet.read_table(_part) for _part in output.parquet_files(_path)
+        )
+        self.assertEqual('bool', str(_table.schema.field('packageability').type))
+        self.assertEqual([True, None, False], _table.column('packageability').to_pylist())
+        self.assertEqual([10, 0, 3], _table.column('loc').to_pylist())
+        self.assertEqual([0.5, None, 1.0], _table.column('density').to_pylist())
+        self.assertEqual(
+            ['results.part-00001.parquet', 'results.part-00002.parquet'],
+            sorted(os.listdir(self._test_sandbox))
+        )
+
+    @unittest.skipIf(output.pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_parts(self):
+        """ Are buffered rows written as finished part files, before the writer is closed? """
+        _path = os.path.join(self._test_sandbox, 'results.parquet')
+        _writer = output.open_writer(_path, 'parquet', self._column_types, rows_per_file=2)
+        for _chunk in self._chunks:
+            _writer.write(_chunk)
+        # A killed run keeps the finished part.
+        self.assertEqual(['a', 'b'], output.read_measured_ids(_path, 'parquet'))
+        _writer.close()
+        self.assertEqual(['a', 'b', 'c'], output.read_measured_ids(_path, 'parquet'))
+
+        _merged = os.path.join(self._test_sandbox, 'merged.parquet')
+        self.assertEqual(3, output.merge_files([_path], _merged))
+        self.assertEqual([_merged], output.parquet_files(_merged))
+
+    def test_sqlite(self):
+        """ Are rows of projects measured again replaced and ids looked up? """
+        _path = self._write('sqlite', self._chunks)
+        _remeasured = pandas.DataFrame([('a', 11, False, 0.25)], columns=list(self._column_types))
+        self._write('sqlite', [_remeasured])
+
+        _measured = output.read_measured_ids(_path, 'sqlite')
+        self.assertIn('c', _measured)
+        self.assertNotIn('d', _measured)
+        self.assertEqual(['a', 'b', 'c'], sorted(_measured))
+
+        with sqlite3.connect(_path) as _connection:
+            _rows = _connection.execute(
+                'SELECT id, loc, packageability, density FROM results ORDER BY id'
+            ).fetchall()
+        self.assertEqual([('a', 11, 0, 0.25), ('b', 0, None, None), ('c', 3, 0, 1.0)], _rows)
+
+    def test_typed_frame(self):
+        """ Are columns compact and nullable, and unknown categories refused? """
+        _column_types = {
+            'id': str,
+            'density': numpy.float32,
+            'status': output.Category(('measured', 'error')),
+        }
+        _frame = output.typed_frame([('a', 0.1, 'error'), ('b', None, None)], _column_types)
+        self.assertEqual(['Float32', 'category'], [str(_dtype) for _dtype in _frame.dtypes[1:]])
+        self.assertEqual(['measured', 'error'], list(_frame['status'].cat.categories))
+        self.assertEqual(',id,density,status\n0,a,0.1,error\n1,b,,\n', _frame.to_csv())
+        with self.assertRaises(ValueError):
+            output.typed_frame([('c', 0.5, 'unknown')], _column_types)
+
+    def test_missing_file(self):
+        """ Do runs without a result file start from scratch? """
+        _path = os.path.join(self._test_sandbox, 'missing.csv')
+        self.assertEqual([], output.read_measured_ids(_path, 'parquet'))
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self._test_sandbox, ignore_errors=True)
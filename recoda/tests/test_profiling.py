@@ -0,0 +1,55 @@
+""" Unit-test module for profiling metrics in the measuring processes. """
+
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from recoda import profiling
+
+
+def _metric(project_path: str) -> int:
+    """ A metric allocating some memory. """
+    return len([project_path] * 10000)
+
+
+class TestProfiling(unittest.TestCase):
+    """ Test profiling projects and merging their samples. """
+
+    def setUp(self):
+        """ Create a sandbox. """
+        self._test_sandbox = tempfile.mkdtemp()
+
+    def test_project_profile(self):
+        """ Are metric calls profiled under their name and their memory traced? """
+        _profile = profiling.ProjectProfile(memory=True)
+        self.assertEqual(10000, _profile.call('size', _metric, 'project'))
+        _samples = _profile.result()
+
+        self.assertIn(('<metric size>', 1, 'measure'), _samples['stats'])
+        self.assertEqual(1, len(_samples['tags']))
+        _metric_name, _seconds, _peak_kib = _samples['tags'][0]
+        self.assertEqual('size', _metric_name)
+        self.assertGreater(_peak_kib, 0)
+
+    def test_collector(self):
+        """ Are the samples of projects merged into one pstats file and a report? """
+        _path = os.path.join(self._test_sandbox, 'run.pstats')
+        _collector = profiling.ProfileCollector(_path, memory=True)
+        for _identifier in ('a', 'b'):
+            _profile = profiling.ProjectProfile(memory=True)
+            _profile.call('size', _metric, _identifier)
+            _collector.add(_identifier, _profile.result())
+        _collector.close()
+
+        _stats = pstats.Stats(_path)
+        self.assertEqual(2, _stats.stats[('<metric size>', 1, 'measure')][1])
+        with open(_path + '.txt') as _report:
+            _lines = _report.read().splitlines()
+        self.assertIn('size', _lines)
+        self.assertTrue(any(_line.endswith('  a') for _line in _lines))
+
+    def tearDown(self):
+        """ Clean up the sandbox. """
+        shutil.rmtree(self._test_sandbox, ignore_errors=True)
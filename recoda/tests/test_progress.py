@@ -0,0 +1,123 @@
+""" Unit-test module for reporting the progress of a run. """
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from recoda import progress
+from recoda.output import ProjectResult
+
+
+class _Clock():
+    """ A clock, that only moves when told. """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Discovery():
+    """ Discovery of a fixed number of projects. """
+
+    discovered = 4
+
+    @staticmethod
+    def finished() -> bool:
+        return True
+
+
+def _result(identifier: str, worker: str, seconds: float) -> ProjectResult:
+    """ A result of a project with ten files. """
+    return ProjectResult(identifier, [], telemetry={'worker': worker, 'seconds': seconds, 'files': 10})
+
+
+class TestProgress(unittest.TestCase):
+    """ Test throughput, estimates, busy workers and stragglers. """
+
+    def setUp(self):
+        """ Create a sandbox and a run of four projects, one of them skipped. """
+        self._test_sandbox = tempfile.mkdtemp()
+        self._clock = _Clock()
+        self._stream = io.StringIO()
+        self._status_path = os.path.join(self._test_sandbox, 'status.json')
+        self._progress = progress.Progress(
+            interval=10,
+            status_path=self._status_path,
+            straggler_seconds=1,
+            stream=self._stream,
+            clock=self._clock
+        )
+        self._progress.start(_Discovery())
+        self._progress.skipped()
+        for _identifier in ('a', 'b', 'c'):
+            self._progress.handed_over(_identifier)
+
+    def test_status(self):
+        """ Are throughput, time left and busy time of the workers reported? """
+        self._clock.now = 4.0
+        self._progress.measured(_result('a', 'host:1', 2.0))
+        self._progress.measured(_result('b', 'host:2', 1.0))
+        # The interval did not pass yet.
+        self.assertEqual('', self._stream.getvalue())
+
+        self._clock.now = 20.0
+        self._progress.measured(_result('c', 'host:1', 16.0))
+        with open(self._status_path) as _status_file:
+            _status = json.load(_status_file)
+        self.assertEqual(3, _status['projects_total'])
+        self.assertEqual(30, _status['files_measured'])
+        self.assertAlmostEqual(1.5, _status['files_per_second'])
+        self.assertEqual(0, _status['eta_seconds'])
+        self.assertEqual({'projects': 2, 'busy_seconds': 18.0, 'busy_fraction': 0.9},
+                         _status['workers']['host:1'])
+        self.assertIn('3 from 3 projects', self._stream.getvalue())
+
+    def test_stragglers(self):
+        """ Are projects in flight much longer than the median stragglers? """
+        self._clock.now = 2.0
+        self._progress.measured(_result('a', 'host:1', 2.0))
+        self._clock.now = 11.0
+        self._progress.handed_over('d')
+        _status = self._progress.report()
+        self.assertEqual([{'id': 'b', 'seconds': 11.0}, {'id': 'c', 'seconds': 11.0}],
+                         _status['stragglers'])
+        self.assertEqual('0:00:22', progress._duration(_status['eta_seconds']))
+        self.assertIn('stragglers b 0:00:11, c 0:00:11', self._stream.getvalue())
+
+    def test_report_without_results(self):
+        """ Is the run reported every interval, also while no result arrives? """
+        _stream = io.StringIO()
+        _progress = progress.Progress(interval=0.05, straggler_seconds=0, stream=_stream)
+        _progress.start(_Discovery())
+        _progress.handed_over('stuck')
+        _deadline = time.monotonic() + 5
+        while 'stragglers stuck' not in _stream.getvalue() and time.monotonic() < _deadline:
+            time.sleep(0.01)
+        _progress.stop()
+        self.assertIn('0 from 4 projects', _stream.getvalue())
+        self.assertIn('stragglers stuck', _stream.getvalue())
+
+    def test_handed_over_while_reporting(self):
+        """ Can projects be handed over from another thread during reports? """
+        _progress = progress.Progress(interval=0, straggler_seconds=0, stream=io.StringIO())
+        _progress.start(_Discovery())
+        _handing_over = threading.Thread(
+            target=lambda: [_progress.handed_over(str(_number)) for _number in range(20000)]
+        )
+        _handing_over.start()
+        while _handing_over.is_alive():
+            _progress.status()
+        _handing_over.join()
+        self.assertEqual(20000, _progress.status()['in_flight'])
+
+    def tearDown(self):
+        """ Stop the reports and clean up the sandbox. """
+        self._progress.stop()
+        shutil.rmtree(self._test_sandbox, ignore_errors=True)
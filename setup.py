@@ -20,8 +20,8 @@ setup(
     install_requires=[
         # Needed to work with the repositories.
         "GitPython==2.0.4",
-        # For handling the measurement data.
-        "pandas==0.23.4",
+        # For handling the measurement data, with nullable column types.
+        "pandas==1.5.3",
         # For measuring the packageability.
         "pyroma==2.4",
         # Calculates readability metrics.
@@ -36,13 +36,25 @@ setup(
         "pyflakes==1.6.0", 
         # Get requirements from imports
         "pipreqs==0.4.9",
+        # Read declarative packaging and environment files.
+        "toml==0.10.2",
+        "PyYAML==6.0.1",
         # Type hints
         "typing >= 3.6.6"
     ],
+    extras_require={
+        # Writes typed parquet output files.
+        'parquet': ["pyarrow"]
+    },
+    # pandas 1.5 needs Python 3.8.
+    python_requires='>=3.8',
     keywords='science research engineering static analysis',
     classifiers=[
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
         'License :: OSI Approved :: MIT License'
     ],
     zip_safe=True